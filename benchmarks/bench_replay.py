@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline crawl throughput: the parse-and-schedule pipeline without network.
+
+Writes a synthetic site (or uses an archive recorded with ``-record``) as a
+WARC file, then crawls it repeatedly through the replay transport and
+reports pages per second. With no sockets involved, the numbers reflect
+link extraction, URL normalization and frontier work only.
+
+Usage:
+    python benchmarks/bench_replay.py [-n PAGES] [-r RUNS]
+    python benchmarks/bench_replay.py --archive crawl.warc.gz --seed URL
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from crawler_transport import FetchResponse  # noqa: E402
+from crawler_warc import WarcWriter  # noqa: E402
+from python_webcrawler import PythonWebCrawler  # noqa: E402
+
+BASE = 'http://bench.test'
+LINKS_PER_PAGE = 50
+
+
+def write_site(path, pages):
+    """Archive pages that each link to the next LINKS_PER_PAGE pages."""
+    headers = {'Content-Type': 'text/html; charset=utf-8'}
+    with WarcWriter(path) as writer:
+        for i in range(pages):
+            links = ''.join(
+                f'<a href="/page/{(i + k) % pages}">page</a>'
+                for k in range(1, LINKS_PER_PAGE + 1)
+            )
+            body = f'<html><body><p>page {i}</p>{links}</body></html>'
+            url = f'{BASE}/page/{i}'
+            writer.write_response(
+                url, FetchResponse(url, 200, headers, body.encode(), 'utf-8')
+            )
+
+
+async def replay(archive, seed, depth):
+    crawler = PythonWebCrawler(max_depth=depth, replay=archive, trap_limit=0)
+    started = time.perf_counter()
+    await crawler.crawl([seed])
+    return time.perf_counter() - started, crawler.metrics['pages_fetched']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', type=int, default=2000, help='Synthetic pages')
+    parser.add_argument('-r', type=int, default=3, help='Runs')
+    parser.add_argument('-d', type=int, default=100, help='Crawl depth')
+    parser.add_argument('--archive', help='Replay this archive instead')
+    parser.add_argument('--seed', help='Seed URL for --archive')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive, seed = args.archive, args.seed
+        if archive is None:
+            archive = os.path.join(tmp, 'site.warc.gz')
+            seed = f'{BASE}/page/0'
+            write_site(archive, args.n)
+        elif seed is None:
+            parser.error('--archive needs --seed')
+
+        timings = []
+        for _ in range(args.r):
+            elapsed, pages = asyncio.run(replay(archive, seed, args.d))
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        print(f"pages:  {pages}")
+        print(f"median: {median:.2f}s  ({pages / median:.0f} pages/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CLI startup-time benchmark based on ``python -X importtime``.
+
+Runs ``python -X importtime src/python_webcrawler.py --help`` several
+times and reports the import time attributable to the CLI (everything not
+already imported by a bare interpreter), plus wall-clock time. Exits with
+status 1 if the median exceeds the target or if a heavy module that should
+be imported lazily shows up.
+
+Usage:
+    python benchmarks/bench_startup.py [-r RUNS] [--target-ms MS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CLI = os.path.join(os.path.dirname(__file__), '..', 'src', 'python_webcrawler.py')
+
+# Budget for imports triggered by `--help`, in milliseconds
+TARGET_MS = 50.0
+
+# Modules that must not be loaded just to print help or reject arguments
+LAZY_MODULES = ('asyncio', 'aiohttp', 'bs4', 'ssl', 'httpx')
+
+
+def parse_importtime(stderr):
+    """Return ({top-level module: cumulative us}, {every imported module})."""
+    top_level, loaded = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        loaded.add(name.strip())
+        # Nested imports are already counted in their parent's cumulative time
+        if not name.startswith('  '):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, loaded
+
+
+def importtime(args):
+    """Run the interpreter with -X importtime and parse its report."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    top_level, loaded = parse_importtime(proc.stderr)
+    return top_level, loaded, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-r', type=int, default=10, help='Runs (default: 10)')
+    parser.add_argument(
+        '--target-ms', type=float, default=TARGET_MS,
+        help=f'Import budget in ms (default: {TARGET_MS:g})'
+    )
+    args = parser.parse_args()
+
+    _, interpreter_modules, _ = importtime(['-c', 'pass'])
+
+    import_ms, wall_ms, loaded = [], [], set()
+    for _ in range(args.r):
+        top_level, loaded, wall = importtime([CLI, '--help'])
+        import_ms.append(sum(
+            us for name, us in top_level.items()
+            if name not in interpreter_modules
+        ) / 1000)
+        wall_ms.append(wall * 1000)
+
+    median = statistics.median(import_ms)
+    print(f"runs:               {args.r}")
+    print(
+        f"CLI import time:    {median:7.1f} ms "
+        f"(median, target {args.target_ms:g} ms)"
+    )
+    print(f"wall time --help:   {statistics.median(wall_ms):7.1f} ms (median)")
+
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+    if median > args.target_ms:
+        print("FAIL: import time over target")
+    sys.exit(1 if eager or median > args.target_ms else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compare the aiohttp (HTTP/1.1) and http2 (httpx) fetch transports.
+
+Starts a local Hypercorn server that speaks both HTTP/1.1 and HTTP/2
+prior-knowledge (h2c) on one port, then fetches the same set of pages
+concurrently through each transport and reports throughput plus the number
+of TCP connections the server saw.
+
+Requires: pip install 'httpx[http2]' hypercorn
+
+Usage:
+    python benchmarks/bench_transport.py [-n REQUESTS] [-c CONCURRENCY]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from crawler_transport import AiohttpTransport, HTTP2Transport  # noqa: E402
+
+PAGE = (
+    b'<html><body>'
+    + b''.join(b'<a href="/page/%d">link</a>' % i for i in range(200))
+    + b'</body></html>'
+)
+
+
+class ConnectionCounter:
+    """ASGI app serving PAGE and counting distinct client connections."""
+
+    def __init__(self):
+        self.clients = set()
+
+    def reset(self):
+        self.clients.clear()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        self.clients.add(tuple(scope.get('client') or ()))
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/html; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': PAGE})
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run_transport(transport, urls, concurrency):
+    """Fetch urls with bounded concurrency; return elapsed seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url):
+        async with semaphore:
+            response = await transport.fetch(url, headers={})
+            assert response.status == 200, response.status
+
+    async with transport:
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch(url) for url in urls))
+        return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', type=int, default=2000, help='Requests per run')
+    parser.add_argument('-c', type=int, default=50, help='Concurrent requests')
+    args = parser.parse_args()
+
+    try:
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+    except ImportError:
+        sys.exit("This benchmark requires: pip install 'httpx[http2]' hypercorn")
+
+    app = ConnectionCounter()
+    port = free_port()
+    config = Config()
+    config.bind = [f'127.0.0.1:{port}']
+    config.accesslog = None
+    config.errorlog = None
+    shutdown = asyncio.Event()
+    server = asyncio.ensure_future(
+        serve(app, config, shutdown_trigger=shutdown.wait)
+    )
+    await asyncio.sleep(0.5)
+
+    urls = [f'http://127.0.0.1:{port}/page/{i}' for i in range(args.n)]
+    transports = [
+        AiohttpTransport(limit=args.c),
+        HTTP2Transport(limit=args.c, prior_knowledge=True),
+    ]
+
+    print(f"requests: {args.n}, concurrency: {args.c}")
+    try:
+        for transport in transports:
+            app.reset()
+            elapsed = await run_transport(transport, urls, args.c)
+            print(
+                f"{transport.name:8s} {args.n / elapsed:9.0f} req/s  "
+                f"{elapsed:6.2f}s  connections: {len(app.clients)}"
+            )
+    finally:
+        shutdown.set()
+        await server
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the per-link URL pipeline.
+
+Compares the original string-based pipeline (urljoin -> urlparse ->
+urlunparse, then two urlparse calls each for the domain and path checks)
+against the parse-once ParsedURL + CrawlScope pipeline.
+
+Usage:
+    python benchmarks/bench_url_pipeline.py [-n LINKS] [-r REPEATS]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from urllib.parse import urljoin, urlparse, urlunparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from crawler_scope import CrawlScope  # noqa: E402
+from crawler_urls import normalize_url  # noqa: E402
+
+BASE_URL = 'https://example.com/docs/index.html'
+
+
+def make_links(count):
+    """Build a realistic mix of relative, absolute and off-site links."""
+    links = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            links.append(f'/docs/page{i}.html')
+        elif kind == 1:
+            links.append(f'section/{i}?q={i}')
+        elif kind == 2:
+            links.append(f'https://example.com/docs/a/{i}')
+        elif kind == 3:
+            links.append(f'https://cdn.other.com/static/{i}.js')
+        else:
+            links.append(f'//example.com/docs/img/{i}.png')
+    return links
+
+
+def legacy_pipeline(links):
+    """The pre-ParsedURL pipeline, kept verbatim for comparison."""
+    kept = []
+    for raw in links:
+        url = raw
+        if url.startswith('//'):
+            url = 'https:' + url
+        elif not url.startswith(('http://', 'https://')):
+            url = urljoin(BASE_URL, url)
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            continue
+        url = urlunparse(parsed)
+        same_domain = urlparse(BASE_URL).netloc == urlparse(url).netloc
+        inside = urlparse(url).path.startswith(urlparse(BASE_URL).path)
+        if same_domain and inside:
+            kept.append(url)
+    return kept
+
+
+def parsed_pipeline(links, scope):
+    """The parse-once pipeline used by the crawler."""
+    candidates = []
+    for raw in links:
+        parsed = normalize_url(BASE_URL, raw)
+        if parsed is not None:
+            candidates.append((parsed, 'href'))
+    return [link.url for link, _ in scope.select(candidates)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', type=int, default=10000, help='Links per run')
+    parser.add_argument('-r', type=int, default=5, help='Timing repeats')
+    args = parser.parse_args()
+
+    links = make_links(args.n)
+    scope = CrawlScope.from_seed('https://example.com/docs/', inside=True)
+
+    legacy = min(timeit.repeat(
+        lambda: legacy_pipeline(links), number=1, repeat=args.r
+    ))
+    parsed = min(timeit.repeat(
+        lambda: parsed_pipeline(links, scope), number=1, repeat=args.r
+    ))
+
+    print(f"links per run:       {args.n}")
+    print(f"legacy pipeline:     {legacy / args.n * 1e6:8.2f} us/link")
+    print(f"ParsedURL pipeline:  {parsed / args.n * 1e6:8.2f} us/link")
+    print(f"speedup:             {legacy / parsed:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -37,6 +37,21 @@ EXPORT_FORMATS = {
         "extension": ".csv",
         "content_type": "text/csv", 
         "description": "CSV spreadsheet format"
+    },
+    "jsonl": {
+        "extension": ".jsonl",
+        "content_type": "application/x-ndjson",
+        "description": "JSON Lines, one result per line"
+    },
+    "sqlite": {
+        "extension": ".sqlite",
+        "content_type": "application/vnd.sqlite3",
+        "description": "SQLite database indexed on host and source"
+    },
+    "parquet": {
+        "extension": ".parquet",
+        "content_type": "application/vnd.apache.parquet",
+        "description": "Columnar Parquet file (requires pyarrow)"
     }
 }
 
@@ -90,10 +105,22 @@ SIZE_LIMITS = {
     "unlimited": -1
 }
 
-# Timeout presets (in seconds)
+# Timeout presets. Each phase of a fetch has its own limit, in seconds
+# (-1 for none): connect (TCP), tls (handshake), ttfb (until the response
+# headers, on top of the time connect and tls allow), read_idle (longest gap between body chunks) and total. A
+# response whose body arrives slower than min_rate bytes/sec is aborted.
 TIMEOUT_PRESETS = {
-    "fast": 10,
-    "normal": 30,
-    "slow": 60,
-    "none": -1
+    "fast": {
+        "total": 10, "connect": 3, "tls": 3, "ttfb": 5, "read_idle": 3,
+        "min_rate": 4096
+    },
+    "normal": {
+        "total": 30, "connect": 5, "tls": 5, "ttfb": 15, "read_idle": 10,
+        "min_rate": 1024
+    },
+    "slow": {
+        "total": 60, "connect": 10, "tls": 10, "ttfb": 30, "read_idle": 20,
+        "min_rate": 256
+    },
+    "none": {"total": -1}
 }
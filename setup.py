@@ -56,7 +56,17 @@ setup(
         ],
         "gui": [
             "tkinter",  # Usually included with Python
-        ]
+        ],
+        "http2": [
+            "httpx[http2]>=0.26",
+        ],
+        "compression": [
+            "brotli>=1.2",
+            "zstandard>=0.20",
+        ],
+        "uvloop": [
+            "uvloop>=0.17; sys_platform != 'win32'",
+        ],
     },
     entry_points={
         "console_scripts": [
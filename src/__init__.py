@@ -1,26 +1,43 @@
 """
 Python Web Crawler Package
 A comprehensive web crawling solution
+
+Public names are resolved lazily on first access, so importing the package
+does not pull in aiohttp or BeautifulSoup until a crawler is actually used.
 """
 
-try:
-    from .python_webcrawler import PythonWebCrawler, Result, parse_headers
-    from .webcrawler import UnifiedWebCrawler
-except ImportError:
-    # Handle relative import issues
-    import python_webcrawler
-    import webcrawler
-    PythonWebCrawler = python_webcrawler.PythonWebCrawler
-    Result = python_webcrawler.Result
-    parse_headers = python_webcrawler.parse_headers
-    UnifiedWebCrawler = webcrawler.UnifiedWebCrawler
+import importlib
+import os
+import sys
 
 __version__ = "1.0.0"
 __author__ = "Shubham"
 
-__all__ = [
-    "PythonWebCrawler",
-    "Result",
-    "parse_headers",
-    "UnifiedWebCrawler"
-]
+# The modules import each other as top-level modules (``from
+# python_webcrawler import ...``), so make them importable that way.
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SRC_DIR not in sys.path:
+    sys.path.append(_SRC_DIR)
+
+# Public name -> module that defines it
+_EXPORTS = {
+    "PythonWebCrawler": "python_webcrawler",
+    "Result": "python_webcrawler",
+    "parse_headers": "python_webcrawler",
+    "StreamlinedWebCrawler": "webcrawler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
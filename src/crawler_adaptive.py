@@ -0,0 +1,148 @@
+"""
+Adaptive per-host concurrency (AIMD).
+
+Each host starts at a small number of concurrent requests. Like TCP
+congestion control, the limit grows while responses stay fast and clean
+and is cut back as soon as the host pushes back:
+
+- slow start: +1 per successful response (doubling per round trip) until
+  the first sign of congestion
+- additive increase: afterwards +1 per limit's worth of successes
+- hold: no growth while the latency average exceeds LATENCY_TOLERANCE
+  times the best latency seen, since the host is queueing
+- multiplicative decrease: timeouts, connection errors, 5xx and 429 halve
+  the limit, at most once per round trip so one burst of failures does not
+  collapse it to the minimum
+
+Limits always stay within [min_limit, max_limit].
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+# Limit every host starts with, before the first response
+DEFAULT_INITIAL_LIMIT = 2
+# Factor applied to the limit on congestion
+DECREASE_FACTOR = 0.5
+# Latency average above best latency times this means the host is queueing
+LATENCY_TOLERANCE = 2.0
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.2
+# Lower bound on the interval between two decreases, in seconds
+MIN_DECREASE_INTERVAL = 0.5
+
+
+class _HostState:
+    __slots__ = (
+        'limit', 'in_flight', 'waiters', 'latency', 'best_latency',
+        'slow_start', 'last_decrease',
+    )
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.latency = 0.0
+        self.best_latency = 0.0
+        self.slow_start = True
+        self.last_decrease = 0.0
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limits, one per host."""
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("need 1 <= min_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.initial_limit = max(min_limit, min(max_limit, initial_limit))
+        self.decreases = 0
+        self._hosts: Dict[str, _HostState] = {}
+
+    def limit(self, host: str) -> int:
+        """Current concurrency limit for host."""
+        state = self._hosts.get(host)
+        return int(state.limit) if state else self.initial_limit
+
+    def limits(self) -> Dict[str, int]:
+        """Current limit of every host seen so far."""
+        return {host: int(state.limit) for host, state in self._hosts.items()}
+
+    def busiest(self, n: int = 5) -> List[Tuple[str, int, int]]:
+        """(host, in flight, limit) for the n hosts with most requests running."""
+        ranked = sorted(
+            self._hosts.items(), key=lambda item: -item[1].in_flight
+        )[:n]
+        return [
+            (host, state.in_flight, int(state.limit)) for host, state in ranked
+        ]
+
+    async def acquire(self, host: str):
+        """Wait for a free slot under host's current limit."""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_limit)
+        while state.in_flight >= int(state.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in state.waiters:
+                    state.waiters.remove(waiter)
+                else:
+                    # We were woken but will not use the slot; pass it on
+                    self._wake(state)
+                raise
+        state.in_flight += 1
+
+    def release(self, host: str, elapsed: float, failed: bool = False):
+        """Return a slot and adapt host's limit to the request outcome."""
+        state = self._hosts[host]
+        state.in_flight -= 1
+        if failed:
+            self._on_congestion(state)
+        else:
+            self._on_success(state, elapsed)
+        self._wake(state)
+
+    def _on_success(self, state: _HostState, elapsed: float):
+        if state.latency:
+            state.latency += LATENCY_ALPHA * (elapsed - state.latency)
+        else:
+            state.latency = elapsed
+        if not state.best_latency or elapsed < state.best_latency:
+            state.best_latency = elapsed
+        if state.latency > state.best_latency * LATENCY_TOLERANCE:
+            state.slow_start = False
+            return
+        if state.slow_start:
+            state.limit += 1
+        else:
+            state.limit += 1 / state.limit
+        state.limit = min(state.limit, self.max_limit)
+
+    def _on_congestion(self, state: _HostState):
+        state.slow_start = False
+        now = time.monotonic()
+        if now - state.last_decrease < max(state.latency, MIN_DECREASE_INTERVAL):
+            return
+        state.last_decrease = now
+        state.limit = max(self.min_limit, state.limit * DECREASE_FACTOR)
+        self.decreases += 1
+
+    def _wake(self, state: _HostState):
+        free = int(state.limit) - state.in_flight
+        while free > 0 and state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
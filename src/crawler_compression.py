@@ -0,0 +1,195 @@
+"""
+Content-Encoding negotiation and bounded streaming decompression.
+
+Transports read responses undecoded and pass the wire chunks through
+read_body(), which decompresses incrementally and aborts as soon as the
+decoded size passes the cap, so a small compressed "zip bomb" can never
+inflate into memory.
+"""
+
+import zlib
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Tuple
+
+# Decoded-size ceiling applied when no page size limit is configured
+DEFAULT_MAX_DECODED_SIZE = 50 * 1024 * 1024
+
+# Size of the chunks read from the network
+READ_CHUNK_SIZE = 64 * 1024
+
+# Largest decoded size of one zstd block, and the fewest bytes encoding one
+# (a 3-byte block header plus a single RLE byte)
+ZSTD_BLOCK_MAX = 128 * 1024
+ZSTD_MIN_BLOCK = 4
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body exceeds the configured size cap."""
+
+
+@lru_cache(maxsize=None)
+def _optional_codec(name: str):
+    """Import an optional codec module on first use, or return None."""
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    """The brotli module if it can cap its output (brotli >= 1.2), else None."""
+    module = _optional_codec('brotli')
+    if module is None or not hasattr(module.Decompressor, 'can_accept_more_data'):
+        return None
+    return module
+
+
+@lru_cache(maxsize=None)
+def accept_encoding() -> str:
+    """Accept-Encoding value listing every codec available here."""
+    encodings = ['gzip', 'deflate']
+    if _brotli() is not None:
+        encodings.append('br')
+    if _optional_codec('zstandard') is not None:
+        encodings.append('zstd')
+    return ', '.join(encodings)
+
+
+class _ZlibDecoder:
+    """gzip/deflate decoder that never inflates more than the cap allows."""
+
+    def __init__(self, encoding: str):
+        # 47 auto-detects gzip and zlib headers; raw deflate is retried below
+        self._raw_fallback = encoding == 'deflate'
+        self._obj = zlib.decompressobj(47)
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        try:
+            out = self._obj.decompress(data, limit + 1)
+        except zlib.error:
+            if not self._raw_fallback:
+                raise
+            # Some servers send headerless deflate streams
+            self._raw_fallback = False
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            out = self._obj.decompress(data, limit + 1)
+        return out
+
+    def has_pending(self) -> bool:
+        return bool(self._obj.unconsumed_tail)
+
+    def pending(self, limit: int) -> bytes:
+        return self._obj.decompress(self._obj.unconsumed_tail, limit + 1)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    """br decoder whose output per call is capped by output_buffer_limit."""
+
+    def __init__(self):
+        self._obj = _brotli().Decompressor()
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        return self._obj.process(data, output_buffer_limit=limit + 1)
+
+    def has_pending(self) -> bool:
+        return not self._obj.can_accept_more_data()
+
+    def pending(self, limit: int) -> bytes:
+        return self._obj.process(b'', output_buffer_limit=limit + 1)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class _ZstdDecoder:
+    """zstd decoder that feeds its input in slices sized to the cap.
+
+    The zstandard decompressobj has no output limit, but no zstd block
+    decodes to more than ZSTD_BLOCK_MAX bytes or is encoded in fewer than
+    ZSTD_MIN_BLOCK bytes. A slice of n input bytes therefore completes at
+    most n / ZSTD_MIN_BLOCK + 1 blocks, which bounds what one call returns.
+    """
+
+    def __init__(self):
+        self._obj = _optional_codec('zstandard').ZstdDecompressor().decompressobj()
+        self._tail = memoryview(b'')
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        self._tail = memoryview(data)
+        return self.pending(limit)
+
+    def has_pending(self) -> bool:
+        return bool(self._tail) and not self._obj.eof
+
+    def pending(self, limit: int) -> bytes:
+        step = max(1, limit // ZSTD_BLOCK_MAX) * ZSTD_MIN_BLOCK
+        piece, self._tail = self._tail[:step], self._tail[step:]
+        if self._obj.eof:
+            return b''
+        return self._obj.decompress(piece)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+def _decoder_for(content_encoding: Optional[str]):
+    """Return a streaming decoder, or None for identity encoding."""
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        return _ZlibDecoder(encoding)
+    if encoding == 'br' and _brotli() is not None:
+        return _BrotliDecoder()
+    if encoding == 'zstd' and _optional_codec('zstandard') is not None:
+        return _ZstdDecoder()
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+async def read_body(
+    chunks: AsyncIterator[bytes],
+    content_encoding: Optional[str],
+    max_size: Optional[int] = None
+) -> Tuple[bytes, int]:
+    """Read and decode a streamed body.
+
+    Returns (decoded body, bytes received on the wire). Raises
+    ResponseTooLarge once the decoded size exceeds max_size, or
+    DEFAULT_MAX_DECODED_SIZE when no limit is given.
+    """
+    limit = max_size if max_size else DEFAULT_MAX_DECODED_SIZE
+    decoder = _decoder_for(content_encoding)
+    parts = []
+    wire_bytes = 0
+    decoded_bytes = 0
+
+    async for chunk in chunks:
+        wire_bytes += len(chunk)
+        if decoder is None:
+            out = chunk
+        else:
+            out = decoder.decompress(chunk, limit - decoded_bytes)
+        while True:
+            decoded_bytes += len(out)
+            if decoded_bytes > limit:
+                raise ResponseTooLarge(
+                    f"decoded body exceeds {limit} bytes "
+                    f"after {wire_bytes} wire bytes"
+                )
+            parts.append(out)
+            if decoder is None or not decoder.has_pending():
+                break
+            out = decoder.pending(limit - decoded_bytes)
+
+    if decoder is not None:
+        tail = decoder.flush()
+        decoded_bytes += len(tail)
+        if decoded_bytes > limit:
+            raise ResponseTooLarge(f"decoded body exceeds {limit} bytes")
+        parts.append(tail)
+
+    return b''.join(parts), wire_bytes
@@ -0,0 +1,122 @@
+"""
+Response decoding - turns raw response bytes into text only when needed.
+
+Charset sniffing libraries are slow on large pages, so encodings are taken
+from the Content-Type header, a byte-order mark or a <meta charset> hint,
+and whatever a host used last time is remembered for its next page.
+"""
+
+import codecs
+import re
+from typing import Dict, Optional
+
+# How far into the document to look for a <meta charset> declaration
+META_SNIFF_BYTES = 2048
+
+# Upper bound on hosts remembered by a single EncodingDetector
+_HOST_CACHE_LIMIT = 10000
+
+_META_CHARSET = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE
+)
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def _known_encoding(name: Optional[str]) -> Optional[str]:
+    """Return the canonical codec name, or None if Python doesn't know it."""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+class PageBody:
+    """Raw response bytes plus the encoding to decode them with.
+
+    Byte-oriented consumers read ``raw`` directly; ``text`` is decoded on
+    first access and cached. ``url`` is the final URL the body was served
+    from, after any redirects.
+    """
+
+    __slots__ = ('raw', 'encoding', 'url', '_text')
+
+    def __init__(self, raw: bytes, encoding: str, url: Optional[str] = None):
+        self.raw = raw
+        self.encoding = encoding
+        self.url = url
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Decoded text, produced lazily."""
+        if self._text is None:
+            self._text = self.raw.decode(self.encoding, errors='replace')
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __bool__(self) -> bool:
+        return bool(self.raw)
+
+
+class EncodingDetector:
+    """Hint-driven encoding detection with a per-host cache."""
+
+    def __init__(self, default: str = 'utf-8'):
+        self.default = default
+        self._host_encodings: Dict[str, str] = {}
+
+    def detect(
+        self, host: str, raw: bytes, header_charset: Optional[str] = None
+    ) -> str:
+        """Pick the encoding for a response body without charset sniffing."""
+        encoding = _known_encoding(header_charset)
+        if encoding is None:
+            encoding = self._sniff(raw)
+        if encoding is None:
+            encoding = self._host_encodings.get(host)
+        if encoding is None:
+            encoding = self._guess(raw)
+
+        if (
+            host in self._host_encodings
+            or len(self._host_encodings) < _HOST_CACHE_LIMIT
+        ):
+            self._host_encodings[host] = encoding
+        return encoding
+
+    def _sniff(self, raw: bytes) -> Optional[str]:
+        """Look for a byte-order mark or <meta charset> near the start."""
+        for bom, encoding in _BOMS:
+            if raw.startswith(bom):
+                return encoding
+        match = _META_CHARSET.search(raw, 0, META_SNIFF_BYTES)
+        if match:
+            return _known_encoding(match.group(1).decode('ascii', 'ignore'))
+        return None
+
+    def _guess(self, raw: bytes) -> str:
+        """Fall back to the default, or cp1252 if that cannot decode."""
+        try:
+            raw.decode(self.default)
+        except UnicodeDecodeError:
+            return 'cp1252'
+        return self.default
+
+    def body(
+        self,
+        host: str,
+        raw: bytes,
+        header_charset: Optional[str] = None,
+        url: Optional[str] = None
+    ) -> PageBody:
+        """Wrap raw bytes in a PageBody with the detected encoding."""
+        return PageBody(raw, self.detect(host, raw, header_charset), url)
@@ -0,0 +1,188 @@
+"""
+DNS resolution for the crawler's connector.
+
+CachingResolver wraps aiohttp's default resolver (the c-ares based
+AsyncResolver when aiodns is installed, so lookups stay off the default
+executor) with a TTL cache shared between crawler instances, concurrent
+lookup coalescing, static host overrides and background prefetching.
+"""
+
+import asyncio
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+CacheKey = Tuple[str, int, int]
+
+# Seconds a successful lookup is reused. getaddrinfo does not expose record
+# TTLs, so this is the ceiling applied to every entry.
+DEFAULT_DNS_TTL = 300
+
+# Seconds a failed lookup is remembered, so dead hosts are not re-queried
+# for every link pointing at them
+NEGATIVE_DNS_TTL = 30
+
+_NUMERIC_FLAGS = socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+
+
+class DNSCache:
+    """Process-wide store of resolved addresses with expiry times."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: Dict[CacheKey, Tuple[float, object]] = {}
+
+    def get(self, key: CacheKey):
+        """Return cached addresses or exception, or None if absent/expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: CacheKey, value, ttl: float):
+        """Store addresses (or the lookup error) for ttl seconds."""
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            self._evict()
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def _evict(self):
+        """Drop expired entries, or the oldest one if none have expired."""
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self._entries.items() if exp < now]
+        for key in expired:
+            del self._entries[key]
+        if not expired and self._entries:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every resolver that is not given its own cache
+SHARED_DNS_CACHE = DNSCache()
+
+
+class CachingResolver(AbstractResolver):
+    """aiohttp resolver with a shared TTL cache, overrides and prefetching."""
+
+    def __init__(
+        self,
+        overrides: Optional[Dict[str, str]] = None,
+        ttl: float = DEFAULT_DNS_TTL,
+        negative_ttl: float = NEGATIVE_DNS_TTL,
+        cache: Optional[DNSCache] = None,
+        resolver: Optional[AbstractResolver] = None
+    ):
+        self.overrides = {
+            host.lower(): address for host, address in (overrides or {}).items()
+        }
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = cache if cache is not None else SHARED_DNS_CACHE
+        self._resolver = resolver
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._prefetches: set = set()
+        self.lookups = 0
+        self.cache_hits = 0
+
+    def _upstream(self) -> AbstractResolver:
+        """Create the wrapped resolver lazily, inside the running loop."""
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        return self._resolver
+
+    def _override(self, host: str, port: int) -> Optional[List[Dict]]:
+        address = self.overrides.get(host.lower())
+        if address is None:
+            return None
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        return [{
+            'hostname': host, 'host': address, 'port': port,
+            'family': family, 'proto': 0, 'flags': _NUMERIC_FLAGS,
+        }]
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> List[Dict]:
+        """Resolve host, serving from overrides and the cache when possible."""
+        overridden = self._override(host, port)
+        if overridden is not None:
+            return overridden
+
+        key = (host.lower(), port, int(family))
+        while True:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                if isinstance(cached, Exception):
+                    raise cached
+                return cached
+
+            # Coalesce concurrent lookups of the same host
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The lookup we joined was cancelled, not us; look it up
+                # ourselves
+                if not inflight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.lookups += 1
+        try:
+            addresses = await self._upstream().resolve(host, port, family)
+        except OSError as e:
+            self.cache.set(key, e, self.negative_ttl)
+            future.set_exception(e)
+            # Mark retrieved so unawaited failures are not logged
+            future.exception()
+            raise
+        except BaseException as e:
+            future.cancel()
+            raise e
+        else:
+            self.cache.set(key, addresses, self.ttl)
+            future.set_result(addresses)
+            return addresses
+        finally:
+            del self._inflight[key]
+
+    def prefetch(self, host: str, port: int = 0, family: int = 0):
+        """Warm the cache for host in the background, ignoring failures."""
+        if self._override(host, port) is not None:
+            return
+        key = (host.lower(), port, int(family))
+        if key in self._inflight or self.cache.get(key) is not None:
+            return
+        task = asyncio.ensure_future(self._prefetch(host, port, family))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, host: str, port: int, family: int):
+        try:
+            await self.resolve(host, port, family)
+        except OSError:
+            pass
+
+    async def close(self):
+        """Cancel pending prefetches and close the wrapped resolver."""
+        for task in list(self._prefetches):
+            task.cancel()
+        if self._prefetches:
+            await asyncio.gather(*self._prefetches, return_exceptions=True)
+        if self._resolver is not None:
+            await self._resolver.close()
@@ -0,0 +1,278 @@
+"""
+Streaming result exporters.
+
+Every exporter consumes any iterable of Result objects (a list, or the
+iterator returned by crawler.iter_crawl() wrapped in a plain iterable) and
+writes it incrementally, without building per-row dicts for the whole crawl
+up front:
+
+- ``txt``: one URL per line
+- ``json``: a JSON array (same layout as before)
+- ``csv``: URL, Source, Where columns
+- ``jsonl``: one JSON object per line
+- ``sqlite``: a ``results`` table indexed on host and source
+- ``parquet``: columnar Parquet file (requires ``pip install pyarrow``)
+
+Unique-mode records (UniqueResult) add their first parent page, the source
+types the URL was found as and its occurrence count to every format but
+txt; the layout follows the first result exported.
+"""
+
+import csv
+import sqlite3
+from itertools import chain, islice
+from json.encoder import encode_basestring
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Rows written per transaction / record batch
+DEFAULT_BATCH_SIZE = 50000
+
+
+def result_host(url: str) -> str:
+    """Host of a result URL, without userinfo or port."""
+    netloc = url.split('://', 1)[-1].split('/', 1)[0]
+    host = netloc.rpartition('@')[2]
+    if host.startswith('['):
+        return host.split(']', 1)[0] + ']'
+    return host.split(':', 1)[0].lower()
+
+
+def _layout(results: Iterable) -> Tuple[bool, Iterator]:
+    """(whether results are unique-mode records, the same results)."""
+    iterator = iter(results)
+    for first in iterator:
+        return hasattr(first, 'sources'), chain((first,), iterator)
+    return False, iterator
+
+
+def _batches(results: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(results)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_txt(results: Iterable, path: str) -> int:
+    """Write one URL per line."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(f"{result.url}\n")
+            count += 1
+    return count
+
+
+# Result fields are always strings, so rows are formatted directly with the
+# json module's string escaper instead of building a dict per result
+_JSON_ITEM = (
+    '\n  {\n    "url": %s,\n    "source": %s,\n    "where": %s\n  }'
+)
+_JSON_UNIQUE_ITEM = (
+    '\n  {\n    "url": %s,\n    "source": %s,\n    "where": %s,'
+    '\n    "parent": %s,\n    "sources": [\n      %s\n    ],'
+    '\n    "count": %d\n  }'
+)
+_JSONL_ROW = '{"url":%s,"source":%s,"where":%s}\n'
+_JSONL_UNIQUE_ROW = (
+    '{"url":%s,"source":%s,"where":%s,"parent":%s,"sources":[%s],"count":%d}\n'
+)
+
+
+def _json_fields(result) -> tuple:
+    return (
+        encode_basestring(result.url),
+        encode_basestring(result.source or ''),
+        encode_basestring(result.where or ''),
+    )
+
+
+def _json_unique_fields(result, separator: str) -> tuple:
+    return _json_fields(result) + (
+        encode_basestring(result.parent or ''),
+        separator.join(encode_basestring(s) for s in result.sources),
+        result.count,
+    )
+
+
+def _sources_cell(result) -> str:
+    return ','.join(result.sources)
+
+
+def export_json(results: Iterable, path: str) -> int:
+    """Write an indented JSON array, one item at a time."""
+    unique, results = _layout(results)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for result in results:
+            if count:
+                f.write(',')
+            if unique:
+                f.write(_JSON_UNIQUE_ITEM % _json_unique_fields(result, ',\n      '))
+            else:
+                f.write(_JSON_ITEM % _json_fields(result))
+            count += 1
+        f.write('\n]' if count else ']')
+    return count
+
+
+def export_csv(results: Iterable, path: str) -> int:
+    """Write URL, Source and Where columns (plus Parent, Sources, Count)."""
+    unique, results = _layout(results)
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        header = ['URL', 'Source', 'Where']
+        if unique:
+            header += ['Parent', 'Sources', 'Count']
+        writer.writerow(header)
+        for result in results:
+            row = [
+                result.url,
+                getattr(result, 'source', ''),
+                getattr(result, 'where', '')
+            ]
+            if unique:
+                row += [result.parent, _sources_cell(result), result.count]
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_jsonl(results: Iterable, path: str) -> int:
+    """Write one compact JSON object per line."""
+    unique, results = _layout(results)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for batch in _batches(results, DEFAULT_BATCH_SIZE):
+            if unique:
+                f.writelines(
+                    _JSONL_UNIQUE_ROW % _json_unique_fields(r, ',') for r in batch
+                )
+            else:
+                f.writelines(_JSONL_ROW % _json_fields(r) for r in batch)
+            count += len(batch)
+    return count
+
+
+def export_sqlite(
+    results: Iterable, path: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Write a ``results`` table, indexed on host and source.
+
+    Rows are inserted in large transactions before the indexes are built,
+    which is much faster than maintaining the indexes row by row. Unique
+    records add parent, sources (comma-separated) and count columns.
+    """
+    unique, results = _layout(results)
+    count = 0
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('DROP TABLE IF EXISTS results')
+        columns = 'url TEXT NOT NULL, source TEXT, "where" TEXT, host TEXT'
+        if unique:
+            columns += ', parent TEXT, sources TEXT, "count" INTEGER'
+        conn.execute(f'CREATE TABLE results ({columns})')
+        insert = 'INSERT INTO results VALUES (%s)' % ', '.join(
+            '?' * (7 if unique else 4)
+        )
+        for batch in _batches(results, batch_size):
+            if unique:
+                rows = [
+                    (r.url, r.source, r.where, result_host(r.url),
+                     r.parent, _sources_cell(r), r.count)
+                    for r in batch
+                ]
+            else:
+                rows = [
+                    (r.url, r.source, r.where, result_host(r.url))
+                    for r in batch
+                ]
+            with conn:
+                conn.executemany(insert, rows)
+            count += len(batch)
+        with conn:
+            conn.execute('CREATE INDEX idx_results_host ON results (host)')
+            conn.execute('CREATE INDEX idx_results_source ON results (source)')
+    finally:
+        conn.close()
+    return count
+
+
+def export_parquet(
+    results: Iterable, path: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Write a columnar Parquet file in record batches."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires pyarrow: pip install pyarrow"
+        ) from e
+
+    unique, results = _layout(results)
+    fields = [
+        ('url', pa.string()),
+        ('source', pa.string()),
+        ('where', pa.string()),
+        ('host', pa.string()),
+    ]
+    if unique:
+        fields += [
+            ('parent', pa.string()),
+            ('sources', pa.list_(pa.string())),
+            ('count', pa.int64()),
+        ]
+    schema = pa.schema(fields)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in _batches(results, batch_size):
+            columns = [
+                [r.url for r in batch],
+                [r.source for r in batch],
+                [r.where for r in batch],
+                [result_host(r.url) for r in batch],
+            ]
+            if unique:
+                columns += [
+                    [r.parent for r in batch],
+                    [list(r.sources) for r in batch],
+                    [r.count for r in batch],
+                ]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            count += len(batch)
+    return count
+
+
+# Format name -> (file extension, exporter)
+EXPORTERS: Dict[str, tuple] = {
+    'txt': ('.txt', export_txt),
+    'json': ('.json', export_json),
+    'csv': ('.csv', export_csv),
+    'jsonl': ('.jsonl', export_jsonl),
+    'sqlite': ('.sqlite', export_sqlite),
+    'parquet': ('.parquet', export_parquet),
+}
+
+
+def export_results(results: Iterable, path_stem: str, export_format: str) -> str:
+    """Export results as export_format to path_stem + extension.
+
+    Returns the path written.
+    """
+    try:
+        extension, exporter = EXPORTERS[export_format]
+    except KeyError:
+        raise ValueError(
+            f"Unknown export format {export_format!r}; "
+            f"choose from {', '.join(EXPORTERS)}"
+        ) from None
+    path = path_stem + extension
+    exporter: Callable[[Iterable, str], int]
+    exporter(results, path)
+    return path
@@ -0,0 +1,118 @@
+"""
+Single-flight page loads with a small LRU, shared per transport.
+
+Crawlers that share a transport (headless jobs, or several crawlers run
+side by side on one session) often want the same page at the same time,
+e.g. a common landing or navigation page. PageCache makes each page load
+(fetch plus link extraction) happen once:
+
+- single flight: while a load for a key is running, other callers wait
+  for it and share its result instead of starting their own
+- LRU: recently loaded pages are kept, up to max_entries and max_bytes,
+  and served to later callers without touching the network
+
+Failed loads are shared with the callers already waiting but never cached.
+If the loading task is cancelled, a waiting caller starts the load itself.
+"""
+
+import weakref
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Tuple
+)
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Pages kept per transport
+DEFAULT_MAX_ENTRIES = 128
+# Approximate bytes of pages kept per transport
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# How a load was served
+FETCHED = 'fetched'
+COALESCED = 'coalesced'
+CACHED = 'cached'
+
+
+class PageCache:
+    """Coalesces concurrent loads of a key and keeps recent results."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        weigh: Callable[[Any], int] = lambda value: 1
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self.bytes = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self._inflight: Dict[Hashable, 'asyncio.Future'] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, str]:
+        """Return (value, how) for key, running loader at most once at a time.
+
+        how is FETCHED when loader ran for this call, COALESCED when the
+        call joined a load already running, and CACHED for an LRU hit.
+        """
+        import asyncio
+
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0], CACHED
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future), COALESCED
+            except asyncio.CancelledError:
+                # The loading task went away; load it ourselves
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(value)
+        if value is not None:
+            self._store(key, value)
+        return value, FETCHED
+
+    def _store(self, key: Hashable, value: Any):
+        size = self.weigh(value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+
+# Transport -> its PageCache; entries go away with the transport
+_caches: 'weakref.WeakKeyDictionary[Any, PageCache]' = weakref.WeakKeyDictionary()
+
+
+def shared_page_cache(transport, **kwargs) -> PageCache:
+    """The PageCache of transport, created with kwargs on first use."""
+    cache = _caches.get(transport)
+    if cache is None:
+        cache = _caches[transport] = PageCache(**kwargs)
+    return cache
@@ -0,0 +1,192 @@
+"""
+Memory-governed crawl frontier that spills to disk.
+
+SpillingFrontier is an asyncio.Queue whose storage keeps at most
+memory_items entries in RAM. Once that is exceeded, or the process RSS
+passes the MemoryGovernor's ceiling, the cold end of the queue (the most
+recently discovered links, which a FIFO crawl reaches last) is written to
+disk segments, and every link discovered after that goes to disk too, so
+discovery stops growing the heap. Segments are streamed back in order as
+workers drain the in-memory part, keeping the crawl order FIFO.
+
+Entries are (ParsedURL, depth, source_url, CrawlScope) tuples; on disk a
+scope is stored as an index into the frontier's scope table.
+"""
+
+import asyncio
+import gc
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from crawler_urls import ParsedURL
+
+# Entries kept in RAM before the frontier starts spilling
+DEFAULT_MEMORY_ITEMS = 100000
+# Entries left in RAM when memory pressure forces a spill
+LOW_WATER_ITEMS = 1000
+# Entries per disk segment
+SEGMENT_ITEMS = 50000
+# RSS is sampled once per this many queued entries
+RSS_CHECK_INTERVAL = 1000
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if it can be read."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class MemoryGovernor:
+    """Tells the frontier when the process is over its memory ceiling."""
+
+    def __init__(self, limit_bytes: int, check_interval: int = RSS_CHECK_INTERVAL):
+        self.limit_bytes = limit_bytes
+        self.check_interval = check_interval
+        self.peak_rss = 0
+        self._calls = 0
+        self._over = False
+
+    def over_limit(self) -> bool:
+        """Sampled check of RSS against the ceiling."""
+        self._calls += 1
+        if self._calls >= self.check_interval:
+            self._calls = 0
+            rss = current_rss()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss, rss)
+                over = rss > self.limit_bytes
+                if over and not self._over:
+                    # Give freed objects back before deciding how bad it is
+                    gc.collect()
+                self._over = over
+        return self._over
+
+
+class SpillingFrontier(asyncio.Queue):
+    """FIFO crawl frontier with a bounded in-memory part."""
+
+    def __init__(
+        self,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        governor: Optional[MemoryGovernor] = None,
+        spill_dir: Optional[str] = None
+    ):
+        self.memory_items = memory_items
+        self.governor = governor
+        self._spill_root = spill_dir
+        self._dir: Optional[str] = None
+        self._segments: Deque[str] = deque()
+        self._pending: List[list] = []
+        self._disk_items = 0
+        self._scopes: List = []
+        self._scope_ids: Dict[int, int] = {}
+        self.spilled = 0
+        self.segments_written = 0
+        super().__init__()
+
+    # asyncio.Queue storage hooks
+
+    def _init(self, maxsize):
+        self._queue: Deque[tuple] = deque()
+
+    def _put(self, item):
+        if self._spilling():
+            self._pending.append(self._encode(item))
+            self._disk_items += 1
+            if len(self._pending) >= SEGMENT_ITEMS:
+                self._write_segment()
+            return
+        self._queue.append(item)
+        over_memory = self.governor is not None and self.governor.over_limit()
+        if len(self._queue) > self.memory_items or over_memory:
+            keep = LOW_WATER_ITEMS if over_memory else self.memory_items // 2
+            self._spill_tail(keep)
+
+    def _get(self):
+        if not self._queue:
+            self._refill()
+        return self._queue.popleft()
+
+    def qsize(self) -> int:
+        return len(self._queue) + self._disk_items
+
+    def empty(self) -> bool:
+        return not self._queue and not self._disk_items
+
+    def close(self):
+        """Delete the spill directory."""
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        self._segments.clear()
+        self._pending = []
+        self._disk_items = 0
+
+    # Spilling
+
+    def _spilling(self) -> bool:
+        return bool(self._disk_items)
+
+    def _spill_tail(self, keep: int):
+        """Move all but the first keep in-memory entries to disk."""
+        tail = []
+        while len(self._queue) > keep:
+            tail.append(self._queue.pop())
+        tail.reverse()
+        self._pending.extend(self._encode(item) for item in tail)
+        self._disk_items += len(tail)
+        self.spilled += len(tail)
+        self._write_segment()
+
+    def _write_segment(self):
+        if not self._pending:
+            return
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(
+                prefix='crawler-frontier-', dir=self._spill_root
+            )
+        path = os.path.join(self._dir, f"{self.segments_written:08d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(
+                json.dumps(entry, ensure_ascii=False) + '\n'
+                for entry in self._pending
+            )
+        self.segments_written += 1
+        self._segments.append(path)
+        self._pending = []
+
+    def _refill(self):
+        """Load the oldest spilled entries back into memory."""
+        if self._segments:
+            path = self._segments.popleft()
+            with open(path, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f]
+            os.remove(path)
+        else:
+            entries, self._pending = self._pending, []
+        self._disk_items -= len(entries)
+        self._queue.extend(self._decode(entry) for entry in entries)
+
+    def _encode(self, item: tuple) -> list:
+        url, depth, source_url, scope = item
+        scope_id = self._scope_ids.get(id(scope))
+        if scope_id is None:
+            scope_id = self._scope_ids[id(scope)] = len(self._scopes)
+            self._scopes.append(scope)
+        return [url.url, depth, source_url, scope_id]
+
+    def _decode(self, entry: list) -> tuple:
+        url, depth, source_url, scope_id = entry
+        return (ParsedURL.parse(url), depth, source_url, self._scopes[scope_id])
@@ -0,0 +1,210 @@
+"""
+Link graph - every crawled edge in compact, integer-indexed storage.
+
+URLs are interned once as integer node IDs. Edges are appended to flat
+unsigned-int arrays (plus one byte for the link kind), which costs about
+5 bytes per edge instead of a string pair. The arrays are packed into a
+CSR (compressed sparse row) adjacency on demand for traversal and
+in-degree statistics, and can be exported as an edge list or GraphML.
+"""
+
+import heapq
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GRAPH_FORMATS = ('edgelist', 'graphml')
+
+
+class LinkGraph:
+    """Directed page -> link graph with integer node IDs."""
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # Shallowest depth at which each node was discovered
+        self.depths = array('i')
+        self.kinds: List[str] = []
+        self._kind_ids: Dict[str, int] = {}
+        self._sources = array('I')
+        self._targets = array('I')
+        self._edge_kinds = array('B')
+        self._csr: Optional[Tuple[array, array]] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.urls)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._sources)
+
+    def node_id(self, url: str, depth: int = 0) -> int:
+        """Intern url, keeping the shallowest depth seen for it."""
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self.urls)
+            self.urls.append(url)
+            self.depths.append(depth)
+        elif depth < self.depths[node]:
+            self.depths[node] = depth
+        return node
+
+    def _kind_id(self, kind: str) -> int:
+        kind_id = self._kind_ids.get(kind)
+        if kind_id is None:
+            kind_id = self._kind_ids[kind] = len(self.kinds)
+            self.kinds.append(kind)
+        return kind_id
+
+    def add_page(self, url: str, depth: int, links: Iterable[Tuple[str, str]]):
+        """Record the (target url, kind) links found on a page at depth.
+
+        A target linked several times from the same page is one edge.
+        """
+        source = self.node_id(url, depth)
+        seen = set()
+        for target_url, kind in links:
+            target = self.node_id(target_url, depth + 1)
+            if target in seen:
+                continue
+            seen.add(target)
+            self._sources.append(source)
+            self._targets.append(target)
+            self._edge_kinds.append(self._kind_id(kind))
+        if seen:
+            self._csr = None
+
+    def csr(self) -> Tuple[array, array]:
+        """Return the CSR adjacency as (offsets, targets) arrays.
+
+        Node n links to targets[offsets[n]:offsets[n + 1]].
+        """
+        if self._csr is None:
+            offsets = array('Q', bytes(8 * (self.node_count + 1)))
+            for source in self._sources:
+                offsets[source + 1] += 1
+            for node in range(self.node_count):
+                offsets[node + 1] += offsets[node]
+            # Counting sort of the edge targets by source node
+            position = array('Q', offsets[:-1])
+            targets = array('I', bytes(4 * self.edge_count))
+            for source, target in zip(self._sources, self._targets):
+                targets[position[source]] = target
+                position[source] += 1
+            self._csr = (offsets, targets)
+        return self._csr
+
+    def successors(self, url: str) -> List[str]:
+        """URLs linked from url."""
+        node = self._ids.get(url)
+        if node is None:
+            return []
+        offsets, targets = self.csr()
+        return [self.urls[t] for t in targets[offsets[node]:offsets[node + 1]]]
+
+    def in_degree(self) -> array:
+        """Number of distinct pages linking to each node, by node ID."""
+        degrees = array('I', bytes(4 * self.node_count))
+        for target in self._targets:
+            degrees[target] += 1
+        return degrees
+
+    def out_degree(self) -> array:
+        """Number of distinct links on each node, by node ID."""
+        offsets, _ = self.csr()
+        return array('I', (
+            offsets[node + 1] - offsets[node] for node in range(self.node_count)
+        ))
+
+    def top_hubs(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The n most linked-to URLs with their in-degree."""
+        degrees = self.in_degree()
+        top = heapq.nlargest(n, range(self.node_count), key=degrees.__getitem__)
+        return [(self.urls[node], degrees[node]) for node in top]
+
+    def depth_histogram(self) -> Dict[int, int]:
+        """Number of nodes first discovered at each depth."""
+        return dict(sorted(Counter(self.depths).items()))
+
+    def stats(self, top: int = 10) -> Dict:
+        """Summary statistics for the crawl graph."""
+        degrees = self.in_degree()
+        return {
+            'nodes': self.node_count,
+            'edges': self.edge_count,
+            'max_in_degree': max(degrees, default=0),
+            'mean_in_degree': (
+                self.edge_count / self.node_count if self.urls else 0.0
+            ),
+            'depths': self.depth_histogram(),
+            'top_hubs': self.top_hubs(top),
+        }
+
+    def format_stats(self, top: int = 10) -> str:
+        """Human-readable summary of stats()."""
+        stats = self.stats(top)
+        lines = [
+            f"graph_nodes: {stats['nodes']}",
+            f"graph_edges: {stats['edges']}",
+            f"graph_mean_in_degree: {stats['mean_in_degree']:.2f}",
+        ]
+        lines.extend(
+            f"graph_depth_{depth}: {count}"
+            for depth, count in stats['depths'].items()
+        )
+        lines.extend(
+            f"hub: {degree} {url}" for url, degree in stats['top_hubs']
+        )
+        return '\n'.join(lines)
+
+    def write_edgelist(self, path: str) -> int:
+        """Write one tab-separated ``source target kind`` line per edge."""
+        urls, kinds = self.urls, self.kinds
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(
+                f"{urls[s]}\t{urls[t]}\t{kinds[k]}\n"
+                for s, t, k in zip(self._sources, self._targets, self._edge_kinds)
+            )
+        return self.edge_count
+
+    def write_graphml(self, path: str) -> int:
+        """Write the graph as GraphML with url/depth node and kind edge data."""
+        # saxutils pulls in urllib.request (and ssl), so import it on use
+        from xml.sax.saxutils import escape
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                '  <key id="url" for="node" attr.name="url" attr.type="string"/>\n'
+                '  <key id="depth" for="node" attr.name="depth" attr.type="int"/>\n'
+                '  <key id="kind" for="edge" attr.name="kind" attr.type="string"/>\n'
+                '  <graph id="crawl" edgedefault="directed">\n'
+            )
+            f.writelines(
+                f'    <node id="n{node}"><data key="url">{escape(url)}'
+                f'</data><data key="depth">{self.depths[node]}</data></node>\n'
+                for node, url in enumerate(self.urls)
+            )
+            kinds = [escape(kind) for kind in self.kinds]
+            f.writelines(
+                f'    <edge source="n{s}" target="n{t}">'
+                f'<data key="kind">{kinds[k]}</data></edge>\n'
+                for s, t, k in zip(self._sources, self._targets, self._edge_kinds)
+            )
+            f.write('  </graph>\n</graphml>\n')
+        return self.edge_count
+
+    def write(self, path: str, graph_format: Optional[str] = None) -> int:
+        """Write the graph; the format defaults to GraphML for .graphml paths."""
+        if graph_format is None:
+            graph_format = 'graphml' if path.endswith('.graphml') else 'edgelist'
+        if graph_format not in GRAPH_FORMATS:
+            raise ValueError(
+                f"Unknown graph format {graph_format!r}; "
+                f"choose from {', '.join(GRAPH_FORMATS)}"
+            )
+        if graph_format == 'graphml':
+            return self.write_graphml(path)
+        return self.write_edgelist(path)
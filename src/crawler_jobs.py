@@ -0,0 +1,394 @@
+"""
+Headless job runner - config-file driven crawls for unattended use.
+
+A job file (TOML or JSON) lists one or more crawl jobs. Each job starts
+from DEFAULT_CRAWLER_CONFIG, applies the named presets from
+config/default_config.py, then any explicit crawler options:
+
+    [defaults]
+    preset = "quick"            # GUI_PRESETS
+    size_limit = "medium"       # SIZE_LIMITS
+    timeout_preset = "normal"   # TIMEOUT_PRESETS
+    format = "json"
+
+    [[jobs]]
+    name = "example"
+    urls = ["https://example.com"]
+    preset = "deep"
+    subs = true
+
+All jobs run back to back on one event loop, and jobs with the same
+transport settings share one resolver and one connection pool.
+"""
+
+import importlib.util
+import inspect
+import json
+import os
+import sys
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from crawler_dns import CachingResolver
+from crawler_loop import run_event_loop
+from crawler_proxy import PROXY_STRATEGIES, parse_proxies
+from crawler_timeouts import FetchTimeouts
+from crawler_transport import TRANSPORTS, Transport
+from python_webcrawler import PythonWebCrawler
+
+# Process exit codes for headless runs
+EXIT_OK = 0
+EXIT_NO_RESULTS = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', 'config', 'default_config.py'
+)
+
+# Keys accepted by PythonWebCrawler that a job file may set directly
+CRAWLER_OPTIONS = frozenset(inspect.signature(PythonWebCrawler).parameters)
+
+# Options annotated with a plain bool/int/float/str type, and that type
+_OPTION_TYPES = {
+    name: parameter.annotation
+    for name, parameter in inspect.signature(PythonWebCrawler).parameters.items()
+    if parameter.annotation in (bool, int, float, str)
+}
+
+# Job keys that are not crawler options
+JOB_KEYS = frozenset({
+    'name', 'urls', 'preset', 'size_limit', 'timeout_preset',
+    'format', 'output_dir', 'filename',
+})
+
+# GUI_PRESETS field -> crawler option
+_PRESET_FIELDS = {
+    'depth': 'max_depth',
+    'threads': 'max_threads',
+    'timeout': 'timeout',
+    'headers': 'custom_headers',
+}
+
+
+class JobConfigError(ValueError):
+    """Raised for unreadable job files or invalid job definitions."""
+
+
+class Job:
+    """A resolved crawl job: seed URLs, crawler options and output spec."""
+
+    def __init__(
+        self,
+        name: str,
+        urls: List[str],
+        options: Dict[str, Any],
+        export_format: str = 'txt',
+        output_dir: Optional[str] = None,
+        filename: Optional[str] = None
+    ):
+        self.name = name
+        self.urls = urls
+        self.options = options
+        self.export_format = export_format
+        # None exports to the runner's default directory (<repo>/output)
+        self.output_dir = output_dir
+        self.filename = filename or name
+
+    def transport_key(self) -> Tuple:
+        """Settings that must match for jobs to share a connection pool."""
+        return (
+            self.options.get('transport', 'aiohttp'),
+            # Sets the connection limit of the pool
+            self.options.get('max_threads'),
+            bool(self.options.get('insecure')),
+            FetchTimeouts.coerce(self.options.get('timeout')),
+            tuple(sorted((self.options.get('host_overrides') or {}).items())),
+            tuple(parse_proxies(self.options.get('proxy'))),
+            self.options.get('proxy_strategy', 'round_robin'),
+            self.options.get('proxy_concurrency'),
+            self.options.get('proxy_max_failures'),
+            self.options.get('proxy_eject_seconds'),
+            self.options.get('proxy_health_url'),
+            self.options.get('record'),
+            self.options.get('replay'),
+        )
+
+
+def load_default_config(path: str = DEFAULT_CONFIG_PATH) -> ModuleType:
+    """Load config/default_config.py as a module."""
+    if not os.path.exists(path):
+        raise JobConfigError(f"Default config not found: {path}")
+    spec = importlib.util.spec_from_file_location('default_config', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _read_job_file(path: str) -> Dict[str, Any]:
+    """Parse a TOML or JSON job file."""
+    try:
+        if path.endswith('.toml'):
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11
+                try:
+                    import tomli as tomllib
+                except ImportError:
+                    raise JobConfigError(
+                        "TOML job files need Python 3.11+ or: pip install tomli"
+                    ) from None
+            with open(path, 'rb') as f:
+                return tomllib.load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except JobConfigError:
+        raise
+    except (OSError, ValueError) as e:
+        raise JobConfigError(f"Cannot read job file {path}: {e}") from e
+
+
+def _lookup(table: Dict[str, Any], name: str, kind: str) -> Any:
+    try:
+        return table[name]
+    except KeyError:
+        raise JobConfigError(
+            f"Unknown {kind} {name!r}; choose from {', '.join(table)}"
+        ) from None
+
+
+def _check_option(name: str, value: Any):
+    """Raise JobConfigError unless value has the type option name takes."""
+    expected = _OPTION_TYPES.get(name)
+    if expected is None:
+        return
+    if expected is float:
+        valid = isinstance(value, (int, float))
+    else:
+        valid = isinstance(value, expected)
+    # bool is an int subclass, but true/false is no number
+    if not valid or (expected is not bool and isinstance(value, bool)):
+        raise JobConfigError(
+            f"Option {name} must be {expected.__name__}, got {value!r}"
+        )
+
+
+def build_job(
+    raw: Dict[str, Any],
+    config: ModuleType,
+    index: int = 0,
+    base_dir: Optional[str] = None
+) -> Job:
+    """Resolve presets and defaults for one raw job definition.
+
+    A relative ``output_dir`` is taken relative to base_dir, normally the
+    directory of the job file, rather than the current directory.
+    """
+    unknown = set(raw) - JOB_KEYS - CRAWLER_OPTIONS
+    if unknown:
+        raise JobConfigError(f"Unknown job keys: {', '.join(sorted(unknown))}")
+
+    urls = raw.get('urls')
+    if isinstance(urls, str):
+        urls = [urls]
+    if not urls:
+        raise JobConfigError(f"Job {raw.get('name', index)!r} has no urls")
+
+    options = dict(config.DEFAULT_CRAWLER_CONFIG)
+    options['custom_headers'] = dict(options.get('custom_headers') or {})
+
+    if raw.get('preset'):
+        preset = _lookup(config.GUI_PRESETS, raw['preset'], 'preset')
+        for field, option in _PRESET_FIELDS.items():
+            if field in preset:
+                options[option] = preset[field]
+    if raw.get('size_limit'):
+        options['max_size'] = _lookup(
+            config.SIZE_LIMITS, raw['size_limit'], 'size limit'
+        )
+    if raw.get('timeout_preset'):
+        options['timeout'] = dict(_lookup(
+            config.TIMEOUT_PRESETS, raw['timeout_preset'], 'timeout preset'
+        ))
+
+    for key in CRAWLER_OPTIONS & set(raw):
+        options[key] = raw[key]
+    options['live_output'] = False
+    for key, value in options.items():
+        _check_option(key, value)
+    try:
+        FetchTimeouts.coerce(options.get('timeout'))
+    except (TypeError, ValueError) as e:
+        raise JobConfigError(f"Invalid timeout: {e}") from None
+    if options.get('transport', 'aiohttp') not in TRANSPORTS:
+        raise JobConfigError(
+            f"Unknown transport {options['transport']!r}; "
+            f"choose from {', '.join(TRANSPORTS)}"
+        )
+    if options.get('transport') == 'http2' and options.get('host_overrides'):
+        raise JobConfigError(
+            "host_overrides cannot be combined with the http2 transport"
+        )
+    if options.get('proxy_strategy', 'round_robin') not in PROXY_STRATEGIES:
+        raise JobConfigError(
+            f"Unknown proxy strategy {options['proxy_strategy']!r}; "
+            f"choose from {', '.join(PROXY_STRATEGIES)}"
+        )
+
+    export_format = raw.get('format', 'txt')
+    if export_format not in config.EXPORT_FORMATS:
+        raise JobConfigError(
+            f"Unknown format {export_format!r}; "
+            f"choose from {', '.join(config.EXPORT_FORMATS)}"
+        )
+
+    output_dir = raw.get('output_dir')
+    if output_dir is not None:
+        if not isinstance(output_dir, str) or not output_dir:
+            raise JobConfigError(f"Invalid output_dir {output_dir!r}")
+        output_dir = os.path.join(base_dir or '', output_dir)
+
+    return Job(
+        name=raw.get('name') or f"job{index + 1}",
+        urls=list(urls),
+        options=options,
+        export_format=export_format,
+        output_dir=output_dir,
+        filename=raw.get('filename')
+    )
+
+
+def load_jobs(path: str, config: ModuleType) -> List[Job]:
+    """Load every job from a job file.
+
+    A file may hold a single job at the top level, or a ``jobs`` list with
+    optional shared ``defaults``.
+    """
+    data = _read_job_file(path)
+    if not isinstance(data, dict):
+        raise JobConfigError(f"Job file {path} must contain a table/object")
+
+    defaults = data.get('defaults', {})
+    raw_jobs = data.get('jobs')
+    if raw_jobs is None:
+        raw_jobs = [{k: v for k, v in data.items() if k != 'defaults'}]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return [
+        build_job({**defaults, **raw}, config, index, base_dir)
+        for index, raw in enumerate(raw_jobs)
+    ]
+
+
+def check_archive_paths(jobs: List[Job]):
+    """Raise JobConfigError if pools would clobber each other's archives.
+
+    Jobs in one transport pool share its WARC writer, but each pool opens
+    its record archive afresh, truncating it, so a record path may not be
+    recorded or replayed by the jobs of any other pool.
+    """
+    recorders: Dict[str, Tuple[str, Tuple]] = {}
+    for job in jobs:
+        record = job.options.get('record')
+        # A replaying transport records nothing
+        if not record or job.options.get('replay'):
+            continue
+        name, key = recorders.setdefault(
+            os.path.abspath(record), (job.name, job.transport_key())
+        )
+        if key != job.transport_key():
+            raise JobConfigError(
+                f"Jobs {name} and {job.name} record to {record} "
+                "with different transport settings"
+            )
+    for job in jobs:
+        replay = job.options.get('replay')
+        if replay and os.path.abspath(replay) in recorders:
+            name = recorders[os.path.abspath(replay)][0]
+            raise JobConfigError(
+                f"Job {job.name} replays {replay}, which job {name} records"
+            )
+
+
+async def run_jobs(
+    jobs: List[Job],
+    on_complete: Callable[[Job, PythonWebCrawler], None]
+) -> int:
+    """Run jobs back to back on the current loop and return an exit code.
+
+    Jobs with matching transport settings share one resolver and one
+    transport, so connections, DNS answers and recently loaded pages carry
+    over between jobs. A job fails if its crawl or on_complete (which
+    exports its results) raises.
+    """
+    try:
+        check_archive_paths(jobs)
+    except JobConfigError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    pools: Dict[Tuple, Tuple[Optional[CachingResolver], Transport]] = {}
+    exit_code = EXIT_OK
+
+    try:
+        for job in jobs:
+            try:
+                crawler = PythonWebCrawler(**job.options)
+                key = job.transport_key()
+                if key not in pools:
+                    crawler.resolver = crawler._create_resolver()
+                    transport = crawler._create_transport()
+                    try:
+                        await transport.open()
+                    except BaseException:
+                        if crawler.resolver is not None:
+                            await crawler.resolver.close()
+                        raise
+                    pools[key] = (crawler.resolver, transport)
+                crawler.resolver, crawler.transport = pools[key]
+                await crawler.crawl(job.urls)
+            except Exception as e:
+                print(f"[!] Job {job.name} failed: {e}", file=sys.stderr)
+                exit_code = EXIT_FAILED
+                continue
+
+            try:
+                on_complete(job, crawler)
+            except Exception as e:
+                print(
+                    f"[!] Job {job.name} could not save results: {e}",
+                    file=sys.stderr
+                )
+                exit_code = EXIT_FAILED
+                continue
+            if not crawler.results and exit_code == EXIT_OK:
+                exit_code = EXIT_NO_RESULTS
+    finally:
+        for resolver, transport in pools.values():
+            await transport.close()
+            if resolver is not None:
+                await resolver.close()
+
+    return exit_code
+
+
+def run_job_files(
+    paths: List[str],
+    on_complete: Callable[[Job, PythonWebCrawler], None],
+    config_path: str = DEFAULT_CONFIG_PATH,
+    use_uvloop: bool = False
+) -> int:
+    """Load job files and run every job in a single event loop."""
+    try:
+        config = load_default_config(config_path)
+        jobs = [job for path in paths for job in load_jobs(path, config)]
+    except JobConfigError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        return run_event_loop(run_jobs(jobs, on_complete), use_uvloop)
+    except ImportError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return EXIT_USAGE
@@ -0,0 +1,218 @@
+"""
+Event loop selection and loop-lag monitoring.
+
+run_event_loop() runs the crawler's entry coroutine on the default asyncio
+loop, or on uvloop when asked to (``pip install uvloop``).
+
+Parsing and printing run inside coroutines, so a slow page stalls every
+other request on the loop. LoopLagMonitor makes that visible:
+
+- a sampler task sleeps for a fixed interval and records how late it
+  wakes up; the delay is how long the loop was busy elsewhere, and goes
+  into a histogram
+- on the default loop it also times every callback the loop runs and
+  remembers those that held the loop longer than the block threshold,
+  named by their coroutine or function, so a regression in the hot path
+  shows up by name. uvloop runs its callbacks in C, so there only the
+  sampled lag is available.
+"""
+
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Seconds between two lag samples
+DEFAULT_SAMPLE_INTERVAL = 0.05
+# Callbacks holding the loop at least this many seconds are reported
+DEFAULT_BLOCK_THRESHOLD = 0.1
+# Upper bounds of the lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+# Monitors currently timing callbacks, and the Handle._run they replaced
+_tracing: List['LoopLagMonitor'] = []
+_original_run = None
+
+
+def require_uvloop():
+    """Import uvloop, raising ImportError with install advice if missing."""
+    try:
+        import uvloop
+    except ImportError:
+        raise ImportError("uvloop is not installed: pip install uvloop") from None
+    return uvloop
+
+
+def run_event_loop(main, use_uvloop: bool = False):
+    """Run coroutine main to completion, on uvloop if use_uvloop is set."""
+    import asyncio
+
+    if not use_uvloop:
+        return asyncio.run(main)
+    try:
+        uvloop = require_uvloop()
+    except ImportError:
+        main.close()
+        raise
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(main)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        return asyncio.run(main)
+    finally:
+        asyncio.set_event_loop_policy(None)
+
+
+def _describe(handle) -> str:
+    """Name of the coroutine or function a loop callback runs."""
+    import asyncio
+
+    callback = handle._callback
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, '__qualname__', repr(coro))
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+def _timed_run(handle):
+    started = time.perf_counter()
+    try:
+        _original_run(handle)
+    finally:
+        elapsed = time.perf_counter() - started
+        for monitor in _tracing:
+            if elapsed >= monitor.block_threshold:
+                monitor._record_block(_describe(handle), elapsed)
+
+
+class LoopLagMonitor:
+    """Samples event loop scheduling delay and names blocking callbacks."""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+        block_threshold: float = DEFAULT_BLOCK_THRESHOLD
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.stalls = 0
+        self.blocking: Counter = Counter()
+        self.slowest: Dict[str, float] = {}
+        self.traced = False
+        self._task: Optional['asyncio.Task'] = None
+
+    def start(self):
+        """Start sampling on the running loop."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._sample())
+        # uvloop's handles are not asyncio.events.Handle, so cannot be timed
+        if isinstance(loop, asyncio.BaseEventLoop):
+            self._trace()
+
+    async def stop(self):
+        """Stop sampling and callback timing."""
+        import asyncio
+
+        if self.traced:
+            self._untrace()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def record(self, lag: float):
+        """Add one lag sample, in seconds."""
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.histogram[bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+        if lag >= self.block_threshold:
+            self.stalls += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in ms, of the bucket holding the q-th percentile."""
+        if not self.samples:
+            return 0.0
+        rank = q / 100 * self.samples
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return round(self.max_lag * 1000, 1)
+
+    def summary(self) -> Dict[str, int]:
+        """Integer figures for the crawl metrics."""
+        return {
+            'loop_lag_samples': self.samples,
+            'loop_lag_max_ms': round(self.max_lag * 1000),
+            'loop_lag_p99_ms': round(self.percentile(99)),
+            'loop_stalls': self.stalls,
+            'loop_blocking_callbacks': sum(self.blocking.values()),
+        }
+
+    def top_blocking(self, n: int = 5) -> List[Tuple[str, int, float]]:
+        """(callback, times over threshold, longest seconds), worst first."""
+        ranked = sorted(self.slowest.items(), key=lambda item: -item[1])[:n]
+        return [(name, self.blocking[name], longest) for name, longest in ranked]
+
+    def format(self) -> str:
+        """Lag histogram and the callbacks that blocked the loop longest."""
+        lines = [
+            f"loop lag: {self.samples} samples, "
+            f"mean {self.total_lag / max(1, self.samples) * 1000:.1f} ms, "
+            f"p99 <= {self.percentile(99):g} ms, max {self.max_lag * 1000:.1f} ms"
+        ]
+        lower = 0
+        for bound, count in zip(LAG_BUCKETS_MS + (None,), self.histogram):
+            label = f"{lower}-{bound} ms" if bound else f">{lower} ms"
+            lines.append(f"  {label:>12}: {count}")
+            lower = bound
+        for name, count, longest in self.top_blocking():
+            lines.append(
+                f"blocked {longest * 1000:.0f} ms: {name} ({count}x)"
+            )
+        return '\n'.join(lines)
+
+    async def _sample(self):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def _record_block(self, name: str, elapsed: float):
+        self.blocking[name] += 1
+        self.slowest[name] = max(self.slowest.get(name, 0.0), elapsed)
+
+    def _trace(self):
+        global _original_run
+        from asyncio import events
+
+        if not _tracing:
+            _original_run = events.Handle._run
+            events.Handle._run = _timed_run
+        _tracing.append(self)
+        self.traced = True
+
+    def _untrace(self):
+        from asyncio import events
+
+        _tracing.remove(self)
+        self.traced = False
+        if not _tracing:
+            events.Handle._run = _original_run
@@ -0,0 +1,41 @@
+"""
+Crawl metrics - named counters collected while crawling.
+"""
+
+from collections import Counter
+from typing import Dict
+
+
+class CrawlMetrics:
+    """Named integer counters with a printable summary."""
+
+    def __init__(self):
+        self.counters: Counter = Counter()
+
+    def incr(self, name: str, value: int = 1):
+        """Add value to the named counter."""
+        self.counters[name] += value
+
+    def __getitem__(self, name: str) -> int:
+        return self.counters[name]
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return all counters as a plain dict."""
+        return dict(self.counters)
+
+    def format(self) -> str:
+        """Human-readable summary, one counter per line."""
+        lines = [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        wire = self.counters.get('wire_bytes', 0)
+        decoded = self.counters.get('decoded_bytes', 0)
+        if wire and decoded:
+            lines.append(f"compression_ratio: {decoded / wire:.2f}")
+        handshakes = self.counters.get('tls_handshakes', 0)
+        if handshakes:
+            resumed = self.counters.get('tls_resumed', 0)
+            lines.append(f"tls_full_handshakes: {handshakes - resumed}")
+            lines.append(
+                "tls_mean_handshake_ms: "
+                f"{self.counters.get('tls_handshake_ms', 0) / handshakes:.1f}"
+            )
+        return '\n'.join(lines)
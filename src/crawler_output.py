@@ -0,0 +1,129 @@
+"""
+Buffered, batched output.
+
+OutputWriter moves terminal/pipe writes off the event loop: callers hand it
+whole batches of lines (one per crawled page, so a page's results stay
+together and in order), and a background thread joins and writes them
+when enough lines have accumulated or the flush interval has passed.
+"""
+
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, List, Optional, TextIO
+
+# Flush once this many lines are buffered...
+DEFAULT_MAX_LINES = 512
+# ...or this many seconds after the oldest buffered line arrived
+DEFAULT_FLUSH_INTERVAL = 0.2
+
+_CLOSE = None
+
+
+def format_result_line(result, show_source: bool, show_where: bool) -> str:
+    """Render a Result as a plain-text output line."""
+    line = result.url
+    if show_source:
+        line = f"[{result.source}] {line}"
+    if show_where and result.where:
+        line = f"[{result.where}] {line}"
+    return line
+
+
+class OutputWriter:
+    """Writes batches of lines to a stream from a background thread."""
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        max_lines: int = DEFAULT_MAX_LINES,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.stream = stream if stream is not None else sys.stdout
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        self.lines_written = 0
+        self._batches: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'OutputWriter':
+        """Start the writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='crawler-output', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def write_lines(self, lines: List[str]):
+        """Queue a batch of lines; the batch is written contiguously."""
+        if lines:
+            self._batches.put(lines)
+
+    def write(self, line: str):
+        """Queue a single line."""
+        self._batches.put([line])
+
+    def close(self):
+        """Flush everything queued and stop the writer thread."""
+        if self._thread is not None:
+            self._batches.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'OutputWriter':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        buffer: List[str] = []
+        deadline = None
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch = self._batches.get(timeout=timeout)
+            except queue.Empty:
+                batch = []
+
+            if batch is _CLOSE:
+                self._flush(buffer)
+                return
+            if batch:
+                if not buffer:
+                    deadline = time.monotonic() + self.flush_interval
+                buffer.extend(batch)
+
+            if buffer and (
+                len(buffer) >= self.max_lines
+                or time.monotonic() >= deadline
+            ):
+                self._flush(buffer)
+                buffer = []
+                deadline = None
+
+    def _flush(self, buffer: List[str]):
+        if not buffer:
+            return
+        try:
+            self.stream.write('\n'.join(buffer) + '\n')
+            self.stream.flush()
+        except (BrokenPipeError, ValueError):
+            # Reader went away or stream was closed; drop the output
+            pass
+        self.lines_written += len(buffer)
+
+
+def write_all(writer: OutputWriter, chunks: Iterable[str], batch: int = 1000):
+    """Feed an iterable of output chunks to a writer in fixed-size batches."""
+    lines = []
+    for chunk in chunks:
+        lines.append(chunk)
+        if len(lines) >= batch:
+            writer.write_lines(lines)
+            lines = []
+    writer.write_lines(lines)
@@ -0,0 +1,349 @@
+"""
+Rotating, health-checked proxy pool.
+
+ProxyTransport spreads requests over several proxies. Each proxy gets its
+own inner transport, and so its own connection pool, so a slow or broken
+egress never holds connections that healthy proxies could use.
+
+- selection is ``round_robin`` or ``least_latency`` (lowest moving
+  average response time among proxies with spare capacity)
+- each proxy serves at most max_concurrency requests at once
+- a proxy that fails max_failures times in a row is ejected for
+  eject_seconds; afterwards it is readmitted on probation, one request at
+  a time, until a request succeeds
+- with a health_url, ejected proxies are probed in the background and
+  readmitted as soon as a probe succeeds
+- a request that fails at the proxy is retried once more on another proxy;
+  failures at the origin (timeouts waiting on it, bad responses) count
+  against neither the proxy nor a retry
+"""
+
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
+
+from crawler_timeouts import FetchTimeout
+from crawler_transport import Transport, create_transport
+
+# asyncio is imported on use, so the CLI can read PROXY_STRATEGIES cheaply
+if TYPE_CHECKING:
+    import asyncio
+
+PROXY_STRATEGIES = ('round_robin', 'least_latency')
+
+# Consecutive failures before a proxy is ejected
+DEFAULT_MAX_FAILURES = 3
+# Seconds an ejected proxy sits out before it is tried again
+DEFAULT_EJECT_SECONDS = 30.0
+# Seconds between background health probes of ejected proxies
+DEFAULT_HEALTH_INTERVAL = 10.0
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+# Requests retried on another proxy after a proxy failure
+PROXY_RETRIES = 1
+
+
+# ProxyTransport arguments that mean nothing to a single proxied transport
+_POOL_OPTIONS = (
+    'strategy', 'max_concurrency', 'max_failures', 'eject_seconds',
+    'health_url', 'health_interval',
+)
+
+
+class ProxyUnavailable(ConnectionError):
+    """Raised when every proxy in the pool has been ejected."""
+
+
+def parse_proxies(value: Union[str, Sequence[str], None]) -> List[str]:
+    """Split a comma-separated proxy string (or list) into proxy URLs."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [proxy.strip() for proxy in value if proxy.strip()]
+
+
+def is_proxy_failure(error: Exception) -> bool:
+    """Whether a proxied fetch failed at the proxy rather than the origin.
+
+    Every connection goes to the proxy, so failing to connect (or timing
+    out connecting) is the proxy's fault, as is a refused CONNECT tunnel.
+    TLS errors inside the tunnel and everything after the request was
+    sent belong to the origin.
+    """
+    if isinstance(error, FetchTimeout):
+        return error.phase == 'connect'
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None and isinstance(
+        error, (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError)
+    ):
+        return True
+    httpx = sys.modules.get('httpx')
+    if httpx is not None:
+        if isinstance(error, httpx.ProxyError):
+            return True
+        if isinstance(error, httpx.ConnectError):
+            import ssl
+
+            return not isinstance(error.__context__, ssl.SSLError)
+    return False
+
+
+class ProxyEndpoint:
+    """One proxy, its transport and its health state."""
+
+    def __init__(self, url: str, transport: Transport, max_concurrency: int):
+        self.url = url
+        self.transport = transport
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.probation = False
+
+    def ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def has_capacity(self) -> bool:
+        if self.probation:
+            return self.in_flight == 0
+        return self.in_flight < self.max_concurrency
+
+    def record_success(self, elapsed: float):
+        self.consecutive_failures = 0
+        self.probation = False
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += LATENCY_ALPHA * (elapsed - self.latency)
+
+    def record_failure(self, max_failures: int, eject_seconds: float):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.probation or self.consecutive_failures >= max_failures:
+            self.eject(eject_seconds)
+
+    def eject(self, eject_seconds: float):
+        self.ejections += 1
+        self.ejected_until = time.monotonic() + eject_seconds
+        # Once the ejection expires, one probe request decides its fate
+        self.probation = True
+
+    def readmit(self):
+        self.ejected_until = 0.0
+        self.probation = False
+        self.consecutive_failures = 0
+
+    def stats(self) -> Dict:
+        return {
+            'proxy': self.url,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ejections': self.ejections,
+            'latency': self.latency,
+            'ejected': self.ejected(time.monotonic()),
+        }
+
+
+class ProxyTransport(Transport):
+    """Transport that routes each request through a pool of proxies."""
+
+    name = 'proxy'
+
+    def __init__(
+        self,
+        proxies: Sequence[str],
+        backend: str = 'aiohttp',
+        strategy: str = 'round_robin',
+        max_concurrency: Optional[int] = None,
+        max_failures: int = DEFAULT_MAX_FAILURES,
+        eject_seconds: float = DEFAULT_EJECT_SECONDS,
+        health_url: Optional[str] = None,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        if not proxies:
+            raise ValueError("ProxyTransport needs at least one proxy")
+        if strategy not in PROXY_STRATEGIES:
+            raise ValueError(
+                f"Unknown proxy strategy {strategy!r}; "
+                f"choose from {', '.join(PROXY_STRATEGIES)}"
+            )
+        self.proxies = list(proxies)
+        self.backend = backend
+        self.strategy = strategy
+        self.max_concurrency = max_concurrency or self.limit
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_url = health_url
+        self.health_interval = health_interval
+        self.endpoints: List[ProxyEndpoint] = []
+        self._cursor = 0
+        self._changed: Optional['asyncio.Condition'] = None
+        self._health_task: Optional['asyncio.Task'] = None
+
+    async def open(self):
+        import asyncio
+
+        self._changed = asyncio.Condition()
+        for url in self.proxies:
+            transport = create_transport(
+                self.backend,
+                ssl_context=self.ssl_context,
+                resolver=self.resolver,
+                timeout=self.timeout,
+                limit=self.max_concurrency,
+                proxy=url
+            )
+            await transport.open()
+            self.endpoints.append(
+                ProxyEndpoint(url, transport, self.max_concurrency)
+            )
+        if self.health_url:
+            self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def close(self):
+        import asyncio
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for endpoint in self.endpoints:
+            await endpoint.transport.close()
+        self.endpoints = []
+
+    def stats(self) -> List[Dict]:
+        """Per-proxy request, failure, ejection and latency figures."""
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _pick(self, ready: List[ProxyEndpoint]) -> ProxyEndpoint:
+        if self.strategy == 'least_latency':
+            # Untried proxies report no latency and are tried first
+            return min(
+                ready, key=lambda e: (e.latency is not None, e.latency or 0.0)
+            )
+        count = len(self.endpoints)
+        for offset in range(count):
+            endpoint = self.endpoints[(self._cursor + offset) % count]
+            if endpoint in ready:
+                self._cursor = (self._cursor + offset + 1) % count
+                return endpoint
+        return ready[0]
+
+    async def _acquire(
+        self, tried: List[ProxyEndpoint]
+    ) -> Optional[ProxyEndpoint]:
+        """Reserve a proxy slot, waiting while every live proxy is busy.
+
+        Returns None on a retry when no untried proxy is left.
+        """
+        import asyncio
+
+        async with self._changed:
+            while True:
+                now = time.monotonic()
+                live = [
+                    e for e in self.endpoints
+                    if e not in tried and not e.ejected(now)
+                ]
+                ready = [e for e in live if e.has_capacity()]
+                if ready:
+                    endpoint = self._pick(ready)
+                    endpoint.in_flight += 1
+                    endpoint.requests += 1
+                    return endpoint
+                if tried and not live:
+                    return None
+                if live:
+                    await self._changed.wait()
+                    continue
+                # Every proxy is ejected: wait for the first to come back
+                soonest = min(e.ejected_until for e in self.endpoints)
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait(), max(0.0, soonest - now)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, endpoint: ProxyEndpoint):
+        async with self._changed:
+            endpoint.in_flight -= 1
+            self._changed.notify_all()
+
+    async def fetch(self, url, headers, allow_redirects=True, max_size=None):
+        tried: List[ProxyEndpoint] = []
+        while True:
+            endpoint = await self._acquire(tried)
+            if endpoint is None:
+                raise ProxyUnavailable(f"no working proxy left for {url}")
+            tried.append(endpoint)
+            started = time.monotonic()
+            try:
+                response = await endpoint.transport.fetch(
+                    url, headers, allow_redirects, max_size
+                )
+            except Exception as e:
+                if not is_proxy_failure(e):
+                    # The proxy did its job; retrying would only load the
+                    # origin again
+                    raise
+                endpoint.record_failure(self.max_failures, self.eject_seconds)
+                if len(tried) > PROXY_RETRIES:
+                    raise
+                continue
+            finally:
+                await self._release(endpoint)
+
+            if response.status == 407:
+                # Proxy authentication failed; the origin was never reached
+                endpoint.record_failure(self.max_failures, self.eject_seconds)
+            else:
+                endpoint.record_success(time.monotonic() - started)
+            return response
+
+    async def _probe(self, endpoint: ProxyEndpoint):
+        try:
+            response = await endpoint.transport.fetch(
+                self.health_url, {}, max_size=64 * 1024
+            )
+        except Exception:
+            return
+        if response.status < 400:
+            async with self._changed:
+                endpoint.readmit()
+                self._changed.notify_all()
+
+    async def _health_loop(self):
+        import asyncio
+
+        while True:
+            await asyncio.sleep(self.health_interval)
+            now = time.monotonic()
+            await asyncio.gather(*(
+                self._probe(e) for e in self.endpoints if e.ejected(now)
+            ))
+
+
+def create_proxy_transport(
+    proxies: Sequence[str], backend: str = 'aiohttp', **kwargs
+) -> Union[Transport, ProxyTransport]:
+    """A plain proxied transport for one proxy, else a ProxyTransport pool.
+
+    A single proxy has nothing to fail over to, so only its concurrency
+    cap carries over, as the transport's connection limit.
+    """
+    if len(proxies) == 1:
+        max_concurrency = kwargs.get('max_concurrency')
+        for option in _POOL_OPTIONS:
+            kwargs.pop(option, None)
+        if max_concurrency:
+            kwargs['limit'] = min(kwargs.get('limit', max_concurrency), max_concurrency)
+        return create_transport(backend, proxy=proxies[0], **kwargs)
+    return ProxyTransport(proxies, backend=backend, **kwargs)
@@ -0,0 +1,125 @@
+"""
+Crawl scope matching - decides which discovered links stay in scope.
+
+A CrawlScope is compiled once per seed URL so the per-link check in the
+crawl loop is a handful of string comparisons instead of repeated URL
+parsing.
+"""
+
+import re
+from typing import (
+    Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+)
+from urllib.parse import urlsplit, SplitResult
+
+from crawler_urls import ParsedURL
+
+# Upper bound on memoized host decisions kept by a single scope
+_HOST_CACHE_LIMIT = 4096
+
+
+def _host_of(netloc: str) -> str:
+    """Return the lowercase host of a netloc, without userinfo or port."""
+    host = netloc.rpartition('@')[2].lower()
+    if host.startswith('['):
+        return host.split(']', 1)[0] + ']'
+    return host.split(':', 1)[0]
+
+
+class CrawlScope:
+    """Compiled host, path and pattern filter for a single seed URL."""
+
+    __slots__ = (
+        'netloc', 'host', 'subs', 'path_prefix', 'aliases',
+        '_include', '_exclude', '_host_cache'
+    )
+
+    def __init__(
+        self,
+        netloc: str,
+        subs: bool = False,
+        path_prefix: Optional[str] = None,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = ()
+    ):
+        self.netloc = netloc.lower()
+        self.host = _host_of(netloc)
+        self.subs = subs
+        self.path_prefix = path_prefix or None
+        # Hosts adopted into scope, e.g. the target of a seed redirect
+        self.aliases: List[str] = []
+        self._include: Tuple[Pattern, ...] = tuple(re.compile(p) for p in include)
+        self._exclude: Tuple[Pattern, ...] = tuple(re.compile(p) for p in exclude)
+        self._host_cache: Dict[str, bool] = {}
+
+    @classmethod
+    def from_seed(
+        cls,
+        seed_url: str,
+        subs: bool = False,
+        inside: bool = False,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = ()
+    ) -> 'CrawlScope':
+        """Build the scope for a seed URL."""
+        parts = urlsplit(seed_url)
+        return cls(
+            parts.netloc,
+            subs=subs,
+            path_prefix=parts.path if inside else None,
+            include=include,
+            exclude=exclude
+        )
+
+    def adopt(self, netloc: str):
+        """Treat netloc (and, with subs, its subdomains) as in scope."""
+        netloc = netloc.lower()
+        if netloc != self.netloc and netloc not in self.aliases:
+            self.aliases.append(netloc)
+            self._host_cache.clear()
+
+    def _host_allowed(self, netloc: str) -> bool:
+        """Check a netloc against the scope, memoizing the decision."""
+        allowed = self._host_cache.get(netloc)
+        if allowed is None:
+            lowered = netloc.lower()
+            if lowered == self.netloc or lowered in self.aliases:
+                allowed = True
+            elif self.subs:
+                # Proper label-boundary suffix match in either direction, so
+                # sub.example.com and example.com match but evilexample.com
+                # does not.
+                host = _host_of(netloc)
+                allowed = any(
+                    host == scope_host
+                    or host.endswith('.' + scope_host)
+                    or scope_host.endswith('.' + host)
+                    for scope_host in self._hosts()
+                )
+            else:
+                allowed = False
+            if len(self._host_cache) < _HOST_CACHE_LIMIT:
+                self._host_cache[netloc] = allowed
+        return allowed
+
+    def _hosts(self) -> List[str]:
+        return [self.host] + [_host_of(alias) for alias in self.aliases]
+
+    def allows(self, parts: Union[ParsedURL, SplitResult]) -> bool:
+        """Check whether an already-parsed URL is in scope."""
+        if not self._host_allowed(parts.netloc):
+            return False
+        if self.path_prefix and not parts.path.startswith(self.path_prefix):
+            return False
+        if self._include or self._exclude:
+            url = parts.geturl()
+            if self._include and not any(p.search(url) for p in self._include):
+                return False
+            if any(p.search(url) for p in self._exclude):
+                return False
+        return True
+
+    def select(self, links: Iterable[tuple]) -> List[tuple]:
+        """Return the in-scope links of a batch of (parsed, ...) tuples."""
+        allows = self.allows
+        return [link for link in links if allows(link[0])]
@@ -0,0 +1,186 @@
+"""
+Near-duplicate page detection with 64-bit SimHash.
+
+Calendars, faceted search and session-ID URLs produce endless distinct URLs
+for what is essentially the same page. A page is fingerprinted from the
+shape of its link set: each link contributes its kind and path, with query
+values and ``;jsessionid``-style path parameters dropped, so two pages that
+differ only in those details get nearly identical fingerprints.
+
+Site-wide navigation would dominate such a fingerprint and make unrelated
+pages of a host look alike, so HostBoilerplate learns the links shared by
+most of a host's first pages and leaves them out; only the rest of a page's
+links are fingerprinted.
+
+SimHashIndex finds earlier fingerprints within a small Hamming distance
+using the pigeonhole trick: the 64 bits are split into distance + 1 bands,
+and any fingerprint within the distance must match at least one band
+exactly, so lookups only compare against a handful of candidates.
+"""
+
+from collections import Counter
+from hashlib import blake2b
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+
+# Pages with fewer distinct link features are never treated as duplicates;
+# tiny link sets collide too easily
+MIN_FEATURES = 8
+
+# Default maximum Hamming distance for a near duplicate
+DEFAULT_DISTANCE = 6
+
+# Pages of a host sampled before its boilerplate links are known
+DEFAULT_SAMPLE_PAGES = 10
+# Links on at least this share of the sampled pages are boilerplate
+BOILERPLATE_SHARE = 0.5
+
+# _BIT_TABLES[k] maps a byte to 1 if its bit k is set, else 0
+_BIT_TABLES = [
+    bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)
+]
+
+
+def popcount(value: int) -> int:
+    """Number of set bits in a non-negative int."""
+    return bin(value).count('1')
+
+
+def simhash(features: Iterable[str]) -> int:
+    """64-bit SimHash of a collection of string features (equal weights)."""
+    digests = b''.join(
+        blake2b(feature.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+        for feature in features
+    )
+    count = len(digests) // 8
+    fingerprint = 0
+    # Tally each bit across all digests with C-level translate/count calls
+    # instead of a Python loop per feature and bit
+    for byte in range(8):
+        column = digests[byte::8]
+        for bit, table in enumerate(_BIT_TABLES):
+            if 2 * column.translate(table).count(1) > count:
+                fingerprint |= 1 << (byte * 8 + bit)
+    return fingerprint
+
+
+def link_features(links: Iterable[Tuple]) -> List[str]:
+    """Distinct ``kind path?keys`` features of (ParsedURL, kind) links."""
+    features = set()
+    for link, kind in links:
+        path = link.path.split(';', 1)[0]
+        query = link.url.partition('?')[2].split('#', 1)[0]
+        keys = ''
+        if query:
+            keys = '&'.join(sorted({
+                pair.split('=', 1)[0] for pair in query.split('&') if pair
+            }))
+        features.add(f"{kind} {link.netloc}{path}?{keys}")
+    return list(features)
+
+
+def page_fingerprint(links: Iterable[Tuple]) -> Optional[int]:
+    """Fingerprint a page's links, or None if it has too few to judge."""
+    features = link_features(links)
+    if len(features) < MIN_FEATURES:
+        return None
+    return simhash(features)
+
+
+class SimHashIndex:
+    """Fingerprints indexed by band for fast Hamming-distance lookups."""
+
+    def __init__(self, distance: int = DEFAULT_DISTANCE):
+        if not 0 <= distance < FINGERPRINT_BITS // 2:
+            raise ValueError(
+                f"distance must be in [0, {FINGERPRINT_BITS // 2})"
+            )
+        self.distance = distance
+        bands = distance + 1
+        width = FINGERPRINT_BITS // bands
+        # (shift, mask) per band; the last band takes the leftover bits
+        self._bands = []
+        for i in range(bands):
+            bits = width if i < bands - 1 else FINGERPRINT_BITS - i * width
+            self._bands.append((i * width, (1 << bits) - 1))
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Return an indexed fingerprint within the distance, or None."""
+        for (shift, mask), table in zip(self._bands, self._tables):
+            for candidate in table.get((fingerprint >> shift) & mask, ()):
+                if popcount(candidate ^ fingerprint) <= self.distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint: int):
+        """Index a fingerprint."""
+        for (shift, mask), table in zip(self._bands, self._tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append(fingerprint)
+        self._size += 1
+
+    def check(self, fingerprint: int) -> bool:
+        """Return True if a near duplicate is indexed, else index it."""
+        if self.find(fingerprint) is not None:
+            return True
+        self.add(fingerprint)
+        return False
+
+
+class HostBoilerplate:
+    """Learns each host's site-wide links from its first pages.
+
+    The first sample_pages pages of a host are only counted; after that
+    the links found on at least BOILERPLATE_SHARE of them are fixed as the
+    host's boilerplate. Later pages never change it, so a trap that fills
+    the crawl with one kind of page cannot turn its own links into
+    boilerplate and hide itself.
+    """
+
+    def __init__(self, sample_pages: int = DEFAULT_SAMPLE_PAGES):
+        self.sample_pages = sample_pages
+        self._samples: Dict[str, Tuple[int, Counter]] = {}
+        self._boilerplate: Dict[str, FrozenSet[str]] = {}
+
+    def content_features(
+        self, host: str, features: List[str]
+    ) -> Optional[List[str]]:
+        """features minus the host's boilerplate, or None while sampling."""
+        boilerplate = self._boilerplate.get(host)
+        if boilerplate is not None:
+            return [f for f in features if f not in boilerplate]
+        pages, counts = self._samples.get(host, (0, Counter()))
+        counts.update(features)
+        pages += 1
+        if pages < self.sample_pages:
+            self._samples[host] = (pages, counts)
+        else:
+            self._samples.pop(host, None)
+            self._boilerplate[host] = frozenset(
+                f for f, n in counts.items() if n >= BOILERPLATE_SHARE * pages
+            )
+        return None
+
+
+class NearDuplicateDetector:
+    """Flags pages whose non-boilerplate links near-duplicate an earlier page."""
+
+    def __init__(
+        self,
+        distance: int = DEFAULT_DISTANCE,
+        sample_pages: int = DEFAULT_SAMPLE_PAGES
+    ):
+        self.index = SimHashIndex(distance)
+        self.boilerplate = HostBoilerplate(sample_pages)
+
+    def check(self, host: str, links: Iterable[Tuple]) -> bool:
+        """Return True for a near duplicate, else remember the page."""
+        features = self.boilerplate.content_features(host, link_features(links))
+        if features is None or len(features) < MIN_FEATURES:
+            return False
+        return self.index.check(simhash(features))
@@ -0,0 +1,190 @@
+"""
+Per-phase fetch timeouts and slow-response protection.
+
+A single total timeout lets a slow-loris server hold a worker for the whole
+budget. FetchTimeouts splits a fetch into the phases that can hang, each
+with its own limit (in seconds, None or <= 0 for no limit):
+
+- ``connect``: establishing the TCP connection
+- ``tls``: the TLS handshake on top of it
+- ``ttfb``: from sending the request until the response headers arrive.
+  Clients only report when the headers are in, so the window also spans
+  any new connection; it is widened by the connect and TLS limits, which
+  bound those phases themselves. A slow but legal handshake is therefore
+  never reported as a ttfb timeout.
+- ``read_idle``: the longest gap between two body chunks
+- ``total``: the whole fetch, as before
+
+plus ``min_rate``, a floor in bytes/sec on the average body transfer rate,
+enforced once ``min_rate_grace`` seconds of body reading have passed.
+
+A phase that runs out raises FetchTimeout, whose ``phase`` names it, so
+the crawler can count timeouts per phase.
+"""
+
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+
+# Seconds of body reading before the transfer-rate floor applies
+DEFAULT_MIN_RATE_GRACE = 2.0
+
+TIMEOUT_PHASES = ('connect', 'tls', 'ttfb', 'read_idle', 'min_rate', 'total')
+
+
+class FetchTimeout(TimeoutError):
+    """Raised when one phase of a fetch exceeds its limit."""
+
+    def __init__(self, phase: str, message: str):
+        super().__init__(message)
+        self.phase = phase
+
+
+def _limit(value) -> Optional[float]:
+    if value is None or value <= 0:
+        return None
+    return float(value)
+
+
+class FetchTimeouts:
+    """The timeout and transfer-rate limits applied to every fetch."""
+
+    __slots__ = (
+        'total', 'connect', 'tls', 'ttfb', 'read_idle', 'min_rate',
+        'min_rate_grace',
+    )
+
+    def __init__(
+        self,
+        total: Optional[float] = None,
+        connect: Optional[float] = None,
+        tls: Optional[float] = None,
+        ttfb: Optional[float] = None,
+        read_idle: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        min_rate_grace: float = DEFAULT_MIN_RATE_GRACE
+    ):
+        self.total = _limit(total)
+        self.connect = _limit(connect)
+        self.tls = _limit(tls)
+        self.ttfb = _limit(ttfb)
+        self.read_idle = _limit(read_idle)
+        self.min_rate = _limit(min_rate)
+        self.min_rate_grace = min_rate_grace
+
+    @classmethod
+    def coerce(
+        cls, value: Union['FetchTimeouts', Dict, float, None]
+    ) -> 'FetchTimeouts':
+        """Build limits from a number (total seconds), a dict or None."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            unknown = set(value) - set(cls.__slots__)
+            if unknown:
+                raise ValueError(
+                    f"Unknown timeout fields: {', '.join(sorted(unknown))}"
+                )
+            return cls(**value)
+        return cls(total=value)
+
+    def key(self) -> Tuple:
+        """Hashable form, for comparing transport settings."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FetchTimeouts) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    @property
+    def connect_budget(self) -> Optional[float]:
+        """Time allowed for connecting plus the TLS handshake.
+
+        Clients time the handshake inside their connect window, so that
+        window must leave room for it; the handshake itself is bounded
+        separately by tls. Without a connect limit there is no window.
+        """
+        if self.connect is None:
+            return None
+        return self.connect + (self.tls or 0.0)
+
+    @property
+    def headers_window(self) -> Optional[float]:
+        """Time allowed for the response headers, including connecting."""
+        if self.ttfb is None:
+            return None
+        return self.ttfb + (self.connect_budget or 0.0)
+
+    async def wait_headers(self, request):
+        """Await request (which yields the response) within the ttfb limit."""
+        window = self.headers_window
+        if window is None:
+            return await request
+        import asyncio
+
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(request, window)
+        except asyncio.TimeoutError:
+            # A client timeout that fired first is left for the caller
+            if time.monotonic() - started < window:
+                raise
+            raise FetchTimeout(
+                'ttfb', f"no response headers after {self.ttfb:g}s"
+            ) from None
+
+    def guard_body(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Wrap a body stream with the read-idle and min-rate limits."""
+        if self.read_idle is None and self.min_rate is None:
+            return chunks
+        return self._guarded(chunks)
+
+    async def _guarded(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        import asyncio
+
+        iterator = chunks.__aiter__()
+        started = time.monotonic()
+        received = 0
+        while True:
+            waiting = time.monotonic()
+            timeout, phase = self.read_idle, 'read_idle'
+            if self.min_rate is not None:
+                # A stalled body must not outlast the transfer-rate floor:
+                # wait no longer than until the average rate drops below it
+                left = max(self.min_rate_grace, received / self.min_rate)
+                left = max(0.0, left - (waiting - started))
+                if timeout is None or left < timeout:
+                    timeout, phase = left, 'min_rate'
+            try:
+                if timeout is None:
+                    chunk = await iterator.__anext__()
+                else:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                if timeout is None or time.monotonic() - waiting < timeout:
+                    raise
+                if phase == 'read_idle':
+                    raise FetchTimeout(
+                        'read_idle',
+                        f"body stalled for {self.read_idle:g}s "
+                        f"after {received} bytes"
+                    ) from None
+                raise self._rate_timeout(received, started) from None
+            received += len(chunk)
+            if self.min_rate is not None:
+                elapsed = time.monotonic() - started
+                if (elapsed > self.min_rate_grace
+                        and received < self.min_rate * elapsed):
+                    raise self._rate_timeout(received, started)
+            yield chunk
+
+    def _rate_timeout(self, received: int, started: float) -> FetchTimeout:
+        elapsed = time.monotonic() - started
+        return FetchTimeout(
+            'min_rate',
+            f"body arriving at {received / elapsed:.0f} B/s, "
+            f"below {self.min_rate:g} B/s"
+        )
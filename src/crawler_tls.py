@@ -0,0 +1,113 @@
+"""
+Shared TLS contexts with client-side session resumption.
+
+Building an SSLContext loads the whole CA bundle, so contexts are created
+once per verification mode (and ALPN list) and shared by every crawler and
+transport in the process.
+
+asyncio never offers a TLS session back to OpenSSL, so every new
+connection pays for a full handshake. SessionContext closes that gap
+through the standard hooks asyncio uses, wrap_bio() and sslobject_class:
+it remembers the last session (ticket) per server name and offers it on
+the next connection to the same host, which turns reconnects into
+abbreviated handshakes. Handshake counts and times are kept in
+SessionContext.stats.
+"""
+
+import ssl
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Server names whose TLS session is remembered
+MAX_CACHED_SESSIONS = 1024
+
+
+class _SessionSSLObject(ssl.SSLObject):
+    """SSLObject that reports its handshake and saves its session."""
+
+    _handshake_started: Optional[float] = None
+    _session_saved = False
+
+    def do_handshake(self):
+        if self._handshake_started is None:
+            self._handshake_started = time.perf_counter()
+        super().do_handshake()
+        self.context._record_handshake(
+            self, time.perf_counter() - self._handshake_started
+        )
+        self._save_session()
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        # TLS 1.3 tickets arrive after the handshake, with the first reads
+        if not self._session_saved:
+            self._save_session()
+        return data
+
+    def _save_session(self):
+        session = self.session
+        if session is not None and (
+            session.has_ticket or self.version() != 'TLSv1.3'
+        ):
+            self.context._save_session(self.server_hostname, session)
+            self._session_saved = True
+
+
+class SessionContext(ssl.SSLContext):
+    """SSLContext that resumes TLS sessions per server name."""
+
+    sslobject_class = _SessionSSLObject
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.stats: Counter = Counter()
+        self._sessions: 'OrderedDict[str, ssl.SSLSession]' = OrderedDict()
+
+    def wrap_bio(
+        self, incoming, outgoing, server_side=False, server_hostname=None,
+        session=None
+    ):
+        if session is None and server_hostname and not server_side:
+            session = self._sessions.get(server_hostname)
+        try:
+            return super().wrap_bio(
+                incoming, outgoing, server_side, server_hostname, session
+            )
+        except (ssl.SSLError, ValueError):
+            if session is None:
+                raise
+            # The stored session was rejected (e.g. expired); start afresh
+            self._sessions.pop(server_hostname, None)
+            return super().wrap_bio(
+                incoming, outgoing, server_side, server_hostname
+            )
+
+    def _save_session(self, server_hostname: Optional[str], session):
+        if not server_hostname:
+            return
+        self._sessions[server_hostname] = session
+        self._sessions.move_to_end(server_hostname)
+        if len(self._sessions) > MAX_CACHED_SESSIONS:
+            self._sessions.popitem(last=False)
+
+    def _record_handshake(self, ssl_object: ssl.SSLObject, elapsed: float):
+        self.stats['tls_handshakes'] += 1
+        self.stats['tls_handshake_ms'] += round(elapsed * 1000)
+        if ssl_object.session_reused:
+            self.stats['tls_resumed'] += 1
+
+
+@lru_cache(maxsize=None)
+def tls_context(verify: bool = True, alpn: Tuple[str, ...] = ()) -> SessionContext:
+    """The shared client context for a verification mode and ALPN list."""
+    context = SessionContext(ssl.PROTOCOL_TLS_CLIENT)
+    if verify:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    else:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if alpn:
+        context.set_alpn_protocols(list(alpn))
+    return context
@@ -0,0 +1,336 @@
+"""
+Pluggable fetch transports.
+
+The crawler talks to the network through a Transport, so the HTTP client
+can be swapped without touching the crawl loop:
+
+- ``aiohttp``: HTTP/1.1 over aiohttp's ClientSession (default)
+- ``http2``: HTTP/2 over httpx, multiplexing concurrent requests to a host
+  over a single connection (requires ``pip install httpx[http2]``)
+
+Every transport applies the same FetchTimeouts and reports a phase that
+runs out as FetchTimeout.
+"""
+
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Type, Union
+
+from crawler_compression import READ_CHUNK_SIZE, accept_encoding, read_body
+from crawler_timeouts import FetchTimeout, FetchTimeouts
+
+# HTTP clients are imported in open(), so choosing a backend on the command
+# line does not load every client library.
+if TYPE_CHECKING:
+    import ssl
+    from aiohttp import ClientSession
+
+
+class FetchResponse:
+    """Transport-independent view of a completed response."""
+
+    __slots__ = ('url', 'status', 'headers', 'body', 'charset', 'wire_bytes')
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+        charset: Optional[str] = None,
+        wire_bytes: int = 0
+    ):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+        self.wire_bytes = wire_bytes
+
+    @property
+    def host(self) -> str:
+        """Host of the final (post-redirect) URL."""
+        netloc = self.url.split('://', 1)[-1].split('/', 1)[0]
+        return netloc.rpartition('@')[2].split(':', 1)[0].lower()
+
+
+class Transport:
+    """Base class for fetch backends.
+
+    Subclasses implement open(), close() and fetch(). A transport may be
+    shared by several crawlers; only whoever opened it should close it.
+    """
+
+    name = 'base'
+
+    def __init__(
+        self,
+        ssl_context: Optional['ssl.SSLContext'] = None,
+        resolver=None,
+        timeout: Union[FetchTimeouts, Dict, float, None] = None,
+        limit: int = 100,
+        proxy: Optional[str] = None
+    ):
+        self.ssl_context = ssl_context
+        self.resolver = resolver
+        self.timeout = FetchTimeouts.coerce(timeout)
+        self.limit = limit
+        self.proxy = proxy
+
+    async def open(self):
+        """Create connection pools."""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connection pools."""
+        raise NotImplementedError
+
+    async def fetch(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        allow_redirects: bool = True,
+        max_size: Optional[int] = None
+    ) -> FetchResponse:
+        """Perform a GET request and read the whole body.
+
+        The body is requested compressed and decoded while streaming;
+        ResponseTooLarge is raised once it grows past max_size bytes, and
+        FetchTimeout when a phase of the fetch exceeds its limit.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _request_headers(headers: Dict[str, str]) -> Dict[str, str]:
+        """Add an explicit Accept-Encoding unless the caller set one."""
+        if any(key.lower() == 'accept-encoding' for key in headers):
+            return headers
+        return {**headers, 'Accept-Encoding': accept_encoding()}
+
+    async def __aenter__(self) -> 'Transport':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AiohttpTransport(Transport):
+    """HTTP/1.1 transport backed by an aiohttp ClientSession."""
+
+    name = 'aiohttp'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session: Optional['ClientSession'] = None
+
+    async def open(self):
+        import aiohttp
+
+        timeouts = self.timeout
+        connector_kwargs = {
+            'ssl': self.ssl_context if self.ssl_context is not None else True,
+            'limit': self.limit,
+        }
+        if self.resolver is not None:
+            connector_kwargs['resolver'] = self.resolver
+            connector_kwargs['use_dns_cache'] = False
+        connector_class = aiohttp.TCPConnector
+        if timeouts.tls is not None:
+            connector_class = _tls_timeout_connector()
+            connector_kwargs['tls_timeout'] = timeouts.tls
+        self.session = aiohttp.ClientSession(
+            connector=connector_class(**connector_kwargs),
+            timeout=aiohttp.ClientTimeout(
+                total=timeouts.total, sock_connect=timeouts.connect_budget
+            ),
+            auto_decompress=False
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, url, headers, allow_redirects=True, max_size=None):
+        try:
+            return await self._fetch(url, headers, allow_redirects, max_size)
+        except FetchTimeout:
+            raise
+        except Exception as e:
+            phase = _aiohttp_timeout_phase(e)
+            if phase is None:
+                raise
+            raise FetchTimeout(phase, f"{phase} timeout: {e}") from e
+
+    async def _fetch(self, url, headers, allow_redirects, max_size):
+        timeouts = self.timeout
+        response = await timeouts.wait_headers(self.session.get(
+            url,
+            headers=self._request_headers(headers),
+            allow_redirects=allow_redirects,
+            proxy=self.proxy
+        ))
+        async with response:
+            body, wire_bytes = b'', 0
+            if response.status == 200:
+                body, wire_bytes = await read_body(
+                    timeouts.guard_body(
+                        response.content.iter_chunked(READ_CHUNK_SIZE)
+                    ),
+                    response.headers.get('Content-Encoding'),
+                    max_size
+                )
+            return FetchResponse(
+                str(response.url),
+                response.status,
+                response.headers,
+                body,
+                response.charset,
+                wire_bytes
+            )
+
+
+def _tls_timeout_connector():
+    """TCPConnector subclass that bounds the TLS handshake on its own.
+
+    aiohttp only limits the handshake through the overall total timeout;
+    this passes tls_timeout to the event loop as ssl_handshake_timeout.
+    """
+    import aiohttp
+
+    class TLSTimeoutConnector(aiohttp.TCPConnector):
+        def __init__(self, *args, tls_timeout: float, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.tls_timeout = tls_timeout
+
+        async def _wrap_create_connection(self, *args, **kwargs):
+            if kwargs.get('ssl'):
+                kwargs['ssl_handshake_timeout'] = self.tls_timeout
+            return await super()._wrap_create_connection(*args, **kwargs)
+
+    return TLSTimeoutConnector
+
+
+def _aiohttp_timeout_phase(error: Exception) -> Optional[str]:
+    """The timeout phase an aiohttp error stands for, if any."""
+    import asyncio
+    import aiohttp
+
+    if isinstance(error, aiohttp.ServerTimeoutError):
+        # sock_read is never set, so this is the sock_connect window
+        return 'connect'
+    if isinstance(error, aiohttp.ClientConnectorError):
+        os_error = error.os_error
+        # asyncio aborts a handshake past ssl_handshake_timeout this way
+        if (isinstance(os_error, ConnectionAbortedError)
+                and 'handshake' in str(os_error)):
+            return 'tls'
+        return None
+    if isinstance(error, asyncio.TimeoutError):
+        return 'total'
+    return None
+
+
+class HTTP2Transport(Transport):
+    """HTTP/2 transport backed by httpx.
+
+    httpx keeps one connection per origin and multiplexes concurrent
+    requests over it as HTTP/2 streams. HTTPS origins negotiate HTTP/2 via
+    ALPN and fall back to HTTP/1.1; with prior_knowledge=True every origin,
+    including plain http:// (h2c), is spoken to as HTTP/2 only. httpx
+    resolves hosts itself, so the crawler's resolver and host overrides do
+    not apply to this backend. httpx times the TLS handshake as part of
+    connecting, so a slow handshake is reported as a connect timeout.
+    """
+
+    name = 'http2'
+
+    def __init__(self, *args, prior_knowledge: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prior_knowledge = prior_knowledge
+        self.client = None
+
+    async def open(self):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "The http2 transport requires httpx: "
+                "pip install 'httpx[http2]'"
+            ) from e
+
+        verify = self.ssl_context if self.ssl_context is not None else True
+        self.client = httpx.AsyncClient(
+            http1=not self.prior_knowledge,
+            http2=True,
+            verify=verify,
+            timeout=httpx.Timeout(None, connect=self.timeout.connect_budget),
+            limits=httpx.Limits(max_connections=self.limit),
+            proxy=self.proxy
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(self, url, headers, allow_redirects=True, max_size=None):
+        import asyncio
+        import httpx
+
+        fetch = self._fetch(url, headers, allow_redirects, max_size)
+        try:
+            if self.timeout.total is None:
+                return await fetch
+            return await asyncio.wait_for(fetch, self.timeout.total)
+        except httpx.ConnectTimeout as e:
+            raise FetchTimeout('connect', f"connect timeout: {e}") from e
+        except asyncio.TimeoutError as e:
+            if isinstance(e, FetchTimeout):
+                raise
+            raise FetchTimeout(
+                'total', f"fetch exceeded {self.timeout.total:g}s"
+            ) from None
+
+    async def _fetch(self, url, headers, allow_redirects, max_size):
+        timeouts = self.timeout
+        request = self.client.build_request(
+            'GET', url, headers=self._request_headers(headers)
+        )
+        response = await timeouts.wait_headers(self.client.send(
+            request, stream=True, follow_redirects=allow_redirects
+        ))
+        try:
+            body, wire_bytes = b'', 0
+            if response.status_code == 200:
+                body, wire_bytes = await read_body(
+                    timeouts.guard_body(response.aiter_raw(READ_CHUNK_SIZE)),
+                    response.headers.get('Content-Encoding'),
+                    max_size
+                )
+            return FetchResponse(
+                str(response.url),
+                response.status_code,
+                response.headers,
+                body,
+                response.charset_encoding,
+                wire_bytes
+            )
+        finally:
+            await response.aclose()
+
+
+TRANSPORTS: Dict[str, Type[Transport]] = {
+    AiohttpTransport.name: AiohttpTransport,
+    HTTP2Transport.name: HTTP2Transport,
+}
+
+
+def create_transport(name: str, **kwargs) -> Transport:
+    """Instantiate the transport registered under name."""
+    try:
+        transport_class = TRANSPORTS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown transport {name!r}; choose from {', '.join(TRANSPORTS)}"
+        ) from None
+    return transport_class(**kwargs)
@@ -0,0 +1,97 @@
+"""
+Structural crawl-trap detection for the frontier.
+
+Every link is checked before it is queued:
+
+- repeated path segments (``/a/b/a/b/a/b/...``, ``/x/x/x/x``)
+- oversized or ever-growing query strings, including one key repeated
+  over and over by faceted navigation
+- URL templates that explode: each URL is reduced to a per-host template
+  (path segments containing digits become ``{n}``, query values are
+  dropped), and once a template has produced max_per_template URLs,
+  further URLs of that template are refused
+
+The checks touch each link once and keep one counter per template, so the
+cost per link is O(1) amortized in the number of links crawled.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# URLs allowed per (host, template) before the template is capped
+DEFAULT_MAX_PER_TEMPLATE = 1000
+
+# A path segment or query key may appear at most this many times
+DEFAULT_MAX_REPEATS = 3
+
+# Longest query string accepted, in characters
+DEFAULT_MAX_QUERY_LENGTH = 1024
+
+# Trap reasons, also used as metric name suffixes
+REPEATED_SEGMENTS = 'repeated_segments'
+LONG_QUERY = 'long_query'
+TEMPLATE_CAP = 'template_cap'
+
+
+def _template_segment(segment: str) -> str:
+    return '{n}' if any(c.isdigit() for c in segment) else segment
+
+
+def url_template(path: str, query: str) -> str:
+    """Template of a URL path and query, e.g. ``/post/{n}?page``."""
+    template = '/'.join(_template_segment(s) for s in path.split('/'))
+    if query:
+        keys = sorted({pair.split('=', 1)[0] for pair in query.split('&')})
+        template += '?' + '&'.join(keys)
+    return template
+
+
+def _has_repeats(items: List[str], limit: int) -> bool:
+    if len(items) <= limit:
+        return False
+    counts = Counter(items)
+    return max(counts.values()) > limit
+
+
+class TrapDetector:
+    """Per-host URL-pattern analyzer that refuses crawl-trap links."""
+
+    def __init__(
+        self,
+        max_per_template: int = DEFAULT_MAX_PER_TEMPLATE,
+        max_repeats: int = DEFAULT_MAX_REPEATS,
+        max_query_length: int = DEFAULT_MAX_QUERY_LENGTH
+    ):
+        self.max_per_template = max_per_template
+        self.max_repeats = max_repeats
+        self.max_query_length = max_query_length
+        self.templates: Dict[str, int] = {}
+
+    def check(self, link) -> Optional[str]:
+        """Count a ParsedURL against its template.
+
+        Returns None if the link may be crawled, else the trap reason.
+        """
+        path = link.path
+        query = link.url.partition('?')[2].split('#', 1)[0]
+
+        segments = [s for s in path.split('/') if s]
+        if _has_repeats(segments, self.max_repeats):
+            return REPEATED_SEGMENTS
+        if query:
+            if len(query) > self.max_query_length:
+                return LONG_QUERY
+            keys = [pair.split('=', 1)[0] for pair in query.split('&')]
+            if _has_repeats(keys, self.max_repeats):
+                return LONG_QUERY
+
+        key = link.netloc + url_template(path, query)
+        count = self.templates.get(key, 0)
+        if count >= self.max_per_template:
+            return TEMPLATE_CAP
+        self.templates[key] = count + 1
+        return None
+
+    def top_templates(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The n templates with the most URLs queued."""
+        return Counter(self.templates).most_common(n)
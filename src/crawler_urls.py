@@ -0,0 +1,107 @@
+"""
+Parse-once URL representation used throughout the crawl pipeline.
+
+Every discovered link is split exactly once into a ParsedURL, which then
+flows through normalization, scope checks, deduplication and output
+without being parsed again.
+"""
+
+from typing import Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# Link prefixes that never point at a crawlable resource
+SKIPPED_PREFIXES = ('javascript:', 'mailto:', 'tel:', '#')
+
+
+class ParsedURL:
+    """Immutable, pre-split URL carrying its canonical string and hash.
+
+    Instances compare and hash equal to their canonical string, so they can
+    be looked up in sets keyed by plain URL strings and vice versa.
+    """
+
+    __slots__ = ('url', 'scheme', 'netloc', 'path', '_hash')
+
+    def __init__(self, url: str, scheme: str, netloc: str, path: str):
+        object.__setattr__(self, 'url', url)
+        object.__setattr__(self, 'scheme', scheme)
+        object.__setattr__(self, 'netloc', netloc)
+        object.__setattr__(self, 'path', path)
+        object.__setattr__(self, '_hash', hash(url))
+
+    @classmethod
+    def parse(cls, url: str) -> Optional['ParsedURL']:
+        """Split an absolute URL, returning None if it has no scheme or host."""
+        try:
+            scheme, netloc, path, query, fragment = urlsplit(url)
+        except ValueError:
+            return None
+        if not scheme or not netloc:
+            return None
+        netloc = netloc.lower()
+        canonical = urlunsplit((scheme, netloc, path, query, fragment))
+        return cls(canonical, scheme, netloc, path)
+
+    @property
+    def host(self) -> str:
+        """Host name without userinfo or port."""
+        host = self.netloc.rpartition('@')[2]
+        if host.startswith('['):
+            return host.split(']', 1)[0] + ']'
+        return host.split(':', 1)[0]
+
+    @property
+    def port(self) -> Optional[int]:
+        """Explicit port, or None when the scheme default is used."""
+        host_port = self.netloc.rpartition('@')[2]
+        if host_port.startswith('['):
+            host_port = host_port.split(']', 1)[1]
+        _, sep, port = host_port.rpartition(':')
+        return int(port) if sep and port.isdigit() else None
+
+    def geturl(self) -> str:
+        """Return the canonical URL string."""
+        return self.url
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ParsedURL is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('ParsedURL is immutable')
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ParsedURL):
+            return self._hash == other._hash and self.url == other.url
+        if isinstance(other, str):
+            return self.url == other
+        return NotImplemented
+
+    def __ne__(self, other) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __str__(self) -> str:
+        return self.url
+
+    def __repr__(self) -> str:
+        return f"ParsedURL({self.url!r})"
+
+    def __reduce__(self):
+        return (ParsedURL, (self.url, self.scheme, self.netloc, self.path))
+
+
+def normalize_url(base_url: str, url: str) -> Optional[ParsedURL]:
+    """Resolve a raw link against its page and parse it once."""
+    if not url or url.startswith(SKIPPED_PREFIXES):
+        return None
+
+    # Convert relative URLs to absolute
+    if url.startswith('//'):
+        url = 'https:' + url
+    elif not url.startswith(('http://', 'https://')):
+        url = urljoin(base_url, url)
+
+    return ParsedURL.parse(url)
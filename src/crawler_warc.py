@@ -0,0 +1,286 @@
+"""
+WARC recording and offline replay of fetched responses.
+
+RecordingTransport wraps any transport and appends every response it
+returns to a WARC 1.1 archive, one gzip member per record, so each record
+can be read on its own. Next to the archive an index file lists, for every
+requested URL, the offset and length of its record.
+
+ReplayTransport serves fetches from such an archive instead of the
+network: it looks the URL up in the index, seeks to the record and parses
+it, with no connection limits or DNS in the way. Replaying a crawl with the
+same options gives the same Results, which makes it a noise-free input for
+re-running extraction and benchmarking the parser.
+
+Bodies are stored as the crawler saw them, after Content-Encoding was
+decoded; the stored headers drop Content-Encoding and Transfer-Encoding and
+carry the decoded Content-Length.
+"""
+
+import gzip
+import os
+import time
+import uuid
+import zlib
+from http import HTTPStatus
+from typing import IO, Dict, Iterator, Optional, Tuple
+
+from crawler_compression import ResponseTooLarge
+from crawler_transport import FetchResponse, Transport
+
+# Extension field holding the requested URL when a redirect changed it
+REQUEST_URI_FIELD = 'WARC-Crawler-Request-URI'
+# Suffix of the index file kept next to each archive
+INDEX_SUFFIX = '.idx'
+# Per-record gzip level; records are small, so higher levels gain little
+COMPRESS_LEVEL = 6
+# Response headers that describe the wire form of a body, not the stored one
+_WIRE_HEADERS = frozenset({
+    'content-encoding', 'transfer-encoding', 'content-length',
+})
+
+
+class ReplayMiss(LookupError):
+    """Raised when a replayed URL is not in the archive."""
+
+
+def index_path(path: str) -> str:
+    """Path of the index kept next to the archive at path."""
+    return path + INDEX_SUFFIX
+
+
+def _header_bytes(value: str) -> bytes:
+    # aiohttp decodes non-UTF-8 header bytes with surrogateescape
+    return value.encode('utf-8', 'surrogateescape')
+
+
+class WarcWriter:
+    """Appends response records to a gzipped WARC file and its index."""
+
+    def __init__(self, path: str, software: str = 'python-webcrawler'):
+        self.path = path
+        self.software = software
+        self.records = 0
+        self._file: Optional[IO[bytes]] = None
+        self._index: Optional[IO[str]] = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self._index = open(index_path(self.path), 'w', encoding='utf-8')
+        info = f"software: {self.software}\r\nformat: WARC File Format 1.1\r\n"
+        self._write_record('warcinfo', {
+            'WARC-Filename': os.path.basename(self.path),
+            'Content-Type': 'application/warc-fields',
+        }, info.encode('utf-8'))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def write_response(self, requested_url: str, response: FetchResponse):
+        """Append one response record, indexed under requested_url."""
+        status = response.status
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ''
+        lines = [f"HTTP/1.1 {status} {reason}".rstrip().encode('ascii')]
+        for name, value in response.headers.items():
+            if name.lower() not in _WIRE_HEADERS:
+                lines.append(_header_bytes(f"{name}: {value}"))
+        lines.append(f"Content-Length: {len(response.body)}".encode('ascii'))
+        block = b'\r\n'.join(lines) + b'\r\n\r\n' + response.body
+
+        fields = {
+            'WARC-Target-URI': response.url,
+            'Content-Type': 'application/http; msgtype=response',
+        }
+        if requested_url != response.url:
+            fields[REQUEST_URI_FIELD] = requested_url
+        offset, length = self._write_record('response', fields, block)
+        self._index.write(f"{offset}\t{length}\t{requested_url}\n")
+        self.records += 1
+
+    def _write_record(
+        self, record_type: str, fields: Dict[str, str], block: bytes
+    ) -> Tuple[int, int]:
+        header = [
+            'WARC/1.1',
+            f"WARC-Type: {record_type}",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date: " + time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        ]
+        header.extend(f"{name}: {value}" for name, value in fields.items())
+        header.append(f"Content-Length: {len(block)}")
+        record = (
+            _header_bytes('\r\n'.join(header)) + b'\r\n\r\n'
+            + block + b'\r\n\r\n'
+        )
+        member = gzip.compress(record, COMPRESS_LEVEL, mtime=0)
+        offset = self._file.tell()
+        self._file.write(member)
+        return offset, len(member)
+
+    def __enter__(self) -> 'WarcWriter':
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _parse_fields(data: bytes) -> Dict[str, str]:
+    """Parse 'Name: value' lines into a dict (first line skipped)."""
+    fields = {}
+    for line in data.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        fields[name.decode('utf-8', 'surrogateescape').strip()] = (
+            value.decode('utf-8', 'surrogateescape').strip()
+        )
+    return fields
+
+
+def parse_record(record: bytes) -> Tuple[Dict[str, str], bytes]:
+    """Split an uncompressed WARC record into (fields, content block)."""
+    head, _, rest = record.partition(b'\r\n\r\n')
+    fields = _parse_fields(head)
+    length = int(fields.get('Content-Length', len(rest)))
+    return fields, rest[:length]
+
+
+def iter_members(path: str) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield (offset, length, uncompressed record) for each gzip member."""
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            parts = []
+            f.seek(offset)
+            consumed = 0
+            while not decompressor.eof:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    if consumed:
+                        raise ValueError(f"truncated record at {offset}")
+                    return
+                consumed += len(chunk)
+                parts.append(decompressor.decompress(chunk))
+            length = consumed - len(decompressor.unused_data)
+            yield offset, length, b''.join(parts)
+            offset += length
+
+
+def build_index(path: str) -> Dict[str, Tuple[int, int]]:
+    """Scan an archive for its response records and rewrite its index."""
+    index = {}
+    for offset, length, record in iter_members(path):
+        fields, _ = parse_record(record)
+        if fields.get('WARC-Type') != 'response':
+            continue
+        url = fields.get(REQUEST_URI_FIELD) or fields['WARC-Target-URI']
+        index[url] = (offset, length)
+    with open(index_path(path), 'w', encoding='utf-8') as f:
+        f.writelines(
+            f"{offset}\t{length}\t{url}\n"
+            for url, (offset, length) in index.items()
+        )
+    return index
+
+
+def load_index(path: str) -> Dict[str, Tuple[int, int]]:
+    """URL -> (offset, length) for an archive, building the index if absent."""
+    if not os.path.exists(index_path(path)):
+        return build_index(path)
+    index = {}
+    with open(index_path(path), encoding='utf-8') as f:
+        for line in f:
+            offset, length, url = line.rstrip('\n').split('\t', 2)
+            index[url] = (int(offset), int(length))
+    return index
+
+
+class RecordingTransport(Transport):
+    """Transport that records every response of another one to a WARC."""
+
+    def __init__(self, inner: Transport, path: str):
+        super().__init__(
+            ssl_context=inner.ssl_context, resolver=inner.resolver,
+            timeout=inner.timeout, limit=inner.limit, proxy=inner.proxy
+        )
+        self.name = inner.name
+        self.inner = inner
+        self.writer = WarcWriter(path)
+
+    async def open(self):
+        self.writer.open()
+        await self.inner.open()
+
+    async def close(self):
+        try:
+            await self.inner.close()
+        finally:
+            self.writer.close()
+
+    async def fetch(self, url, headers, allow_redirects=True, max_size=None):
+        response = await self.inner.fetch(url, headers, allow_redirects, max_size)
+        self.writer.write_response(url, response)
+        return response
+
+
+class ReplayTransport(Transport):
+    """Transport that answers fetches from a recorded WARC archive."""
+
+    name = 'replay'
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._file: Optional[IO[bytes]] = None
+
+    async def open(self):
+        self.index = load_index(self.path)
+        self._file = open(self.path, 'rb')
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def fetch(self, url, headers, allow_redirects=True, max_size=None):
+        import asyncio
+
+        # Nothing here waits on I/O; yield once so a worker replaying a
+        # whole crawl does not hold the event loop from start to finish
+        await asyncio.sleep(0)
+        response = self.lookup(url)
+        if max_size and len(response.body) > max_size:
+            raise ResponseTooLarge(f"decoded body exceeds {max_size} bytes")
+        return response
+
+    def lookup(self, url: str) -> FetchResponse:
+        """The recorded response for url; raises ReplayMiss if there is none."""
+        from email.parser import BytesHeaderParser
+
+        try:
+            offset, length = self.index[url]
+        except KeyError:
+            raise ReplayMiss(f"{url} is not in {self.path}") from None
+        # Reads never await, so concurrent fetches cannot interleave seeks
+        self._file.seek(offset)
+        fields, block = parse_record(gzip.decompress(self._file.read(length)))
+        head, _, body = block.partition(b'\r\n\r\n')
+        status_line, _, header_lines = head.partition(b'\r\n')
+        message = BytesHeaderParser().parsebytes(header_lines + b'\r\n\r\n')
+        return FetchResponse(
+            fields['WARC-Target-URI'],
+            int(status_line.split(None, 2)[1]),
+            message,
+            body,
+            message.get_param('charset', header='content-type')
+        )
@@ -5,16 +5,103 @@ and JavaScript file locations.
 """
 
 import argparse
-import asyncio
 import json
+import re
 import sys
-from typing import Set, Dict, List, Optional
-from urllib.parse import urljoin, urlparse, urlunparse
-import ssl
+import time
+from typing import (
+    TYPE_CHECKING, AsyncIterator, Iterator, Set, Dict, List, Optional, Tuple,
+    Union
+)
+from urllib.parse import urlsplit
 
-import aiohttp
-from bs4 import BeautifulSoup
-from aiohttp import ClientTimeout, ClientSession
+# asyncio, aiohttp, bs4 and ssl are imported where they are first needed,
+# so `--help` and argument errors return without loading them.
+from crawler_compression import ResponseTooLarge
+from crawler_decoding import EncodingDetector, PageBody
+from crawler_flight import (
+    CACHED, COALESCED, DEFAULT_MAX_ENTRIES, PageCache, shared_page_cache
+)
+from crawler_graph import LinkGraph
+from crawler_metrics import CrawlMetrics
+from crawler_output import OutputWriter, format_result_line, write_all
+from crawler_proxy import (
+    DEFAULT_EJECT_SECONDS, DEFAULT_MAX_FAILURES, PROXY_STRATEGIES,
+    create_proxy_transport, parse_proxies
+)
+from crawler_scope import CrawlScope
+from crawler_simhash import NearDuplicateDetector
+from crawler_timeouts import FetchTimeout, FetchTimeouts
+from crawler_traps import DEFAULT_MAX_PER_TEMPLATE, TrapDetector
+from crawler_transport import TRANSPORTS, Transport, create_transport
+from crawler_urls import ParsedURL, normalize_url
+
+if TYPE_CHECKING:
+    import asyncio
+    from aiohttp import ClientSession
+    from crawler_adaptive import AdaptiveConcurrency
+    from crawler_dns import CachingResolver
+    from crawler_loop import LoopLagMonitor
+
+
+# Tag -> (attribute, source type) pairs evaluated during link extraction.
+# Adding a tag here does not add another pass over the document.
+LINK_ATTRIBUTES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    'a': (('href', 'href'),),
+    'area': (('href', 'href'),),
+    'base': (('href', 'base'),),
+    'link': (('href', 'link'),),
+    'script': (('src', 'script'),),
+    'form': (('action', 'form'),),
+    'iframe': (('src', 'iframe'),),
+    'frame': (('src', 'iframe'),),
+    'img': (('src', 'img'), ('srcset', 'srcset')),
+    'source': (('src', 'img'), ('srcset', 'srcset')),
+    'meta': (('content', 'meta'),),
+}
+
+# data-* attributes that commonly carry lazy-loaded or JS-driven URLs
+DATA_LINK_ATTRIBUTES = frozenset({
+    'data-src', 'data-href', 'data-url', 'data-srcset', 'data-original',
+})
+
+# Source types that lead to another HTML page and are therefore followed
+FOLLOW_SOURCES = frozenset({'href', 'iframe', 'meta'})
+
+_META_REFRESH_URL = re.compile(r'url\s*=\s*[\'"]?([^\'";]+)', re.IGNORECASE)
+
+
+def _parse_srcset(value: str) -> List[str]:
+    """Return the URL candidates of a srcset attribute."""
+    urls = []
+    for candidate in value.split(','):
+        parts = candidate.split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
+def _parse_meta_refresh(tag, content: str) -> Optional[str]:
+    """Return the target of a <meta http-equiv="refresh"> tag, if any."""
+    if tag.get('http-equiv', '').lower() != 'refresh':
+        return None
+    match = _META_REFRESH_URL.search(content)
+    return match.group(1).strip() if match else None
+
+
+# Marks the end of an iter_crawl() result stream
+_CRAWL_DONE = object()
+
+# Rough bytes held per extracted link, for sizing the page cache
+_LINK_WEIGHT = 200
+
+# A fetched page and the links extracted from it
+Page = Tuple[PageBody, List[Tuple[ParsedURL, str]]]
+
+
+def _page_weight(page: Page) -> int:
+    content, links = page
+    return len(content.raw) + _LINK_WEIGHT * len(links)
 
 
 class Result:
@@ -27,6 +114,63 @@ class Result:
         return {"url": self.url, "source": self.source, "where": self.where}
 
 
+class UniqueResult(Result):
+    """The single Result kept for a URL in unique mode.
+
+    source and where are those of the first occurrence; every later
+    occurrence bumps count and adds its source type to sources.
+    """
+
+    def __init__(self, url: str, source: str, where: str = "", parent: str = ""):
+        super().__init__(url, source, where)
+        # Page the URL was first found on
+        self.parent = parent
+        self.sources = [source]
+        self.count = 1
+
+    def add(self, source: str):
+        """Record another occurrence of the URL."""
+        self.count += 1
+        # A URL is found as very few source types, so a list is enough
+        if source not in self.sources:
+            self.sources.append(source)
+
+    def to_dict(self):
+        return {
+            **super().to_dict(),
+            "parent": self.parent,
+            "sources": list(self.sources),
+            "count": self.count,
+        }
+
+
+class OutputIndex:
+    """One UniqueResult per URL, updated in place on every occurrence."""
+
+    def __init__(self):
+        self._records: Dict[str, UniqueResult] = {}
+
+    def add(
+        self, url: str, source: str, where: str = "", parent: str = ""
+    ) -> Optional[UniqueResult]:
+        """Count an occurrence; return the new record for a first one."""
+        record = self._records.get(url)
+        if record is not None:
+            record.add(source)
+            return None
+        record = self._records[url] = UniqueResult(url, source, where, parent)
+        return record
+
+    def get(self, url: str) -> Optional[UniqueResult]:
+        return self._records.get(url)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[UniqueResult]:
+        return iter(self._records.values())
+
+
 class PythonWebCrawler:
     def __init__(
         self,
@@ -40,11 +184,35 @@ class PythonWebCrawler:
         show_where: bool = False,
         json_output: bool = False,
         unique: bool = False,
-        proxy: Optional[str] = None,
-        timeout: int = -1,
+        proxy: Union[str, List[str], None] = None,
+        timeout: Union[int, Dict, FetchTimeouts] = -1,
         disable_redirects: bool = False,
         custom_headers: Optional[Dict[str, str]] = None,
-        live_output: bool = False
+        live_output: bool = False,
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        host_overrides: Optional[Dict[str, str]] = None,
+        transport: Union[str, Transport] = 'aiohttp',
+        output_writer: Optional[OutputWriter] = None,
+        link_graph: bool = False,
+        skip_near_duplicates: bool = False,
+        trap_limit: int = DEFAULT_MAX_PER_TEMPLATE,
+        proxy_strategy: str = 'round_robin',
+        proxy_concurrency: int = 0,
+        proxy_max_failures: int = DEFAULT_MAX_FAILURES,
+        proxy_eject_seconds: float = DEFAULT_EJECT_SECONDS,
+        proxy_health_url: Optional[str] = None,
+        adaptive: bool = False,
+        min_threads: int = 1,
+        status_interval: float = 0,
+        adopt_redirects: bool = False,
+        memory_limit: int = 0,
+        frontier_limit: int = 0,
+        record: Optional[str] = None,
+        replay: Optional[str] = None,
+        monitor_loop: bool = False,
+        block_threshold: float = 0.1,
+        page_cache_size: int = DEFAULT_MAX_ENTRIES
     ):
         self.max_depth = max_depth
         self.max_threads = max_threads
@@ -57,14 +225,64 @@ class PythonWebCrawler:
         self.json_output = json_output
         self.unique = unique
         self.proxy = proxy
+        self.proxy_strategy = proxy_strategy
+        # Requests in flight per proxy; 0 leaves only the overall limit
+        self.proxy_concurrency = proxy_concurrency
+        self.proxy_max_failures = proxy_max_failures
+        self.proxy_eject_seconds = proxy_eject_seconds
+        self.proxy_health_url = proxy_health_url
+        self.adaptive = adaptive
+        self.min_threads = min_threads
+        self.status_interval = status_interval
+        self.adopt_redirects = adopt_redirects
+        self.memory_limit = memory_limit
+        self.frontier_limit = frontier_limit
+        self.record = record
+        self.replay = replay
+        self.monitor_loop = monitor_loop
+        self.block_threshold = block_threshold
+        self.page_cache_size = page_cache_size
         self.timeout = timeout
+        self.timeouts = FetchTimeouts.coerce(timeout)
         self.disable_redirects = disable_redirects
         self.custom_headers = custom_headers or {}
         self.live_output = live_output
+        self.include_patterns = include_patterns or []
+        self.exclude_patterns = exclude_patterns or []
+        self.host_overrides = host_overrides or {}
+        if isinstance(transport, Transport):
+            self.transport_name = transport.name
+            self.transport: Optional[Transport] = transport
+        else:
+            self.transport_name = transport
+            self.transport = None
 
-        self.seen_urls: Set[str] = set()
+        self.seen_urls: Set[ParsedURL] = set()
+        # "scheme://host" -> origin it redirects to
+        self.redirects: Dict[str, str] = {}
         self.results: List[Result] = []
-        self.session: Optional[ClientSession] = None
+        self.output_index: Optional[OutputIndex] = (
+            OutputIndex() if unique else None
+        )
+        self.session: Optional['ClientSession'] = None
+        self.encodings = EncodingDetector()
+        self.metrics = CrawlMetrics()
+        self.resolver: Optional['CachingResolver'] = None
+        self.concurrency: Optional['AdaptiveConcurrency'] = None
+        self.loop_monitor: Optional['LoopLagMonitor'] = None
+        self.page_cache: Optional[PageCache] = None
+        self._request_key: Tuple = ()
+        self._frontier: Optional['asyncio.Queue'] = None
+        self._result_queue: Optional['asyncio.Queue'] = None
+        self.output_writer = output_writer
+        self._writer: Optional[OutputWriter] = None
+        self.graph: Optional[LinkGraph] = LinkGraph() if link_graph else None
+        self.near_duplicates: Optional[NearDuplicateDetector] = (
+            NearDuplicateDetector() if skip_near_duplicates else None
+        )
+        self.traps: Optional[TrapDetector] = (
+            TrapDetector(max_per_template=trap_limit) if trap_limit > 0 else None
+        )
 
         # Default user agent
         self.custom_headers.setdefault(
@@ -74,191 +292,605 @@ class PythonWebCrawler:
         )
 
     def _get_ssl_context(self):
-        """Create SSL context based on insecure flag."""
-        if self.insecure:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            return ssl_context
-        return None
+        """Shared SSL context for the insecure flag and transport."""
+        from crawler_tls import tls_context
+
+        alpn = ('h2', 'http/1.1') if self.transport_name == 'http2' else ()
+        return tls_context(verify=not self.insecure, alpn=alpn)
+
+    def _build_scope(self, seed_url: str) -> CrawlScope:
+        """Compile the crawl scope for a seed URL."""
+        return CrawlScope.from_seed(
+            seed_url,
+            subs=self.subs,
+            inside=self.inside,
+            include=self.include_patterns,
+            exclude=self.exclude_patterns
+        )
 
     def _is_allowed_domain(self, base_url: str, target_url: str) -> bool:
         """Check if target URL is in allowed domain."""
-        if self.subs:
-            # Allow subdomains
-            base_domain = urlparse(base_url).netloc
-            target_domain = urlparse(target_url).netloc
-            return target_domain.endswith(base_domain) or base_domain.endswith(
-                target_domain
-            )
-        else:
-            # Only allow same domain
-            base_domain = urlparse(base_url).netloc
-            target_domain = urlparse(target_url).netloc
-            return base_domain == target_domain
+        scope = CrawlScope.from_seed(base_url, subs=self.subs)
+        target = ParsedURL.parse(target_url)
+        return target is not None and scope.allows(target)
 
     def _is_inside_path(self, base_url: str, target_url: str) -> bool:
         """Check if target URL is inside the base path."""
         if not self.inside:
             return True
 
-        base_path = urlparse(base_url).path
-        target_path = urlparse(target_url).path
-        return target_path.startswith(base_path)
+        base_path = urlsplit(base_url).path
+        return urlsplit(target_url).path.startswith(base_path)
 
-    def _normalize_url(self, base_url: str, url: str) -> Optional[str]:
+    def _normalize_url(self, base_url: str, url: str) -> Optional[ParsedURL]:
         """Normalize and validate URL."""
-        if not url or url.startswith(('javascript:', 'mailto:', 'tel:', '#')):
-            return None
+        return normalize_url(base_url, url)
 
-        # Convert relative URLs to absolute
-        if url.startswith('//'):
-            url = 'https:' + url
-        elif not url.startswith(('http://', 'https://')):
-            url = urljoin(base_url, url)
+    async def _fetch_page(self, url: str) -> Optional[PageBody]:
+        """Fetch page content as undecoded bytes."""
+        if self.concurrency is None:
+            return await self._fetch(url)
 
+        host = urlsplit(url).netloc
+        await self.concurrency.acquire(host)
+        started = time.monotonic()
+        outcome = {}
         try:
-            parsed = urlparse(url)
-            if not parsed.scheme or not parsed.netloc:
-                return None
-            return urlunparse(parsed)
-        except Exception:
-            return None
-
-    async def _fetch_page(self, url: str) -> Optional[str]:
-        """Fetch page content."""
-        try:
-            timeout = ClientTimeout(
-                total=self.timeout if self.timeout > 0 else None
+            return await self._fetch(url, outcome)
+        finally:
+            self.concurrency.release(
+                host, time.monotonic() - started, outcome.get('failed', False)
             )
-            _ = aiohttp.TCPConnector(ssl=self._get_ssl_context())
 
-            async with self.session.get(
+    async def _fetch(
+        self, url: str, outcome: Optional[Dict[str, bool]] = None
+    ) -> Optional[PageBody]:
+        """Fetch a page; outcome['failed'] is set when the host pushed back."""
+        failed = False
+        try:
+            response = await self.transport.fetch(
                 url,
-                timeout=timeout,
+                headers=self.custom_headers,
                 allow_redirects=not self.disable_redirects,
-                headers=self.custom_headers
-            ) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    if self.max_size and len(content) > self.max_size:
-                        return None
-                    return content
+                max_size=self.max_size
+            )
+            self.metrics.incr('wire_bytes', response.wire_bytes)
+            if response.status == 200:
+                self.metrics.incr('pages_fetched')
+                self.metrics.incr('decoded_bytes', len(response.body))
+                return self.encodings.body(
+                    response.host, response.body, response.charset,
+                    response.url
+                )
+            self.metrics.incr('pages_non_200')
+            failed = response.status == 429 or response.status >= 500
+        except ResponseTooLarge:
+            self.metrics.incr('pages_too_large')
+        except FetchTimeout as e:
+            failed = True
+            self.metrics.incr('fetch_errors')
+            self.metrics.incr(f'timeouts_{e.phase}')
+            print(f"[error] Failed to fetch {url}: {e}", file=sys.stderr)
         except Exception as e:
+            failed = True
+            self.metrics.incr('fetch_errors')
             print(f"[error] Failed to fetch {url}: {e}", file=sys.stderr)
+        finally:
+            if outcome is not None:
+                outcome['failed'] = failed
         return None
 
-    def _extract_links(self, html: str, base_url: str) -> List[tuple]:
-        """Extract links from HTML content."""
-        soup = BeautifulSoup(html, 'html.parser')
+    def _extract_links(
+        self, html: Union[str, bytes, PageBody], base_url: str
+    ) -> List[Tuple[ParsedURL, str]]:
+        """Extract links from HTML content in a single document traversal.
+
+        A PageBody is parsed from its raw bytes with the already-detected
+        encoding, so no separate decoded copy or charset sniffing is needed.
+        """
+        from bs4 import BeautifulSoup
+
+        if isinstance(html, PageBody):
+            soup = BeautifulSoup(
+                html.raw, 'html.parser', from_encoding=html.encoding
+            )
+        else:
+            soup = BeautifulSoup(html, 'html.parser')
+        found = []
         links = []
+        base_href = None
 
-        # Extract href links
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            normalized = self._normalize_url(base_url, href)
-            if normalized:
-                links.append((normalized, 'href'))
+        for tag in soup.find_all(True):
+            for attr, source_type in LINK_ATTRIBUTES.get(tag.name, ()):
+                value = tag.get(attr)
+                if not value:
+                    continue
+                if source_type == 'base':
+                    if base_href is None:
+                        base_href = value
+                elif source_type == 'srcset':
+                    found.extend(
+                        (candidate, 'srcset')
+                        for candidate in _parse_srcset(value)
+                    )
+                elif source_type == 'meta':
+                    refresh = _parse_meta_refresh(tag, value)
+                    if refresh:
+                        found.append((refresh, 'meta'))
+                else:
+                    found.append((value, source_type))
 
-        # Extract script sources
-        for script_tag in soup.find_all('script', src=True):
-            src = script_tag['src']
-            normalized = self._normalize_url(base_url, src)
-            if normalized:
-                links.append((normalized, 'script'))
+            # data-src, data-href, data-url and friends on any element
+            for attr, value in tag.attrs.items():
+                if attr not in DATA_LINK_ATTRIBUTES or not value:
+                    continue
+                if attr == 'data-srcset':
+                    found.extend(
+                        (candidate, 'data') for candidate in _parse_srcset(value)
+                    )
+                else:
+                    found.append((value, 'data'))
 
-        # Extract form actions
-        for form_tag in soup.find_all('form', action=True):
-            action = form_tag['action']
-            normalized = self._normalize_url(base_url, action)
+        # <base href> applies to the whole document, wherever it appears
+        if base_href:
+            resolved_base = normalize_url(base_url, base_href)
+            if resolved_base:
+                links.append((resolved_base, 'base'))
+                base_url = resolved_base.url
+
+        for value, source_type in found:
+            normalized = normalize_url(base_url, value.strip())
             if normalized:
-                links.append((normalized, 'form'))
+                links.append((normalized, source_type))
 
         return links
 
-    async def _crawl_url(self, url: str, depth: int, source_url: str = ""):
-        """Crawl a single URL."""
-        if depth > self.max_depth or url in self.seen_urls:
+    async def _crawl_url(
+        self,
+        url: ParsedURL,
+        depth: int,
+        source_url: str = "",
+        scope: Optional[CrawlScope] = None
+    ):
+        """Crawl a single URL; links are marked seen when queued."""
+        if depth > self.max_depth:
             return
 
-        if self.unique and url in self.seen_urls:
+        self.seen_urls.add(url)
+        if scope is None:
+            scope = self._build_scope(url.url)
+
+        page = await self._load_page(url)
+        if page is None:
             return
+        content, links = page
+        if content.url and content.url != url.url:
+            self._follow_redirect(url, content.url, depth, scope)
 
-        self.seen_urls.add(url)
+        # Pages that near-duplicate an earlier page still report their
+        # links, but are not expanded
+        expand = depth < self.max_depth
+        if (self.near_duplicates is not None and expand
+                and self.near_duplicates.check(url.netloc, links)):
+            self.metrics.incr('pages_near_duplicate')
+            expand = False
 
-        content = await self._fetch_page(url)
+        selected = scope.select(links)
+        if self.graph is not None:
+            self.graph.add_page(
+                url.url, depth, [(link.url, kind) for link, kind in selected]
+            )
+
+        # Live lines are written per page, so each page's results stay together
+        live_lines = [] if self._writer is not None else None
+        where = source_url if self.show_where else ""
+        for link, source_type in selected:
+            if self.output_index is None:
+                result = Result(url=link.url, source=source_type, where=where)
+            else:
+                # Repeats only update the URL's record, which was emitted
+                # with its first occurrence
+                result = self.output_index.add(
+                    link.url, source_type, where, url.url
+                )
+                if result is None:
+                    self.metrics.incr('results_merged')
+            if result is not None:
+                await self._emit(result)
+                if live_lines is not None:
+                    live_lines.append(format_result_line(
+                        result, self.show_source, self.show_where
+                    ))
+
+            # Follow links that lead to pages, within depth
+            if expand and source_type in FOLLOW_SOURCES:
+                self._enqueue(link, depth + 1, url.url, scope)
+
+        if live_lines:
+            self._writer.write_lines(live_lines)
+
+    async def _load_page(self, url: ParsedURL) -> Optional[Page]:
+        """Fetch and parse a page, through the transport's page cache.
+
+        Crawlers sharing a transport share one load of a page: a load
+        already running for the same request is joined, and recent pages
+        are served from the cache.
+        """
+        if self.page_cache is None:
+            return await self._fetch_and_parse(url)
+        key = (url.url, self._request_key)
+        page, how = await self.page_cache.load(
+            key, lambda: self._fetch_and_parse(url)
+        )
+        if how == COALESCED:
+            self.metrics.incr('pages_coalesced')
+        elif how == CACHED:
+            self.metrics.incr('pages_cached')
+        return page
+
+    async def _fetch_and_parse(self, url: ParsedURL) -> Optional[Page]:
+        """Fetch a page and extract its links."""
+        content = await self._fetch_page(url.url)
         if not content:
-            return
+            return None
+
+        # Relative links resolve against the page actually served
+        base_url = url.url
+        if content.url and content.url != url.url:
+            final = ParsedURL.parse(content.url)
+            if final is not None:
+                base_url = final.url
+
+        return content, self._extract_links(content, base_url)
 
-        links = self._extract_links(content, url)
-
-        for link_url, source_type in links:
-            # Check if we should follow this link
-            if self._is_allowed_domain(url, link_url) and self._is_inside_path(
-                url, link_url
-            ):
-                # Add result
-                result = Result(
-                    url=link_url,
-                    source=source_type,
-                    where=source_url if self.show_where else ""
+    def _follow_redirect(
+        self, url: ParsedURL, final_url: str, depth: int, scope: CrawlScope
+    ) -> str:
+        """Record a redirect from url to final_url and return the new base.
+
+        The target is marked seen so it is never fetched again. When a seed
+        or a site root moves to another scheme or host that is in scope,
+        keeping its path, the origin is added to the redirect map so later
+        links to the old origin go straight to the new one. Redirects of
+        deeper pages (a login bounced to an SSO host) say nothing about
+        the rest of the site and are not generalized.
+        """
+        final = ParsedURL.parse(final_url)
+        if final is None:
+            return url.url
+        self.metrics.incr('redirects')
+        self.seen_urls.add(final)
+        if final.netloc != url.netloc or final.scheme != url.scheme:
+            if self.adopt_redirects and depth == 0:
+                scope.adopt(final.netloc)
+            if (final.path == url.path
+                    and (depth == 0 or url.path in ('', '/'))
+                    and scope.allows(final)):
+                self.redirects[f"{url.scheme}://{url.netloc}"] = (
+                    f"{final.scheme}://{final.netloc}"
                 )
-                self.results.append(result)
-                
-                # Live output if enabled
-                if self.live_output:
-                    line = result.url
-                    if self.show_source:
-                        line = f"[{result.source}] {line}"
-                    if self.show_where and result.where:
-                        line = f"[{result.where}] {line}"
-                    print(line)
-
-                # Follow link if it's an href and within depth
-                if source_type == 'href' and depth < self.max_depth:
-                    asyncio.create_task(
-                        self._crawl_url(link_url, depth + 1, url)
-                    )
+        return final.url
+
+    def _canonical(self, link: ParsedURL) -> ParsedURL:
+        """Rewrite link onto the origin its host is known to redirect to."""
+        origin = f"{link.scheme}://{link.netloc}"
+        target = self.redirects.get(origin)
+        if target is None:
+            return link
+        return ParsedURL.parse(target + link.url[len(origin):]) or link
+
+    async def _emit(self, result: Result):
+        """Hand a result to the consumer, waiting while its buffer is full."""
+        if self._result_queue is not None:
+            await self._result_queue.put(result)
+        else:
+            self.results.append(result)
+
+    def _enqueue(
+        self,
+        link: ParsedURL,
+        depth: int,
+        source_url: str,
+        scope: CrawlScope
+    ):
+        """Queue a link in the frontier and warm DNS for its host.
+
+        Links are marked seen here, so each URL is queued at most once.
+        Seeds (depth 0) were asked for explicitly and skip the trap check.
+        """
+        if self.redirects:
+            canonical = self._canonical(link)
+            # The rewritten link must still be in scope
+            if canonical is not link and not scope.allows(canonical):
+                return
+            link = canonical
+        if link in self.seen_urls:
+            return
+        if self.traps is not None and depth > 0:
+            trap = self.traps.check(link)
+            if trap is not None:
+                self.metrics.incr(f'links_trapped_{trap}')
+                return
+        self.seen_urls.add(link)
+        if self.resolver is not None:
+            port = link.port or (443 if link.scheme == 'https' else 80)
+            self.resolver.prefetch(link.host, port)
+        self._frontier.put_nowait((link, depth, source_url, scope))
+
+    async def _worker(self):
+        """Crawl URLs from the frontier until cancelled."""
+        while True:
+            url, depth, source_url, scope = await self._frontier.get()
+            try:
+                await self._crawl_url(url, depth, source_url, scope)
+            except Exception as e:
+                print(f"[error] Failed to crawl {url}: {e}", file=sys.stderr)
+            finally:
+                self._frontier.task_done()
+
+    def _create_resolver(self) -> Optional['CachingResolver']:
+        """The DNS cache for this crawler.
+
+        Replays need none, and the http2 backend resolves hosts itself.
+        """
+        if self.replay or self.transport_name == 'http2':
+            return None
+        from crawler_dns import CachingResolver
+
+        return CachingResolver(overrides=self.host_overrides)
+
+    def _create_transport(self) -> Transport:
+        """Build the fetch transport selected for this crawler.
+
+        With several proxies, requests are spread over a ProxyTransport pool
+        with one connection pool per proxy. A replay archive replaces the
+        network entirely; a record archive captures every response.
+        """
+        if self.replay:
+            from crawler_warc import ReplayTransport
+
+            return ReplayTransport(self.replay)
+        transport = self._create_network_transport()
+        if self.record:
+            from crawler_warc import RecordingTransport
+
+            return RecordingTransport(transport, self.record)
+        return transport
+
+    def _create_network_transport(self) -> Transport:
+        kwargs = {
+            'ssl_context': self._get_ssl_context(),
+            'resolver': self.resolver,
+            'timeout': self.timeouts,
+            'limit': max(1, self.max_threads),
+        }
+        proxies = parse_proxies(self.proxy)
+        if proxies:
+            return create_proxy_transport(
+                proxies, self.transport_name,
+                strategy=self.proxy_strategy,
+                max_concurrency=self.proxy_concurrency or None,
+                max_failures=self.proxy_max_failures,
+                eject_seconds=self.proxy_eject_seconds,
+                health_url=self.proxy_health_url,
+                **kwargs
+            )
+        return create_transport(self.transport_name, **kwargs)
+
+    def _create_frontier(self) -> 'asyncio.Queue':
+        """A plain queue, or a spilling one when memory is governed."""
+        import asyncio
+
+        if self.memory_limit <= 0 and self.frontier_limit <= 0:
+            return asyncio.Queue()
+
+        from crawler_frontier import (
+            DEFAULT_MEMORY_ITEMS, MemoryGovernor, SpillingFrontier
+        )
+
+        governor = None
+        if self.memory_limit > 0:
+            governor = MemoryGovernor(self.memory_limit * 1024 * 1024)
+        return SpillingFrontier(
+            memory_items=self.frontier_limit or DEFAULT_MEMORY_ITEMS,
+            governor=governor
+        )
+
+    def _close_frontier(self):
+        """Remove spill files and record how much was spilled."""
+        frontier = self._frontier
+        if not hasattr(frontier, 'spilled'):
+            return
+        frontier.close()
+        self.metrics.incr('frontier_spilled', frontier.spilled)
+        self.metrics.incr('frontier_segments', frontier.segments_written)
+        if frontier.governor is not None and frontier.governor.peak_rss:
+            self.metrics.incr(
+                'peak_rss_mb', frontier.governor.peak_rss // (1024 * 1024)
+            )
 
     async def crawl(self, urls: List[str]):
         """Main crawl method."""
-        # Setup proxy if provided
-        connector_kwargs = {'ssl': self._get_ssl_context()}
-        
-        connector = aiohttp.TCPConnector(**connector_kwargs)
-        timeout = ClientTimeout(
-            total=self.timeout if self.timeout > 0 else None
+        import asyncio
+
+        owns_transport = self.transport is None
+        if owns_transport:
+            self.resolver = self._create_resolver()
+            self.transport = self._create_transport()
+            await self.transport.open()
+        self.session = getattr(self.transport, 'session', None)
+        # Within one crawl each URL is fetched once anyway; the cache pays
+        # off for crawlers that share a transport
+        if not owns_transport and self.page_cache_size > 0:
+            self.page_cache = shared_page_cache(
+                self.transport, max_entries=self.page_cache_size,
+                weigh=_page_weight
+            )
+            self._request_key = (
+                tuple(sorted(self.custom_headers.items())),
+                not self.disable_redirects,
+                self.max_size,
+            )
+        tls_stats = getattr(self.transport.ssl_context, 'stats', None)
+        tls_before = dict(tls_stats) if tls_stats is not None else None
+        self._frontier = self._create_frontier()
+        if self.adaptive and self.concurrency is None:
+            from crawler_adaptive import AdaptiveConcurrency
+
+            self.concurrency = AdaptiveConcurrency(
+                min_limit=max(1, min(self.min_threads, self.max_threads)),
+                max_limit=max(1, self.max_threads)
+            )
+        owns_writer = self.live_output and self.output_writer is None
+        if self.live_output:
+            self._writer = self.output_writer or OutputWriter().start()
+        if self.monitor_loop:
+            from crawler_loop import LoopLagMonitor
+
+            self.loop_monitor = LoopLagMonitor(
+                block_threshold=self.block_threshold
+            )
+            self.loop_monitor.start()
+
+        for url in urls:
+            seed = ParsedURL.parse(url)
+            if seed is None:
+                print(f"[error] Invalid URL: {url}", file=sys.stderr)
+                continue
+            self._enqueue(seed, 0, "", self._build_scope(seed.url))
+
+        workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(max(1, self.max_threads))
+        ]
+        if self.status_interval > 0:
+            workers.append(asyncio.create_task(self._report_status()))
+        try:
+            await self._frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if self.loop_monitor is not None:
+                await self.loop_monitor.stop()
+                for name, value in self.loop_monitor.summary().items():
+                    self.metrics.incr(name, value)
+            self._close_frontier()
+            if owns_writer:
+                # Joining the writer thread may wait on a slow stdout
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._writer.close
+                )
+            self._writer = None
+            if tls_stats is not None:
+                # The context is shared, so count this crawl's handshakes only
+                for name, value in tls_stats.items():
+                    self.metrics.incr(name, value - tls_before.get(name, 0))
+            if owns_transport:
+                await self.transport.close()
+                if self.resolver is not None:
+                    await self.resolver.close()
+                self.transport = None
+                self.session = None
+            self.page_cache = None
+
+    def status(self) -> str:
+        """One-line crawl progress, with per-host limits in adaptive mode."""
+        queued = self._frontier.qsize() if self._frontier is not None else 0
+        line = (
+            f"[status] pages {self.metrics['pages_fetched']} | "
+            f"errors {self.metrics['fetch_errors']} | queued {queued}"
         )
+        if self.concurrency is not None:
+            hosts = ', '.join(
+                f"{host} {in_flight}/{limit}"
+                for host, in_flight, limit in self.concurrency.busiest(3)
+            )
+            line += f" | concurrency {hosts}"
+        if self.loop_monitor is not None:
+            line += (
+                f" | loop lag p99 {self.loop_monitor.percentile(99):g} ms, "
+                f"max {self.loop_monitor.max_lag * 1000:.0f} ms"
+            )
+        return line
 
-        async with ClientSession(
-            connector=connector, timeout=timeout
-        ) as session:
-            self.session = session
+    async def _report_status(self):
+        """Print status() to stderr every status_interval seconds."""
+        import asyncio
 
-            tasks = []
-            for url in urls:
-                task = asyncio.create_task(self._crawl_url(url, 0))
-                tasks.append(task)
+        while True:
+            await asyncio.sleep(self.status_interval)
+            print(self.status(), file=sys.stderr, flush=True)
 
-            await asyncio.gather(*tasks, return_exceptions=True)
+    async def iter_crawl(
+        self, urls: List[str], buffer_size: int = 100
+    ) -> AsyncIterator[Result]:
+        """Crawl urls, yielding each Result as soon as it is discovered.
 
-    def format_output(self) -> str:
-        """Format results for output."""
+        At most buffer_size results wait for the consumer; once the buffer
+        is full the workers pause, so a slow consumer throttles the crawl.
+        Results are not collected in self.results. In unique mode each URL
+        is yielded once, on its first occurrence, and the yielded
+        UniqueResult keeps counting later ones. Breaking out of the loop,
+        cancelling the consumer or calling aclose() stops the crawl and
+        releases its connections.
+        """
+        import asyncio
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer_size))
+
+        async def produce():
+            # Cancellation is not caught: nobody is left to read the marker
+            try:
+                await self.crawl(urls)
+            except Exception:
+                await queue.put(_CRAWL_DONE)
+                raise
+            await queue.put(_CRAWL_DONE)
+
+        self._result_queue = queue
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                result = await queue.get()
+                if result is _CRAWL_DONE:
+                    break
+                yield result
+            # Surface any error raised by the crawl itself
+            await producer
+        finally:
+            self._result_queue = None
+            if not producer.done():
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    def iter_output(self) -> Iterator[str]:
+        """Yield the formatted output in chunks, one per line or JSON item."""
         if self.json_output:
-            results_data = []
-            for result in self.results:
-                results_data.append(result.to_dict())
-            return json.dumps(results_data, indent=2)
+            if not self.results:
+                yield '[]'
+                return
+            yield '['
+            last = len(self.results) - 1
+            for i, result in enumerate(self.results):
+                item = json.dumps(result.to_dict(), indent=2)
+                item = '  ' + item.replace('\n', '\n  ')
+                yield item + ',' if i < last else item
+            yield ']'
         else:
-            output_lines = []
             for result in self.results:
-                line = result.url
-                if self.show_source:
-                    line = f"[{result.source}] {line}"
-                if self.show_where and result.where:
-                    line = f"[{result.where}] {line}"
-                output_lines.append(line)
-            return '\n'.join(output_lines)
+                yield format_result_line(
+                    result, self.show_source, self.show_where
+                )
+
+    def format_output(self) -> str:
+        """Format results for output."""
+        return '\n'.join(self.iter_output())
+
+    def write_output(self, writer: OutputWriter) -> int:
+        """Stream the formatted output to a writer; return the result count."""
+        write_all(writer, self.iter_output())
+        return len(self.results)
 
 
 def parse_headers(headers_str: str) -> Dict[str, str]:
@@ -275,11 +907,32 @@ def parse_headers(headers_str: str) -> Dict[str, str]:
     return headers
 
 
-async def main():
+def parse_host_overrides(entries: List[str]) -> Dict[str, str]:
+    """Parse HOST:ADDRESS static resolution entries."""
+    overrides = {}
+    for entry in entries or []:
+        if ':' in entry:
+            host, address = entry.split(':', 1)
+            overrides[host.strip()] = address.strip()
+
+    return overrides
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse and validate command line arguments."""
     parser = argparse.ArgumentParser(
         description='Python Web Crawler - hakrawler-inspired crawler'
     )
 
+    parser.add_argument(
+        '-adaptive', action='store_true',
+        help='Adapt concurrency per host (AIMD on latency and errors), '
+             'up to -t'
+    )
+    parser.add_argument(
+        '-adopt-redirects', action='store_true',
+        help='Add the host a seed URL redirects to (e.g. www.) to the scope'
+    )
     parser.add_argument(
         '-d', type=int, default=2,
         help='Depth to crawl (default: 2)'
@@ -292,10 +945,28 @@ async def main():
         '--headers', type=str, default='',
         help='Custom headers separated by two semi-colons'
     )
+    parser.add_argument(
+        '-graph', type=str, default='', metavar='FILE',
+        help='Write the link graph to FILE (GraphML for .graphml, '
+             'else a tab-separated edge list)'
+    )
     parser.add_argument(
         '-i', action='store_true',
         help='Only crawl inside path'
     )
+    parser.add_argument(
+        '-include', action='append', default=[], metavar='REGEX',
+        help='Only keep URLs matching this regex (repeatable)'
+    )
+    parser.add_argument(
+        '-dedupe', action='store_true',
+        help='Do not follow links of pages that near-duplicate an earlier '
+             'page (calendars, facets, session IDs)'
+    )
+    parser.add_argument(
+        '-exclude', action='append', default=[], metavar='REGEX',
+        help='Drop URLs matching this regex (repeatable)'
+    )
     parser.add_argument(
         '-insecure', action='store_true',
         help='Disable TLS verification'
@@ -304,9 +975,67 @@ async def main():
         '-json', action='store_true',
         help='Output as JSON'
     )
+    parser.add_argument(
+        '-loop-stats', action='store_true',
+        help='Monitor event loop lag and name callbacks that block it '
+             '(reported with -stats and -status)'
+    )
+    parser.add_argument(
+        '-block-threshold', type=float, default=100, metavar='MS',
+        help='Report callbacks that hold the event loop this long '
+             '(default: 100)'
+    )
+    parser.add_argument(
+        '-memory', type=int, default=0, metavar='MB',
+        help='Spill the crawl frontier to disk when RSS exceeds MB'
+    )
+    parser.add_argument(
+        '-frontier-limit', type=int, default=0, metavar='N',
+        help='Keep at most N queued URLs in memory, spilling the rest '
+             'to disk (default: 100000 with -memory, else unlimited)'
+    )
     parser.add_argument(
         '-proxy', type=str, default='',
-        help='Proxy URL (e.g., http://127.0.0.1:8080)'
+        help='Proxy URL (e.g., http://127.0.0.1:8080); several '
+             'comma-separated proxies are used as a rotating pool'
+    )
+    parser.add_argument(
+        '-proxy-strategy', choices=PROXY_STRATEGIES, default='round_robin',
+        help='How the proxy pool picks a proxy (default: round_robin)'
+    )
+    parser.add_argument(
+        '-proxy-concurrency', type=int, default=0, metavar='N',
+        help='Requests in flight per proxy (default: -t)'
+    )
+    parser.add_argument(
+        '-proxy-failures', type=int, default=DEFAULT_MAX_FAILURES, metavar='N',
+        help='Consecutive failures that eject a proxy from the pool '
+             f'(default: {DEFAULT_MAX_FAILURES})'
+    )
+    parser.add_argument(
+        '-proxy-eject', type=float, default=DEFAULT_EJECT_SECONDS,
+        metavar='SECONDS',
+        help='How long an ejected proxy sits out before it is retried '
+             f'(default: {DEFAULT_EJECT_SECONDS:g})'
+    )
+    parser.add_argument(
+        '-proxy-health', type=str, default='', metavar='URL',
+        help='Probe ejected proxies by fetching URL through them, and '
+             'readmit them as soon as a probe succeeds'
+    )
+    parser.add_argument(
+        '-record', type=str, default='', metavar='FILE',
+        help='Record every response to a gzipped WARC archive (FILE.warc.gz)'
+    )
+    parser.add_argument(
+        '-replay', type=str, default='', metavar='FILE',
+        help='Serve every fetch from a WARC archive made with -record, '
+             'without touching the network'
+    )
+    parser.add_argument(
+        '-resolve', action='append', default=[], metavar='HOST:ADDRESS',
+        help='Resolve HOST to ADDRESS instead of using DNS (repeatable; '
+             'not with -transport http2)'
     )
     parser.add_argument(
         '-s', action='store_true',
@@ -316,6 +1045,14 @@ async def main():
         '-size', type=int, default=-1,
         help='Page size limit, in KB'
     )
+    parser.add_argument(
+        '-status', type=float, default=0, metavar='SECONDS',
+        help='Print a progress line to stderr every SECONDS'
+    )
+    parser.add_argument(
+        '-stats', action='store_true',
+        help='Print crawl metrics to stderr when done'
+    )
     parser.add_argument(
         '-subs', action='store_true',
         help='Include subdomains for crawling'
@@ -328,17 +1065,76 @@ async def main():
         '-timeout', type=int, default=-1,
         help='Maximum time to crawl each URL, in seconds'
     )
+    parser.add_argument(
+        '-connect-timeout', type=float, default=-1, metavar='SECONDS',
+        help='Maximum time to open a TCP connection'
+    )
+    parser.add_argument(
+        '-tls-timeout', type=float, default=-1, metavar='SECONDS',
+        help='Maximum time for a TLS handshake'
+    )
+    parser.add_argument(
+        '-ttfb-timeout', type=float, default=-1, metavar='SECONDS',
+        help='Maximum time from sending a request to its response headers '
+             '(on top of the connect and TLS limits)'
+    )
+    parser.add_argument(
+        '-read-timeout', type=float, default=-1, metavar='SECONDS',
+        help='Maximum pause between two chunks of a response body'
+    )
+    parser.add_argument(
+        '-min-rate', type=float, default=-1, metavar='BYTES',
+        help='Abort responses whose body arrives slower than BYTES per second'
+    )
+    parser.add_argument(
+        '-trap-limit', type=int, default=DEFAULT_MAX_PER_TEMPLATE,
+        metavar='N',
+        help='Queue at most N discovered URLs per host and URL template, '
+             'e.g. /post/{n}?page; on by default, seed URLs are exempt '
+             f'(0 disables; default: {DEFAULT_MAX_PER_TEMPLATE})'
+    )
+    parser.add_argument(
+        '-transport', choices=sorted(TRANSPORTS), default='aiohttp',
+        help='HTTP backend; http2 multiplexes requests per host '
+             '(default: aiohttp)'
+    )
     parser.add_argument(
         '-u', action='store_true',
-        help='Show only unique URLs'
+        help='Show each URL once, with its occurrence count, source types '
+             'and first parent page in -json output'
+    )
+    parser.add_argument(
+        '-uvloop', action='store_true',
+        help='Run on the uvloop event loop (pip install uvloop)'
     )
     parser.add_argument(
         '-w', action='store_true',
         help='Show at which link the URL is found'
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
+    # Validate cheaply, before the crawl machinery is imported
+    for pattern in args.include + args.exclude:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            parser.error(f"invalid regex {pattern!r}: {e}")
+    for entry in args.resolve:
+        if ':' not in entry:
+            parser.error(f"-resolve expects HOST:ADDRESS, got {entry!r}")
+    if args.resolve and args.transport == 'http2':
+        parser.error("-resolve cannot be combined with -transport http2")
+    if args.t < 1:
+        parser.error("-t must be at least 1")
+    if args.record and args.replay:
+        parser.error("-record and -replay cannot be combined")
+
+    return args
+
+
+def read_urls() -> List[str]:
+    """Read seed URLs from stdin, exiting if there are none."""
     # Check for stdin input
     if sys.stdin.isatty():
         print(
@@ -359,8 +1155,14 @@ async def main():
         print("No valid URLs provided", file=sys.stderr)
         sys.exit(1)
 
+    return urls
+
+
+async def run(args: argparse.Namespace, urls: List[str]):
+    """Crawl urls with the parsed command line options and print results."""
     # Parse custom headers
     custom_headers = parse_headers(args.headers)
+    host_overrides = parse_host_overrides(args.resolve)
 
     # Create crawler
     crawler = PythonWebCrawler(
@@ -375,29 +1177,81 @@ async def main():
         json_output=args.json,
         unique=args.u,
         proxy=args.proxy,
-        timeout=args.timeout,
+        timeout=FetchTimeouts(
+            total=args.timeout,
+            connect=args.connect_timeout,
+            tls=args.tls_timeout,
+            ttfb=args.ttfb_timeout,
+            read_idle=args.read_timeout,
+            min_rate=args.min_rate
+        ),
         disable_redirects=args.dr,
-        custom_headers=custom_headers
+        custom_headers=custom_headers,
+        include_patterns=args.include,
+        exclude_patterns=args.exclude,
+        host_overrides=host_overrides,
+        transport=args.transport,
+        link_graph=bool(args.graph),
+        skip_near_duplicates=args.dedupe,
+        trap_limit=args.trap_limit,
+        proxy_strategy=args.proxy_strategy,
+        proxy_concurrency=args.proxy_concurrency,
+        proxy_max_failures=args.proxy_failures,
+        proxy_eject_seconds=args.proxy_eject,
+        proxy_health_url=args.proxy_health or None,
+        adaptive=args.adaptive,
+        status_interval=args.status,
+        adopt_redirects=args.adopt_redirects,
+        memory_limit=args.memory,
+        frontier_limit=args.frontier_limit,
+        record=args.record or None,
+        replay=args.replay or None,
+        monitor_loop=args.loop_stats,
+        block_threshold=args.block_threshold / 1000
     )
 
     # Start crawling
     await crawler.crawl(urls)
 
     # Output results
-    output = crawler.format_output()
-    if output:
-        print(output)
+    if crawler.results or crawler.json_output:
+        with OutputWriter() as writer:
+            crawler.write_output(writer)
     else:
         print(
             "No URLs were found. This usually happens when a domain is specified "
             "(https://example.com), but it redirects to a subdomain "
             "(https://www.example.com). The subdomain is not included in the "
             "scope, so no URLs are printed. In order to overcome this, either "
-            "specify the final URL in the redirect chain or use the -subs option "
+            "specify the final URL in the redirect chain, use -adopt-redirects "
+            "to add the redirect target to the scope, or use the -subs option "
             "to include subdomains.",
             file=sys.stderr
         )
 
+    if crawler.graph is not None:
+        crawler.graph.write(args.graph)
+
+    if args.stats:
+        print(crawler.metrics.format(), file=sys.stderr)
+        if crawler.graph is not None:
+            print(crawler.graph.format_stats(), file=sys.stderr)
+        if crawler.loop_monitor is not None:
+            print(crawler.loop_monitor.format(), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    urls = read_urls()
+
+    from crawler_loop import run_event_loop
+
+    try:
+        run_event_loop(run(args, urls), use_uvloop=args.uvloop)
+    except ImportError as e:
+        print(f"[error] {e}", file=sys.stderr)
+        sys.exit(2)
+
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    main()
@@ -4,16 +4,32 @@ Streamlined Web Crawler Interface
 Simple step-by-step crawling
 """
 
-import asyncio
-import json
-import csv
+import argparse
 import os
+import sys
+from crawler_export import export_results
+from crawler_loop import require_uvloop, run_event_loop
 from python_webcrawler import PythonWebCrawler, parse_headers
 
+# Exports land in <repo>/output no matter which directory we run from
+DEFAULT_OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "output"
+)
+
+# Instant and Quick Scan let each host's concurrency find its own level
+ADAPTIVE_OPTIONS = {
+    'adaptive': True,
+    'min_threads': 1,
+    'max_threads': 32,
+    'status_interval': 5.0,
+}
+
 
 class StreamlinedWebCrawler:
-    def __init__(self):
+    def __init__(self, output_dir=None, use_uvloop=False):
         self.last_results = []
+        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        self.use_uvloop = use_uvloop
 
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -87,6 +103,7 @@ class StreamlinedWebCrawler:
             options['show_source'] = False
             options['unique'] = True
             options['live_output'] = True
+            options.update(ADAPTIVE_OPTIONS)
             
         elif scan_type == 2:  # Quick Scan
             options['max_depth'] = self.get_input("Crawl depth (1-3)", 2, int)
@@ -94,6 +111,7 @@ class StreamlinedWebCrawler:
             options['show_source'] = True
             options['unique'] = True
             options['live_output'] = True
+            options.update(ADAPTIVE_OPTIONS)
             
         elif scan_type == 3:  # Advanced Scan
             print("\n--- ADVANCED OPTIONS ---")
@@ -138,11 +156,13 @@ class StreamlinedWebCrawler:
         print(f"\n[*] Starting crawl...")
         print(f"[*] URLs to scan: {len(urls)}")
         print(f"[*] Depth: {options['max_depth']}")
+        if options.get('adaptive'):
+            print(f"[*] Concurrency: adaptive, up to {options['max_threads']} per host")
         print("[*] Live results:")
         print("-" * 50)
 
         crawler = PythonWebCrawler(**options)
-        asyncio.run(crawler.crawl(urls))
+        run_event_loop(crawler.crawl(urls), use_uvloop=self.use_uvloop)
         
         self.last_results = crawler.results
         
@@ -182,49 +202,40 @@ class StreamlinedWebCrawler:
         print("1. TXT (URL list)")
         print("2. JSON (with metadata)")
         print("3. CSV (spreadsheet)")
-        format_choice = self.get_input("Choose format (1-3)", 1, int)
+        print("4. JSONL (one JSON object per line)")
+        print("5. SQLite (queryable database)")
+        print("6. Parquet (columnar, needs pyarrow)")
+        format_choice = self.get_input("Choose format (1-6)", 1, int)
         
-        format_map = {1: "txt", 2: "json", 3: "csv"}
+        format_map = {
+            1: "txt", 2: "json", 3: "csv", 4: "jsonl", 5: "sqlite", 6: "parquet"
+        }
         export_format = format_map.get(format_choice, "txt")
         
         self.export_results(filename, export_format)
 
-    def export_results(self, filename, export_format):
-        """Export results to file"""
-        # Ensure output directory exists
-        output_dir = os.path.join("..", "output")
-        os.makedirs(output_dir, exist_ok=True)
-
+    def export_results(self, filename, export_format, output_dir=None):
+        """Export results to file, reporting any failure"""
         try:
-            if export_format == "txt":
-                filepath = os.path.join(output_dir, f"{filename}.txt")
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    for result in self.last_results:
-                        f.write(f"{result.url}\n")
-                print(f"[*] Saved: {filename}.txt")
-
-            elif export_format == "json":
-                data = [result.to_dict() for result in self.last_results]
-                filepath = os.path.join(output_dir, f"{filename}.json")
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                print(f"[*] Saved: {filename}.json")
-
-            elif export_format == "csv":
-                filepath = os.path.join(output_dir, f"{filename}.csv")
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['URL', 'Source', 'Where'])
-                    for result in self.last_results:
-                        url = result.url
-                        source = getattr(result, 'source', '')
-                        where = getattr(result, 'where', '')
-                        writer.writerow([url, source, where])
-                print(f"[*] Saved: {filename}.csv")
-
+            self.save_results(filename, export_format, output_dir)
         except Exception as e:
             print(f"\n[!] Export failed: {e}")
 
+    def save_results(self, filename, export_format, output_dir=None):
+        """Export results to file and return its path; errors propagate"""
+        # Ensure output directory exists
+        if output_dir is None:
+            output_dir = self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        filepath = export_results(
+            self.last_results,
+            os.path.join(output_dir, filename),
+            export_format
+        )
+        print(f"[*] Saved: {os.path.basename(filepath)}")
+        return filepath
+
     def run(self):
         """Main application loop"""
         while True:
@@ -263,9 +274,55 @@ class StreamlinedWebCrawler:
             input("\nPress Enter to continue...")
 
 
-def main():
+def save_job_results(job, crawler):
+    """Export a finished headless job's results"""
+    print(f"[+] {job.name}: {len(crawler.results)} URLs", file=sys.stderr)
+    if not crawler.results:
+        return
+    exporter = StreamlinedWebCrawler()
+    exporter.last_results = crawler.results
+    exporter.save_results(job.filename, job.export_format, job.output_dir)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Python Web Crawler - interactive or headless job runner'
+    )
+    parser.add_argument(
+        '-j', '--job', action='append', default=[], metavar='FILE',
+        help='Run the jobs in a TOML/JSON job file without prompting '
+             '(repeatable)'
+    )
+    parser.add_argument(
+        '--config', default=None, metavar='FILE',
+        help='Path to default_config.py (default: config/default_config.py)'
+    )
+    parser.add_argument(
+        '--uvloop', action='store_true',
+        help='Run crawls on the uvloop event loop (pip install uvloop)'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.uvloop:
+        # Checked up front, so the menu never dies mid-scan
+        try:
+            require_uvloop()
+        except ImportError as e:
+            print(f"[!] {e}", file=sys.stderr)
+            sys.exit(2)
+
+    if args.job:
+        from crawler_jobs import DEFAULT_CONFIG_PATH, run_job_files
+        sys.exit(run_job_files(
+            args.job, save_job_results, args.config or DEFAULT_CONFIG_PATH,
+            use_uvloop=args.uvloop
+        ))
+
     try:
-        crawler = StreamlinedWebCrawler()
+        crawler = StreamlinedWebCrawler(use_uvloop=args.uvloop)
         crawler.run()
     except KeyboardInterrupt:
         print("\n[*] Goodbye!")
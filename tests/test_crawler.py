@@ -3,6 +3,9 @@
 Test suite for Python Web Crawler
 """
 
+import asyncio
+import shutil
+from collections import Counter
 import unittest
 import sys
 import os
@@ -11,6 +14,12 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from python_webcrawler import PythonWebCrawler, Result, parse_headers
+from crawler_compression import ResponseTooLarge, read_body
+from crawler_decoding import EncodingDetector
+from crawler_dns import CachingResolver, DNSCache
+from crawler_scope import CrawlScope
+from crawler_transport import AiohttpTransport, create_transport
+from crawler_urls import ParsedURL
 
 
 class TestPythonWebCrawler(unittest.TestCase):
@@ -99,6 +108,214 @@ class TestPythonWebCrawler(unittest.TestCase):
             crawler_no_inside._is_inside_path("https://example.com/path", "https://example.com/other")
         )
 
+    def test_link_extraction(self):
+        """Test extraction of every supported tag and attribute"""
+        html = """
+        <html><head>
+          <base href="https://example.com/docs/">
+          <link rel="stylesheet" href="style.css">
+          <meta http-equiv="refresh" content="5; url=/moved">
+          <script src="/app.js"></script>
+        </head><body>
+          <a href="page.html">Page</a>
+          <map><area href="/area"></map>
+          <img src="logo.png" srcset="small.png 1x, large.png 2x">
+          <iframe src="/frame"></iframe>
+          <div data-src="/lazy.png"></div>
+          <form action="/submit"></form>
+        </body></html>
+        """
+        links = self.crawler._extract_links(html, "https://example.com/")
+        self.assertEqual(set(links), {
+            ("https://example.com/docs/", "base"),
+            ("https://example.com/docs/style.css", "link"),
+            ("https://example.com/moved", "meta"),
+            ("https://example.com/app.js", "script"),
+            ("https://example.com/docs/page.html", "href"),
+            ("https://example.com/area", "href"),
+            ("https://example.com/docs/logo.png", "img"),
+            ("https://example.com/docs/small.png", "srcset"),
+            ("https://example.com/docs/large.png", "srcset"),
+            ("https://example.com/frame", "iframe"),
+            ("https://example.com/lazy.png", "data"),
+            ("https://example.com/submit", "form"),
+        })
+
+    def test_scope_matching(self):
+        """Test compiled scope host, path and pattern matching"""
+        from urllib.parse import urlsplit
+
+        scope = CrawlScope.from_seed("https://example.com/docs", subs=True)
+        self.assertTrue(scope.allows(urlsplit("https://a.b.example.com/x")))
+        self.assertFalse(scope.allows(urlsplit("https://evilexample.com/")))
+
+        scope = CrawlScope.from_seed(
+            "https://example.com/docs", inside=True,
+            include=[r"\.html$"], exclude=[r"/private/"]
+        )
+        links = [
+            (urlsplit(url), url) for url in (
+                "https://example.com/docs/a.html",
+                "https://example.com/docs/private/b.html",
+                "https://example.com/docs/c.js",
+                "https://example.com/other/d.html",
+                "https://sub.example.com/docs/e.html",
+            )
+        ]
+        self.assertEqual(
+            [url for _, url in scope.select(links)],
+            ["https://example.com/docs/a.html"]
+        )
+
+    def test_parsed_url(self):
+        """Test the parse-once URL representation"""
+        parsed = ParsedURL.parse("HTTPS://Example.COM:8443/a/b?q=1")
+        self.assertEqual(parsed.url, "https://example.com:8443/a/b?q=1")
+        self.assertEqual(parsed.host, "example.com")
+        self.assertEqual(parsed.path, "/a/b")
+        self.assertIn("https://example.com:8443/a/b?q=1", {parsed})
+        self.assertIsNone(ParsedURL.parse("/relative/only"))
+        with self.assertRaises(AttributeError):
+            parsed.url = "https://other.com"
+
+    def test_encoding_detection(self):
+        """Test hint-driven decoding and the per-host encoding cache"""
+        detector = EncodingDetector()
+        page = '<meta charset="windows-1252"><a href="/caf\xe9">x</a>'
+        body = detector.body("example.com", page.encode("cp1252"))
+        self.assertEqual(body.encoding, "cp1252")
+        self.assertIn("/caf\xe9", body.text)
+
+        # No hints on the next page: the host's last encoding is reused
+        body = detector.body("example.com", "<p>\xe9</p>".encode("cp1252"))
+        self.assertEqual(body.encoding, "cp1252")
+        self.assertEqual(detector.detect("other.com", b"<p>plain</p>"), "utf-8")
+        self.assertEqual(
+            detector.detect("other.com", b"<p></p>", header_charset="latin-1"),
+            "iso8859-1"
+        )
+
+        links = self.crawler._extract_links(body, "https://example.com/")
+        self.assertEqual(links, [])
+        body = detector.body("example.com", page.encode("cp1252"))
+        links = self.crawler._extract_links(body, "https://example.com/")
+        self.assertEqual(links, [("https://example.com/caf\xe9", "href")])
+
+    def test_near_duplicate_fingerprints(self):
+        """Test SimHash ignores query values and finds near duplicates"""
+        from crawler_simhash import SimHashIndex, page_fingerprint, popcount
+
+        def page(extra):
+            paths = [f"/nav/{i}" for i in range(20)] + extra
+            return [
+                (ParsedURL.parse("https://example.com" + p), "href")
+                for p in paths
+            ]
+
+        first = page_fingerprint(page(["/cal?month=1&sid=a", "/event/1"]))
+        same = page_fingerprint(page(["/cal?month=2&sid=b", "/event/1"]))
+        close = page_fingerprint(page(["/cal?month=2", "/event/2"]))
+        other = page_fingerprint(page([f"/item/{i}" for i in range(20)]))
+        self.assertEqual(first, same)
+        self.assertIsNone(page_fingerprint(page([])[:3]))
+
+        index = SimHashIndex(distance=6)
+        self.assertFalse(index.check(first))
+        self.assertLessEqual(popcount(first ^ close), 6)
+        self.assertTrue(index.check(close))
+        self.assertFalse(index.check(other))
+        self.assertEqual(len(index), 2)
+
+    def test_shared_navigation_is_not_a_near_duplicate(self):
+        """Test site-wide links are left out of page fingerprints"""
+        from crawler_simhash import NearDuplicateDetector
+
+        def page(paths):
+            nav = [f"/nav/{i}" for i in range(86)]
+            return [
+                (ParsedURL.parse("https://example.com" + p), "href")
+                for p in nav + paths
+            ]
+
+        detector = NearDuplicateDetector(sample_pages=10)
+        flagged = [
+            detector.check(
+                "example.com", page([f"/post/{i}/{j}" for j in range(15)])
+            )
+            for i in range(200)
+        ]
+        self.assertEqual(sum(flagged), 0)
+
+        # Beyond the navigation, calendar pages only differ in query values
+        def month(m):
+            return page(
+                [f"/cal/{view}?month={m}" for view in range(12)]
+                + [f"/cal/day/{k}?date={m}-{k}" for k in range(28)]
+            )
+
+        self.assertFalse(detector.check("example.com", month(1)))
+        self.assertTrue(detector.check("example.com", month(2)))
+
+    def test_trap_detector(self):
+        """Test URL templates, repeated segments and the template cap"""
+        from crawler_traps import TrapDetector, url_template
+
+        self.assertEqual(
+            url_template("/post/2024/item-7", "page=3&sort=new"),
+            "/post/{n}/{n}?page&sort"
+        )
+        traps = TrapDetector(max_per_template=3)
+
+        def check(url):
+            return traps.check(ParsedURL.parse(url))
+
+        self.assertEqual(
+            check("https://example.com/a/b/a/b/a/b/a/b"), "repeated_segments"
+        )
+        self.assertEqual(
+            check("https://example.com/s?f=1&f=2&f=3&f=4"), "long_query"
+        )
+        self.assertEqual(
+            [check(f"https://example.com/list?page={n}") for n in range(5)],
+            [None, None, None, "template_cap", "template_cap"]
+        )
+        self.assertIsNone(check("https://other.com/list?page=9"))
+        self.assertEqual(
+            traps.top_templates(1), [("example.com/list?page", 3)]
+        )
+
+    def test_format_output(self):
+        """Test text and JSON output formatting"""
+        import json
+
+        self.crawler.results = [
+            Result("https://example.com/a", "href", "https://example.com"),
+            Result("https://example.com/b.js", "script"),
+        ]
+        self.crawler.show_source = True
+        self.assertEqual(
+            self.crawler.format_output(),
+            "[href] https://example.com/a\n[script] https://example.com/b.js"
+        )
+        self.crawler.json_output = True
+        self.assertEqual(
+            self.crawler.format_output(),
+            json.dumps([r.to_dict() for r in self.crawler.results], indent=2)
+        )
+
+    def test_output_writer_batches(self):
+        """Test the writer keeps batches contiguous and flushes on close"""
+        import io
+        from crawler_output import OutputWriter
+
+        stream = io.StringIO()
+        with OutputWriter(stream, max_lines=3, flush_interval=60) as writer:
+            writer.write_lines(["a1", "a2"])
+            writer.write_lines(["b1", "b2", "b3"])
+            writer.write("c1")
+        self.assertEqual(stream.getvalue(), "a1\na2\nb1\nb2\nb3\nc1\n")
+        self.assertEqual(writer.lines_written, 6)
+
     def test_parse_headers(self):
         """Test header parsing functionality"""
         headers_str = "User-Agent: Bot/1.0;;Accept: text/html"
@@ -115,6 +332,1171 @@ class TestPythonWebCrawler(unittest.TestCase):
         self.assertEqual(parse_headers(None), {})
 
 
+SITE_PAGES = {
+    "/": '<a href="/a">A</a><a href="/b">B</a><script src="/app.js"></script>',
+    "/a": '<a href="/b">B</a><a href="/c">C</a>',
+    "/b": '<a href="/">Home</a>',
+    "/c": '<a href="/d">D</a>',
+    "/d": 'end',
+    "/deep/": '<a href="/deep/login">Login</a><a href="/deep/next">Next</a>',
+    "/deep/next": '<a href="/b">B</a><a href="/c">C</a>',
+    "/deep/login": 'signed in',
+}
+
+
+class LocalSiteTestCase(unittest.IsolatedAsyncioTestCase):
+    """Base class serving SITE_PAGES from a local aiohttp server"""
+
+    async def asyncSetUp(self):
+        from aiohttp import web
+
+        self.hits = Counter()
+        self.hosts = Counter()
+
+        async def handler(request):
+            self.hits[request.path] += 1
+            self.hosts[request.host.split(":")[0]] += 1
+            if request.host.startswith("site.test") and request.path == "/deep/login":
+                # A single page bounced to another host, like an SSO login
+                raise web.HTTPFound(f"http://sso.test:{self.port}/deep/login")
+            if request.host.startswith("old.test"):
+                # A retired host that redirects every path to site.test
+                raise web.HTTPMovedPermanently(
+                    f"http://site.test:{self.port}{request.path_qs}"
+                )
+            if request.path.startswith("/slow/"):
+                return await self._slow_response(request)
+            body = SITE_PAGES.get(request.path)
+            if body is None:
+                return web.Response(status=404)
+            return web.Response(text=body, content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        self.base = f"http://site.test:{self.port}"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    @staticmethod
+    async def _slow_response(request):
+        """Misbehaving responses: late headers, a stalled or trickling body"""
+        from aiohttp import web
+
+        if request.path == "/slow/headers":
+            await asyncio.sleep(2)
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        if request.path == "/slow/stall":
+            # Enough bytes that only the idle limit, not the rate, trips
+            await response.write(b"<html>" + b" " * 4096)
+            await asyncio.sleep(2)
+        elif request.path == "/slow/dribble":
+            await response.write(b"<html>")
+            await asyncio.sleep(2)
+        elif request.path == "/slow/trickle":
+            for _ in range(40):
+                await response.write(b"<!-- -->")
+                await asyncio.sleep(0.05)
+        await response.write_eof()
+        return response
+
+
+class TestCrawl(LocalSiteTestCase):
+    """End-to-end crawls against a local server"""
+
+    async def test_crawl_follows_links_to_depth(self):
+        """Test the frontier crawls every page within depth"""
+        crawler = PythonWebCrawler(
+            max_depth=2, host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        urls = {result.url for result in crawler.results}
+        self.assertEqual(crawler.metrics["pages_fetched"], 4)
+        self.assertGreater(crawler.metrics["wire_bytes"], 0)
+        self.assertIn(self.base + "/app.js", urls)
+        self.assertIn(self.base + "/c", urls)
+        self.assertIn(self.base + "/d", urls)
+        self.assertNotIn(self.base + "/d", crawler.seen_urls)
+
+    async def test_seeds_skip_trap_limit(self):
+        """Test seed URLs are fetched even past the per-template cap"""
+        crawler = PythonWebCrawler(
+            max_depth=0, trap_limit=2,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([f"{self.base}/b?id={n}" for n in range(5)])
+        self.assertEqual(self.hits["/b"], 5)
+        self.assertEqual(crawler.metrics["links_trapped_template_cap"], 0)
+
+    async def test_unique_mode_merges_occurrences(self):
+        """Test unique mode keeps one aggregated record per URL"""
+        import json
+
+        crawler = PythonWebCrawler(
+            max_depth=2, unique=True, json_output=True,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        urls = [result.url for result in crawler.results]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(len(crawler.output_index), len(urls))
+
+        page_b = crawler.output_index.get(self.base + "/b")
+        self.assertEqual(page_b.count, 2)
+        self.assertEqual(page_b.sources, ["href"])
+        self.assertEqual(page_b.parent, self.base + "/")
+        self.assertEqual(crawler.metrics["results_merged"], 1)
+        self.assertEqual(
+            json.loads(crawler.format_output()),
+            [result.to_dict() for result in crawler.results]
+        )
+
+    async def test_live_output_goes_through_writer(self):
+        """Test live results are written in per-page batches"""
+        import io
+        from crawler_output import OutputWriter
+
+        stream = io.StringIO()
+        writer = OutputWriter(stream).start()
+        crawler = PythonWebCrawler(
+            max_depth=1, live_output=True, output_writer=writer,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        writer.close()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines, [r.url for r in crawler.results])
+
+    async def test_link_graph(self):
+        """Test the link graph records edges, in-degree, depth and exports"""
+        import tempfile
+        from xml.etree import ElementTree
+
+        crawler = PythonWebCrawler(
+            max_depth=2, link_graph=True,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        graph = crawler.graph
+        self.assertEqual(
+            graph.successors(self.base + "/"),
+            [self.base + "/a", self.base + "/b", self.base + "/app.js"]
+        )
+        self.assertEqual(graph.edge_count, 7)
+        self.assertEqual(graph.top_hubs(1), [(self.base + "/b", 2)])
+        self.assertEqual(graph.depth_histogram(), {0: 1, 1: 3, 2: 1, 3: 1})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.graphml")
+            self.assertEqual(graph.write(path), 7)
+            ns = "{http://graphml.graphdrawing.org/xmlns}"
+            root = ElementTree.parse(path).getroot()
+            self.assertEqual(len(list(root.iter(ns + "node"))), 6)
+            self.assertEqual(len(list(root.iter(ns + "edge"))), 7)
+
+            path = os.path.join(tmp, "graph.tsv")
+            graph.write(path)
+            with open(path, encoding="utf-8") as f:
+                first = f.readline().rstrip("\n").split("\t")
+            self.assertEqual(first, [self.base + "/", self.base + "/a", "href"])
+
+    async def test_adaptive_crawl(self):
+        """Test an adaptive crawl completes and reports per-host limits"""
+        crawler = PythonWebCrawler(
+            max_depth=2, max_threads=4, adaptive=True,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        netloc = f"site.test:{self.port}"
+        self.assertEqual(crawler.metrics["pages_fetched"], 4)
+        self.assertGreater(crawler.concurrency.limit(netloc), 2)
+        self.assertIn(f"concurrency {netloc} 0/", crawler.status())
+
+    async def test_redirect_adopted_into_scope(self):
+        """Test a seed redirect is adopted, mapped and used as link base"""
+        overrides = {"site.test": "127.0.0.1", "old.test": "127.0.0.1"}
+        old = f"http://old.test:{self.port}"
+
+        crawler = PythonWebCrawler(max_depth=1, host_overrides=overrides)
+        await crawler.crawl([old + "/"])
+        self.assertEqual(crawler.results, [])
+
+        crawler = PythonWebCrawler(
+            max_depth=2, adopt_redirects=True, host_overrides=overrides
+        )
+        await crawler.crawl([old + "/"])
+        urls = {result.url for result in crawler.results}
+        self.assertIn(self.base + "/c", urls)
+        self.assertFalse(any(url.startswith(old) for url in urls))
+        self.assertEqual(crawler.redirects, {old: self.base})
+        self.assertIn(self.base + "/", crawler.seen_urls)
+        self.assertEqual(crawler.metrics["redirects"], 1)
+        self.assertEqual(crawler.metrics["pages_fetched"], 4)
+
+        # Links to the old host skip the redirect round trip
+        link = ParsedURL.parse(old + "/a?x=1")
+        self.assertEqual(crawler._canonical(link), self.base + "/a?x=1")
+
+    async def test_deep_redirect_stays_local(self):
+        """Test a deep page redirecting off-site does not move the whole site"""
+        crawler = PythonWebCrawler(
+            max_depth=2, max_threads=1,
+            host_overrides={"site.test": "127.0.0.1", "sso.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/deep/"])
+        self.assertEqual(crawler.metrics["redirects"], 1)
+        self.assertEqual(crawler.redirects, {})
+        self.assertEqual(self.hosts["sso.test"], 1)
+        self.assertEqual(self.hits["/b"] + self.hits["/c"], 2)
+
+        # A mapping learned earlier never leads a link out of scope
+        crawler.redirects[self.base] = f"http://sso.test:{self.port}"
+        crawler._frontier = asyncio.Queue()
+        scope = crawler._build_scope(self.base + "/")
+        crawler._enqueue(ParsedURL.parse(self.base + "/a"), 1, "", scope)
+        self.assertTrue(crawler._frontier.empty())
+
+    async def test_crawl_with_spilling_frontier(self):
+        """Test a crawl completes when queued links spill to disk"""
+        crawler = PythonWebCrawler(
+            max_depth=3, max_threads=1, frontier_limit=1,
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        await crawler.crawl([self.base + "/"])
+        self.assertEqual(crawler.metrics["pages_fetched"], 5)
+        self.assertGreater(crawler.metrics["frontier_spilled"], 0)
+
+    async def test_slow_responses_time_out(self):
+        """Test each slow phase is cut off and counted on its own"""
+        import time
+        from crawler_timeouts import FetchTimeouts
+
+        crawler = PythonWebCrawler(
+            max_depth=0,
+            timeout=FetchTimeouts(
+                total=10, ttfb=0.5, read_idle=0.5, min_rate=1000,
+                min_rate_grace=0.3
+            ),
+            host_overrides={"site.test": "127.0.0.1"}
+        )
+        started = time.monotonic()
+        await crawler.crawl([
+            self.base + path
+            for path in ("/slow/headers", "/slow/stall", "/slow/trickle", "/")
+        ])
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(crawler.metrics["timeouts_ttfb"], 1)
+        self.assertEqual(crawler.metrics["timeouts_read_idle"], 1)
+        self.assertEqual(crawler.metrics["timeouts_min_rate"], 1)
+        self.assertEqual(crawler.metrics["pages_fetched"], 1)
+
+    async def test_stalled_body_trips_min_rate(self):
+        """Test the rate floor alone cuts off a body that stops arriving"""
+        import time
+        from crawler_timeouts import FetchTimeout, FetchTimeouts
+
+        resolver = CachingResolver(overrides={"site.test": "127.0.0.1"})
+        async with AiohttpTransport(
+            timeout=FetchTimeouts(min_rate=1000, min_rate_grace=0.3),
+            resolver=resolver
+        ) as transport:
+            started = time.monotonic()
+            with self.assertRaises(FetchTimeout) as caught:
+                await transport.fetch(self.base + "/slow/dribble", {})
+        await resolver.close()
+        self.assertEqual(caught.exception.phase, "min_rate")
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_ttfb_window_leaves_room_to_connect(self):
+        """Test time spent connecting is not charged to ttfb"""
+        from crawler_timeouts import FetchTimeout, FetchTimeouts
+
+        async def headers_after(delay):
+            await asyncio.sleep(delay)
+            return "response"
+
+        timeouts = FetchTimeouts(connect=0.2, tls=0.1, ttfb=0.1)
+        self.assertAlmostEqual(timeouts.headers_window, 0.4)
+        self.assertEqual(
+            await timeouts.wait_headers(headers_after(0.25)), "response"
+        )
+        with self.assertRaises(FetchTimeout) as caught:
+            await timeouts.wait_headers(headers_after(1))
+        self.assertEqual(caught.exception.phase, "ttfb")
+
+    async def test_record_and_replay(self):
+        """Test a recorded crawl replays offline with the same results"""
+        import json
+        import tempfile
+
+        def crawl_output(crawler):
+            return sorted(json.dumps(r.to_dict()) for r in crawler.results)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = os.path.join(tmp, "site.warc.gz")
+            live = PythonWebCrawler(
+                max_depth=2, record=archive,
+                host_overrides={"site.test": "127.0.0.1"}
+            )
+            await live.crawl([self.base + "/"])
+            await self.runner.cleanup()
+
+            replayed = PythonWebCrawler(max_depth=2, replay=archive)
+            await replayed.crawl([self.base + "/"])
+            self.assertEqual(crawl_output(replayed), crawl_output(live))
+            self.assertEqual(replayed.metrics["pages_fetched"], 4)
+
+            # A lost index is rebuilt by scanning the archive
+            os.remove(archive + ".idx")
+            rebuilt = PythonWebCrawler(max_depth=2, replay=archive)
+            await rebuilt.crawl([self.base + "/"])
+            self.assertEqual(crawl_output(rebuilt), crawl_output(live))
+
+    async def test_iter_crawl_streams_results(self):
+        """Test iter_crawl yields every result without collecting them"""
+        crawler = PythonWebCrawler(
+            max_depth=2, host_overrides={"site.test": "127.0.0.1"}
+        )
+        urls = [result.url async for result in crawler.iter_crawl(
+            [self.base + "/"], buffer_size=1
+        )]
+        self.assertIn(self.base + "/d", urls)
+        self.assertEqual(crawler.results, [])
+
+    async def test_iter_crawl_aclose_stops_crawl(self):
+        """Test closing the iterator early cancels the crawl"""
+        crawler = PythonWebCrawler(
+            max_depth=2, host_overrides={"site.test": "127.0.0.1"}
+        )
+        stream = crawler.iter_crawl([self.base + "/"], buffer_size=1)
+        first = await stream.__anext__()
+        self.assertTrue(first.url.startswith(self.base))
+        await stream.aclose()
+        self.assertIsNone(crawler.transport)
+        self.assertLess(crawler.metrics["pages_fetched"], 4)
+
+    async def test_shared_transport(self):
+        """Test crawlers reuse a caller-owned transport without closing it"""
+        resolver = CachingResolver(overrides={"site.test": "127.0.0.1"})
+        async with AiohttpTransport(resolver=resolver) as transport:
+            for _ in range(2):
+                crawler = PythonWebCrawler(max_depth=0, transport=transport)
+                await crawler.crawl([self.base + "/"])
+                self.assertEqual(len(crawler.results), 3)
+            self.assertIsNotNone(transport.session)
+        await resolver.close()
+        # The second crawler got the page from the transport's page cache
+        self.assertEqual(crawler.metrics["pages_cached"], 1)
+        self.assertEqual(crawler.metrics["pages_fetched"], 0)
+        self.assertEqual(self.hits["/"], 1)
+
+        with self.assertRaises(ValueError):
+            create_transport("carrier-pigeon")
+
+    async def test_concurrent_crawlers_share_fetches(self):
+        """Test crawlers on one transport fetch each page only once"""
+        resolver = CachingResolver(overrides={"site.test": "127.0.0.1"})
+        async with AiohttpTransport(resolver=resolver) as transport:
+            crawlers = [
+                PythonWebCrawler(max_depth=3, transport=transport)
+                for _ in range(3)
+            ]
+            await asyncio.gather(
+                *(crawler.crawl([self.base + "/"]) for crawler in crawlers)
+            )
+        await resolver.close()
+
+        expected = {result.url for result in crawlers[0].results}
+        self.assertIn(self.base + "/d", expected)
+        for crawler in crawlers[1:]:
+            self.assertEqual({r.url for r in crawler.results}, expected)
+        self.assertEqual(set(self.hits.values()), {1})
+        served = Counter()
+        for crawler in crawlers:
+            served.update(crawler.metrics.counters)
+        self.assertEqual(served["pages_fetched"], 5)
+        self.assertEqual(served["pages_coalesced"] + served["pages_cached"], 10)
+
+    async def test_proxy_pool_ejects_dead_proxy(self):
+        """Test requests go through proxies and a dead proxy is ejected"""
+        from crawler_proxy import ProxyTransport
+
+        # The local site answers proxied requests by path, so it doubles as
+        # a proxy; nothing listens on port 9 of 127.0.0.2
+        live = f"http://127.0.0.1:{self.port}"
+        crawler = PythonWebCrawler(
+            max_depth=2, max_threads=2, proxy=[live, "http://127.0.0.2:9"]
+        )
+        transport = crawler._create_transport()
+        self.assertIsInstance(transport, ProxyTransport)
+        transport.max_failures = 1
+        crawler.transport = transport
+        async with transport:
+            await crawler.crawl([self.base + "/"])
+            stats = {s["proxy"]: s for s in transport.stats()}
+        self.assertEqual(crawler.metrics["pages_fetched"], 4)
+        self.assertEqual(crawler.metrics["fetch_errors"], 0)
+        self.assertTrue(stats["http://127.0.0.2:9"]["ejected"])
+        self.assertEqual(stats["http://127.0.0.2:9"]["requests"], 1)
+        self.assertEqual(stats[live]["failures"], 0)
+
+    def test_proxy_pool_settings(self):
+        """Test pool health and concurrency settings reach the transport"""
+        from crawler_proxy import ProxyTransport
+        from python_webcrawler import parse_args
+
+        args = parse_args([
+            "-proxy", "http://p1:8080,http://p2:8080", "-proxy-concurrency", "2",
+            "-proxy-failures", "5", "-proxy-eject", "7.5",
+            "-proxy-health", "http://example.com/",
+        ])
+        crawler = PythonWebCrawler(
+            proxy=args.proxy,
+            proxy_concurrency=args.proxy_concurrency,
+            proxy_max_failures=args.proxy_failures,
+            proxy_eject_seconds=args.proxy_eject,
+            proxy_health_url=args.proxy_health,
+        )
+        pool = crawler._create_transport()
+        self.assertIsInstance(pool, ProxyTransport)
+        self.assertEqual(pool.max_concurrency, 2)
+        self.assertEqual(pool.max_failures, 5)
+        self.assertEqual(pool.eject_seconds, 7.5)
+        self.assertEqual(pool.health_url, "http://example.com/")
+
+        crawler.proxy = "http://p1:8080"
+        single = crawler._create_transport()
+        self.assertNotIsInstance(single, ProxyTransport)
+        self.assertEqual(single.limit, 2)
+
+    def test_http2_refuses_host_overrides(self):
+        """Test http2, which resolves hosts itself, gets no DNS cache"""
+        import contextlib
+        import io
+        from crawler_jobs import JobConfigError, build_job, load_default_config
+        from python_webcrawler import parse_args
+
+        crawler = PythonWebCrawler(transport="http2")
+        self.assertIsNone(crawler._create_resolver())
+        self.assertIsNotNone(PythonWebCrawler()._create_resolver())
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit) as caught:
+                parse_args(["-transport", "http2", "-resolve", "a.test:127.0.0.1"])
+        self.assertEqual(caught.exception.code, 2)
+        with self.assertRaises(JobConfigError):
+            build_job({
+                "urls": "https://a.test", "transport": "http2",
+                "host_overrides": {"a.test": "127.0.0.1"},
+            }, load_default_config())
+
+    async def test_origin_timeout_spares_proxy(self):
+        """Test a slow origin is neither retried nor charged to the proxy"""
+        from crawler_proxy import ProxyTransport
+        from crawler_timeouts import FetchTimeout
+
+        # Two names for the same local proxy, so a retry would be possible
+        proxy = f"http://127.0.0.1:{self.port}"
+        transport = ProxyTransport(
+            [proxy, proxy + "/"], timeout={"ttfb": 0.3}, max_failures=1
+        )
+        async with transport:
+            with self.assertRaises(FetchTimeout) as caught:
+                await transport.fetch(self.base + "/slow/headers", {})
+            stats = transport.stats()
+        self.assertEqual(caught.exception.phase, "ttfb")
+        self.assertEqual(self.hits["/slow/headers"], 1)
+        self.assertEqual(sum(s["requests"] for s in stats), 1)
+        self.assertEqual(sum(s["failures"] for s in stats), 0)
+        self.assertFalse(any(s["ejected"] for s in stats))
+
+    async def test_resolver_cache_and_overrides(self):
+        """Test static overrides and the shared TTL cache"""
+        calls = []
+
+        class FakeResolver:
+            async def resolve(self, host, port=0, family=0):
+                calls.append(host)
+                return [{"hostname": host, "host": "127.0.0.1", "port": port,
+                         "family": 2, "proto": 0, "flags": 0}]
+
+            async def close(self):
+                pass
+
+        cache = DNSCache()
+        resolver = CachingResolver(
+            overrides={"pinned.test": "10.0.0.1"},
+            cache=cache, resolver=FakeResolver()
+        )
+        pinned = await resolver.resolve("pinned.test", 80)
+        self.assertEqual(pinned[0]["host"], "10.0.0.1")
+
+        resolver.prefetch("a.test", 80)
+        await asyncio.sleep(0)
+        await resolver.resolve("a.test", 80, family=0)
+        await resolver.resolve("a.test", 80, family=0)
+        self.assertEqual(calls, ["a.test"])
+        self.assertEqual(len(cache), 1)
+        await resolver.close()
+
+    async def test_resolver_waiter_survives_cancelled_lookup(self):
+        """Test a joined lookup whose owner is cancelled is retried, not failed"""
+        started = asyncio.Event()
+        calls = []
+
+        class SlowResolver:
+            async def resolve(self, host, port=0, family=0):
+                calls.append(host)
+                if len(calls) == 1:
+                    started.set()
+                    await asyncio.sleep(10)
+                return [{"hostname": host, "host": "127.0.0.1", "port": port,
+                         "family": 2, "proto": 0, "flags": 0}]
+
+            async def close(self):
+                pass
+
+        resolver = CachingResolver(resolver=SlowResolver())
+        owner = asyncio.create_task(resolver.resolve("a.test", 80))
+        await started.wait()
+        waiter = asyncio.create_task(resolver.resolve("a.test", 80))
+        await asyncio.sleep(0)
+        owner.cancel()
+        addresses = await waiter
+        self.assertEqual(addresses[0]["host"], "127.0.0.1")
+        self.assertEqual(calls, ["a.test", "a.test"])
+        with self.assertRaises(asyncio.CancelledError):
+            await owner
+        await resolver.close()
+
+
+@unittest.skipUnless(shutil.which("openssl"), "needs the openssl binary")
+class TestTLS(LocalSiteTestCase):
+    """HTTPS crawls against a local server with a self-signed certificate"""
+
+    async def asyncSetUp(self):
+        import ssl
+        import subprocess
+        import tempfile
+        from aiohttp import web
+
+        self.tmp = tempfile.TemporaryDirectory()
+        cert = os.path.join(self.tmp.name, "cert.pem")
+        key = os.path.join(self.tmp.name, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+             "-keyout", key, "-out", cert, "-days", "1",
+             "-subj", "/CN=site.test"],
+            check=True, capture_output=True
+        )
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+
+        async def handler(request):
+            return web.Response(text=SITE_PAGES["/"], content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(
+            self.runner, "127.0.0.1", 0, ssl_context=server_context
+        )
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        self.base = f"https://site.test:{self.port}"
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.tmp.cleanup()
+
+    async def test_tls_session_resumption(self):
+        """Test the shared context resumes sessions across connection pools"""
+        crawlers = []
+        for _ in range(2):
+            crawler = PythonWebCrawler(
+                max_depth=0, insecure=True,
+                host_overrides={"site.test": "127.0.0.1"}
+            )
+            await crawler.crawl([self.base + "/"])
+            crawlers.append(crawler)
+        first, second = crawlers
+        self.assertIs(first._get_ssl_context(), second._get_ssl_context())
+        self.assertEqual(first.metrics["pages_fetched"], 1)
+        self.assertEqual(second.metrics["tls_handshakes"], 1)
+        self.assertEqual(second.metrics["tls_resumed"], 1)
+        self.assertIn("tls_full_handshakes: 0", second.metrics.format())
+
+
+class TestHeadlessJobs(LocalSiteTestCase):
+    """Test config-file driven headless jobs"""
+
+    def test_build_job_applies_presets(self):
+        """Test presets, size limits and explicit options are layered"""
+        from crawler_jobs import JobConfigError, build_job, load_default_config
+
+        config = load_default_config()
+        job = build_job({
+            "urls": "https://example.com", "preset": "deep",
+            "size_limit": "small", "subs": True,
+        }, config)
+        self.assertEqual(job.urls, ["https://example.com"])
+        self.assertEqual(job.options["max_depth"], 5)
+        self.assertEqual(job.options["max_size"], 100)
+        self.assertTrue(job.options["subs"])
+
+        with self.assertRaises(JobConfigError):
+            build_job({"urls": ["https://x.com"], "preset": "nope"}, config)
+        with self.assertRaises(JobConfigError):
+            build_job({"urls": ["https://x.com"], "colour": "red"}, config)
+
+        job = build_job({"urls": "https://x.com", "timeout_preset": "fast"}, config)
+        crawler = PythonWebCrawler(**job.options)
+        self.assertEqual(crawler.timeouts.ttfb, 5)
+        self.assertEqual(crawler.timeouts.min_rate, 4096)
+        with self.assertRaises(JobConfigError):
+            build_job({"urls": "https://x.com", "timeout": {"idle": 3}}, config)
+        for bad in ({"max_size": "big"}, {"unique": "yes"},
+                    {"status_interval": True}, {"transport": "carrier"},
+                    {"proxy_strategy": "fastest"}):
+            with self.assertRaises(JobConfigError):
+                build_job(dict(bad, urls="https://x.com"), config)
+        job = build_job({"urls": "https://x.com", "status_interval": 2}, config)
+        self.assertEqual(job.options["status_interval"], 2)
+
+    def test_job_output_dir_follows_job_file(self):
+        """Test relative output dirs resolve against the job file"""
+        import json
+        import tempfile
+        from crawler_jobs import load_default_config, load_jobs
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.json")
+            with open(path, "w") as f:
+                json.dump({"jobs": [
+                    {"urls": ["https://x.com"], "output_dir": "results"},
+                    {"urls": ["https://x.com"]},
+                ]}, f)
+            placed, default = load_jobs(path, load_default_config())
+        self.assertEqual(placed.output_dir, os.path.join(tmp, "results"))
+        self.assertIsNone(default.output_dir)
+
+    async def test_run_jobs_survives_a_broken_job(self):
+        """Test a job that cannot start fails alone and the rest still run"""
+        from crawler_jobs import EXIT_FAILED, Job, run_jobs
+
+        options = {"max_depth": 0, "host_overrides": {"site.test": "127.0.0.1"}}
+        jobs = [
+            Job("broken", [self.base + "/"], dict(options, transport="carrier")),
+            Job("fine", [self.base + "/"], options),
+        ]
+        finished = []
+        code = await run_jobs(jobs, lambda job, c: finished.append(job.name))
+        self.assertEqual(code, EXIT_FAILED)
+        self.assertEqual(finished, ["fine"])
+
+    async def test_run_jobs_shares_transport(self):
+        """Test jobs run back to back and report exit codes"""
+        import json
+        import tempfile
+        from crawler_jobs import (
+            EXIT_NO_RESULTS, EXIT_OK, load_default_config, load_jobs, run_jobs
+        )
+
+        overrides = {"site.test": "127.0.0.1"}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.json")
+            with open(path, "w") as f:
+                json.dump({
+                    "defaults": {"max_depth": 1, "host_overrides": overrides},
+                    "jobs": [
+                        {"name": "home", "urls": [self.base + "/"]},
+                        {"name": "leaf", "urls": [self.base + "/d"]},
+                    ],
+                }, f)
+            jobs = load_jobs(path, load_default_config())
+
+        finished = []
+        code = await run_jobs(jobs[:1], lambda job, c: finished.append(c))
+        self.assertEqual(code, EXIT_OK)
+        code = await run_jobs(jobs, lambda job, c: finished.append(c))
+        self.assertEqual(code, EXIT_NO_RESULTS)
+        self.assertIs(finished[1].transport, finished[2].transport)
+
+    def test_jobs_cannot_clobber_archives(self):
+        """Test only jobs sharing a pool may record to the same archive"""
+        from crawler_jobs import JobConfigError, Job, check_archive_paths
+
+        def job(name, **options):
+            return Job(name, ["https://x.com"], options)
+
+        check_archive_paths([
+            job("a", record="crawl.warc.gz"), job("b", record="crawl.warc.gz"),
+            job("c", replay="other.warc.gz"),
+        ])
+        with self.assertRaises(JobConfigError):
+            check_archive_paths([
+                job("a", record="crawl.warc.gz"),
+                job("b", record="./crawl.warc.gz", timeout=5),
+            ])
+        with self.assertRaises(JobConfigError):
+            check_archive_paths([
+                job("a", record="crawl.warc.gz"), job("b", replay="crawl.warc.gz"),
+            ])
+
+    async def test_run_jobs_fails_on_export_error(self):
+        """Test an export failure fails the job and pools split on threads"""
+        import tempfile
+        from crawler_jobs import EXIT_FAILED, Job, run_jobs
+        from webcrawler import save_job_results
+
+        options = {"max_depth": 0, "host_overrides": {"site.test": "127.0.0.1"}}
+        with tempfile.NamedTemporaryFile() as blocker:
+            # A file where the output directory should be
+            jobs = [
+                Job(name, [self.base + "/"], dict(options, max_threads=threads),
+                    "txt", os.path.join(blocker.name, "out"))
+                for name, threads in (("one", 2), ("two", 4))
+            ]
+            finished = []
+
+            def on_complete(job, crawler):
+                finished.append(crawler)
+                save_job_results(job, crawler)
+
+            code = await run_jobs(jobs, on_complete)
+        self.assertEqual(code, EXIT_FAILED)
+        self.assertEqual(len(finished), 2)
+        self.assertIsNot(finished[0].transport, finished[1].transport)
+        self.assertEqual(finished[1].transport.limit, 4)
+
+
+class TestCompression(unittest.IsolatedAsyncioTestCase):
+    """Test bounded streaming decompression"""
+
+    @staticmethod
+    async def _chunks(data, size=1024):
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+
+    async def test_gzip_roundtrip_and_wire_bytes(self):
+        """Test gzip bodies decode and report their wire size"""
+        import gzip
+
+        page = b"<a href='/x'>x</a>" * 1000
+        wire = gzip.compress(page)
+        body, wire_bytes = await read_body(self._chunks(wire), "gzip")
+        self.assertEqual(body, page)
+        self.assertEqual(wire_bytes, len(wire))
+
+    async def test_decompression_bomb_is_capped(self):
+        """Test the decoded-size cap stops highly compressible bodies"""
+        import zlib
+
+        bomb = zlib.compress(b"\0" * (10 * 1024 * 1024))
+        with self.assertRaises(ResponseTooLarge):
+            await read_body(self._chunks(bomb), "deflate", max_size=64 * 1024)
+
+    async def _check_bomb(self, encoding, bomb, page):
+        """A bomb is stopped one bounded step past the cap; a page decodes"""
+        from crawler_compression import _decoder_for
+
+        limit = 64 * 1024
+        decoder = _decoder_for(encoding)
+        out = decoder.decompress(bomb[:64 * 1024], limit)
+        self.assertLessEqual(len(out), limit + 256 * 1024)
+        with self.assertRaises(ResponseTooLarge):
+            await read_body(self._chunks(bomb, 64 * 1024), encoding, limit)
+        return await read_body(self._chunks(page), encoding)
+
+    async def test_brotli_bomb_is_capped(self):
+        """Test br bodies decode within the cap and bombs are stopped"""
+        try:
+            import brotli
+        except ImportError:
+            self.skipTest("brotli is not installed")
+        page = b"<a href='/x'>x</a>" * 1000
+        body, _ = await self._check_bomb(
+            "br",
+            brotli.compress(b"\0" * (256 * 1024 * 1024), quality=1),
+            brotli.compress(page)
+        )
+        self.assertEqual(body, page)
+
+    async def test_zstd_bomb_is_capped(self):
+        """Test zstd bodies decode within the cap and bombs are stopped"""
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest("zstandard is not installed")
+        page = b"<a href='/x'>x</a>" * 1000
+        compressor = zstandard.ZstdCompressor()
+        body, _ = await self._check_bomb(
+            "zstd",
+            compressor.compress(b"\0" * (256 * 1024 * 1024)),
+            compressor.compress(page)
+        )
+        self.assertEqual(body, page)
+
+
+class TestAdaptiveConcurrency(unittest.IsolatedAsyncioTestCase):
+    """Test the AIMD per-host concurrency controller"""
+
+    async def test_aimd_limits(self):
+        """Test slow start, halving on errors, bounds and waiting"""
+        from crawler_adaptive import AdaptiveConcurrency
+
+        limiter = AdaptiveConcurrency(min_limit=1, max_limit=6, initial_limit=2)
+        for _ in range(10):
+            await limiter.acquire("a.test")
+            limiter.release("a.test", 0.01)
+        self.assertEqual(limiter.limit("a.test"), 6)
+
+        await limiter.acquire("a.test")
+        limiter.release("a.test", 0.01, failed=True)
+        self.assertEqual(limiter.limit("a.test"), 3)
+        # A burst of failures within one round trip counts once
+        await limiter.acquire("a.test")
+        limiter.release("a.test", 0.01, failed=True)
+        self.assertEqual(limiter.limit("a.test"), 3)
+        self.assertEqual(limiter.limits(), {"a.test": 3})
+
+        for _ in range(3):
+            await limiter.acquire("a.test")
+        waiter = asyncio.ensure_future(limiter.acquire("a.test"))
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        limiter.release("a.test", 0.01)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(limiter.busiest(1), [("a.test", 3, 3)])
+
+
+class TestLoopLagMonitor(unittest.IsolatedAsyncioTestCase):
+    """Test event loop lag sampling and blocking-callback reports"""
+
+    async def test_blocking_callback_is_named(self):
+        """Test a coroutine that blocks the loop shows up by name"""
+        import time
+        from asyncio import events
+        from crawler_loop import LoopLagMonitor
+
+        async def parse_synchronously():
+            time.sleep(0.15)
+
+        original_run = events.Handle._run
+        monitor = LoopLagMonitor(interval=0.01, block_threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(parse_synchronously())
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        self.assertIs(events.Handle._run, original_run)
+        self.assertEqual(sum(monitor.histogram), monitor.samples)
+        self.assertGreaterEqual(monitor.stalls, 1)
+        self.assertGreaterEqual(monitor.max_lag, 0.1)
+        name, count, longest = monitor.top_blocking(1)[0]
+        self.assertIn("parse_synchronously", name)
+        self.assertGreaterEqual(longest, 0.15)
+        self.assertEqual(monitor.summary()["loop_stalls"], monitor.stalls)
+
+    def test_run_event_loop_uvloop(self):
+        """Test the uvloop option runs the coroutine on a uvloop loop"""
+        from crawler_loop import run_event_loop
+
+        async def loop_module():
+            return type(asyncio.get_running_loop()).__module__
+
+        self.assertTrue(run_event_loop(loop_module()).startswith("asyncio"))
+        try:
+            import uvloop  # noqa: F401
+        except ImportError:
+            with self.assertRaises(ImportError):
+                run_event_loop(loop_module(), use_uvloop=True)
+        else:
+            self.assertTrue(
+                run_event_loop(loop_module(), use_uvloop=True).startswith("uvloop")
+            )
+
+    def test_menu_refuses_missing_uvloop(self):
+        """Test the interactive menu exits with a usage error without uvloop"""
+        from unittest import mock
+        import webcrawler
+
+        # A None entry makes `import uvloop` fail as if it were not installed
+        menu = mock.patch.object(webcrawler.StreamlinedWebCrawler, "run")
+        with mock.patch.dict(sys.modules, {"uvloop": None}), menu as run:
+            with self.assertRaises(SystemExit) as caught:
+                webcrawler.main(["--uvloop"])
+        self.assertEqual(caught.exception.code, 2)
+        run.assert_not_called()
+
+
+class TestPageCache(unittest.IsolatedAsyncioTestCase):
+    """Test single-flight loads and the page LRU"""
+
+    async def test_concurrent_loads_run_once(self):
+        """Test concurrent callers share one load and failures are not kept"""
+        from crawler_flight import CACHED, COALESCED, FETCHED, PageCache
+
+        cache = PageCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "page"
+
+        results = await asyncio.gather(
+            *(cache.load("k", loader) for _ in range(3))
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            sorted(how for _, how in results), [COALESCED, COALESCED, FETCHED]
+        )
+        self.assertEqual(await cache.load("k", loader), ("page", CACHED))
+
+        async def failing():
+            raise ValueError("boom")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                await cache.load("bad", failing)
+        self.assertEqual(len(cache), 1)
+
+    async def test_waiter_takes_over_cancelled_load(self):
+        """Test a waiting caller loads the key itself if the leader is cancelled"""
+        from crawler_flight import FETCHED, PageCache
+
+        cache = PageCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "page"
+
+        leader = asyncio.create_task(cache.load("k", slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.load("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual(await waiter, ("page", FETCHED))
+
+    async def test_least_recently_used_pages_are_evicted(self):
+        """Test the cache keeps within its entry and byte limits"""
+        from crawler_flight import PageCache
+
+        cache = PageCache(max_entries=2, max_bytes=10, weigh=len)
+
+        async def load(key, value):
+            async def loader():
+                return value
+            return await cache.load(key, loader)
+
+        await load("a", "1234")
+        await load("b", "1234")
+        await load("a", "")
+        await load("c", "1234")
+        self.assertEqual(list(cache._entries), ["a", "c"])
+        await load("d", "123456789")
+        self.assertEqual(list(cache._entries), ["d"])
+        self.assertEqual(cache.bytes, 9)
+        await load("e", "12345678901")
+        self.assertEqual(list(cache._entries), ["d"])
+
+
+class TestSpillingFrontier(unittest.IsolatedAsyncioTestCase):
+    """Test the disk-spilling frontier"""
+
+    async def test_spill_keeps_fifo_order(self):
+        """Test spilled entries come back in order and files are removed"""
+        import tempfile
+        from crawler_frontier import MemoryGovernor, SpillingFrontier
+
+        scope = CrawlScope.from_seed("https://example.com/")
+        with tempfile.TemporaryDirectory() as tmp:
+            frontier = SpillingFrontier(memory_items=4, spill_dir=tmp)
+            urls = [f"https://example.com/p{i}" for i in range(25)]
+            for url in urls:
+                frontier.put_nowait((ParsedURL.parse(url), 1, "", scope))
+            self.assertEqual(frontier.qsize(), 25)
+            self.assertGreater(frontier.spilled, 0)
+
+            got = []
+            while not frontier.empty():
+                url, depth, _, item_scope = await frontier.get()
+                frontier.task_done()
+                self.assertIs(item_scope, scope)
+                got.append(url.url)
+            self.assertEqual(got, urls)
+            await asyncio.wait_for(frontier.join(), 1)
+            frontier.close()
+            self.assertEqual(os.listdir(tmp), [])
+
+        # Over the RSS ceiling only the low-water mark stays in memory
+        governor = MemoryGovernor(limit_bytes=1, check_interval=1)
+        frontier = SpillingFrontier(governor=governor)
+        for url in urls:
+            frontier.put_nowait((ParsedURL.parse(url), 0, "", scope))
+        self.assertTrue(governor.over_limit())
+        self.assertGreater(governor.peak_rss, 0)
+        self.assertEqual(frontier.spilled, 0)
+        self.assertEqual(frontier.qsize(), 25)
+        frontier.close()
+
+
+class TestExport(unittest.TestCase):
+    """Test streaming exporters"""
+
+    def setUp(self):
+        import tempfile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results = [
+            Result(
+                f"https://h{i % 3}.example.com/p{i}",
+                "href" if i % 2 else "script",
+                "https://example.com/"
+            )
+            for i in range(10)
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_json_matches_previous_layout(self):
+        """Test streamed JSON is identical to json.dump with indent"""
+        import json
+        from crawler_export import export_results
+
+        path = export_results(
+            iter(self.results), os.path.join(self.tmp.name, "out"), "json"
+        )
+        with open(path, encoding="utf-8") as f:
+            written = f.read()
+        expected = json.dumps(
+            [r.to_dict() for r in self.results], indent=2, ensure_ascii=False
+        )
+        self.assertEqual(written, expected)
+
+    def test_jsonl_and_sqlite(self):
+        """Test JSON Lines rows and the indexed SQLite table"""
+        import json
+        import sqlite3
+        from crawler_export import export_results
+
+        stem = os.path.join(self.tmp.name, "out")
+        path = export_results(iter(self.results), stem, "jsonl")
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows, [r.to_dict() for r in self.results])
+
+        path = export_results(iter(self.results), stem, "sqlite")
+        conn = sqlite3.connect(path)
+        count = conn.execute(
+            "SELECT COUNT(*) FROM results WHERE host = ? AND source = ?",
+            ("h0.example.com", "script")
+        ).fetchone()[0]
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(results)")}
+        conn.close()
+        self.assertEqual(count, 2)
+        self.assertEqual(indexes, {"idx_results_host", "idx_results_source"})
+
+        with self.assertRaises(ValueError):
+            export_results(self.results, stem, "xlsx")
+
+    def test_unique_records_keep_aggregates(self):
+        """Test every format carries parent, sources and count in unique mode"""
+        import csv
+        import json
+        import sqlite3
+        from crawler_export import export_results
+        from python_webcrawler import OutputIndex
+
+        index = OutputIndex()
+        for result in self.results:
+            index.add(result.url, result.source, result.where, "https://p/")
+        index.add(self.results[0].url, "img", "", "https://q/")
+        index.add(self.results[0].url, "img", "", "https://q/")
+        records = list(index)
+        stem = os.path.join(self.tmp.name, "unique")
+
+        path = export_results(records, stem, "json")
+        with open(path, encoding="utf-8") as f:
+            written = f.read()
+        expected = [r.to_dict() for r in records]
+        self.assertEqual(
+            written, json.dumps(expected, indent=2, ensure_ascii=False)
+        )
+        self.assertEqual(expected[0]["sources"], ["script", "img"])
+        self.assertEqual(expected[0]["count"], 3)
+
+        path = export_results(records, stem, "jsonl")
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], expected)
+
+        path = export_results(records, stem, "csv")
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][3:], ["Parent", "Sources", "Count"])
+        self.assertEqual(rows[1][3:], ["https://p/", "script,img", "3"])
+
+        path = export_results(records, stem, "sqlite")
+        conn = sqlite3.connect(path)
+        row = conn.execute(
+            'SELECT parent, sources, "count" FROM results WHERE url = ?',
+            (records[0].url,)
+        ).fetchone()
+        conn.close()
+        self.assertEqual(row, ("https://p/", "script,img", 3))
+
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return
+        path = export_results(records, stem, "parquet")
+        table = pq.read_table(path).to_pylist()
+        self.assertEqual(table[0]["sources"], ["script", "img"])
+        self.assertEqual(table[0]["count"], 3)
+
+
+class TestStartup(unittest.TestCase):
+    """Test that heavy dependencies stay lazy"""
+
+    def test_import_is_lazy(self):
+        """Test importing the CLI module does not load the HTTP stack"""
+        import subprocess
+
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        code = (
+            "import sys; sys.path.insert(0, %r); import python_webcrawler; "
+            "print(sorted(m for m in ('aiohttp', 'bs4', 'asyncio', 'ssl') "
+            "if m in sys.modules))" % src
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        self.assertEqual(out.stdout.strip(), "[]", out.stderr)
+
+    def test_package_exports(self):
+        """Test the package resolves its public names on demand"""
+        import importlib
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+        package = importlib.import_module("src")
+        self.assertIs(package.PythonWebCrawler, PythonWebCrawler)
+        self.assertIn("StreamlinedWebCrawler", package.__all__)
+
+
 class TestUnifiedWebCrawler(unittest.TestCase):
     """Test cases for UnifiedWebCrawler class"""
 